@@ -11,20 +11,64 @@ class Settings(BaseSettings):
     openai_model: str = Field(default="gpt-5", alias="OPENAI_MODEL")
     openai_embed_model: str = Field(default="text-embedding-3-large", alias="OPENAI_EMBED_MODEL")
     openai_base_url: str = Field(default="https://api.openai.com/v1", alias="OPENAI_BASE_URL")
+    embed_batch_size: int = Field(default=256, alias="EMBED_BATCH_SIZE")
+    embed_batch_max_tokens: int = Field(default=100_000, alias="EMBED_BATCH_MAX_TOKENS")
+    embed_max_concurrency: int = Field(default=4, alias="EMBED_MAX_CONCURRENCY")
+    embed_coalesce_window_ms: float = Field(default=2.0, alias="EMBED_COALESCE_WINDOW_MS")
+    embed_coalesce_max_batch: int = Field(default=64, alias="EMBED_COALESCE_MAX_BATCH")
+    embed_provider: str = Field(default="openai", alias="EMBED_PROVIDER")  # openai | local
+    local_embed_dim: int = Field(default=1024, alias="LOCAL_EMBED_DIM")
+    local_embed_model_path: str = Field(default="./data/local_embed.npz", alias="LOCAL_EMBED_MODEL_PATH")
 
     anthropic_api_key: str | None = Field(default=None, alias="ANTHROPIC_API_KEY")
     anthropic_model: str = Field(default="claude-sonnet-4-5", alias="ANTHROPIC_MODEL")
     anthropic_base_url: str = Field(default="https://api.anthropic.com", alias="ANTHROPIC_BASE_URL")
 
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive: int = Field(default=20, alias="HTTP_MAX_KEEPALIVE")
+    http_keepalive_expiry_s: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY_S")
+    http2: bool = Field(default=False, alias="HTTP2")
+    http_connect_timeout_s: float = Field(default=5.0, alias="HTTP_CONNECT_TIMEOUT_S")
+    http_read_timeout_s: float = Field(default=30.0, alias="HTTP_READ_TIMEOUT_S")
+    http_pool_timeout_s: float = Field(default=5.0, alias="HTTP_POOL_TIMEOUT_S")
+
     docs_dir: str = Field(default="./data/docs", alias="DOCS_DIR")
-    index_path: str = Field(default="./data/index.json", alias="INDEX_PATH")
+    index_path: str = Field(default="./data/index", alias="INDEX_PATH")
+    index_watch_interval_s: float = Field(default=0.0, alias="INDEX_WATCH_INTERVAL_S")
+    admin_token: str = Field(default="", alias="ADMIN_TOKEN")
     top_k: int = Field(default=5, alias="TOP_K")
     chunk_max_chars: int = Field(default=900, alias="CHUNK_MAX_CHARS")
     chunk_overlap_chars: int = Field(default=120, alias="CHUNK_OVERLAP_CHARS")
+    chunk_boundary: str = Field(default="none", alias="CHUNK_BOUNDARY")
+    context_token_budget: int = Field(default=3000, alias="CONTEXT_TOKEN_BUDGET")
     prompt_template: str = Field(default="grounded_concise", alias="PROMPT_TEMPLATE")
     min_relevance_score: float = Field(default=0.22, alias="MIN_RELEVANCE_SCORE")
+    guardrail_rules_path: str = Field(default="", alias="GUARDRAIL_RULES_PATH")
+    ann_mode: str = Field(default="exact", alias="ANN_MODE")
+    ann_nlist: int = Field(default=0, alias="ANN_NLIST")
+    ann_nprobe: int = Field(default=8, alias="ANN_NPROBE")
+    ann_min_chunks: int = Field(default=10_000, alias="ANN_MIN_CHUNKS")
+    vector_dtype: str = Field(default="float32", alias="VECTOR_DTYPE")
+    rescore_factor: int = Field(default=4, alias="RESCORE_FACTOR")
+    retrieval_mode: str = Field(default="hybrid", alias="RETRIEVAL_MODE")
+    hybrid_candidates: int = Field(default=50, alias="HYBRID_CANDIDATES")
+    hybrid_rrf_k: int = Field(default=60, alias="HYBRID_RRF_K")
+    lexical_fast_path_confidence: float = Field(default=0.6, alias="LEXICAL_FAST_PATH_CONFIDENCE")
+    query_cache_max_entries: int = Field(default=10_000, alias="QUERY_CACHE_MAX_ENTRIES")
+    query_cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="QUERY_CACHE_MAX_BYTES")
+    query_cache_ttl_s: float = Field(default=3600.0, alias="QUERY_CACHE_TTL_S")
+    answer_cache_max_entries: int = Field(default=2_000, alias="ANSWER_CACHE_MAX_ENTRIES")
+    answer_cache_max_bytes: int = Field(default=32 * 1024 * 1024, alias="ANSWER_CACHE_MAX_BYTES")
+    answer_cache_ttl_s: float = Field(default=900.0, alias="ANSWER_CACHE_TTL_S")
+    answer_cache_min_similarity: float = Field(default=0.95, alias="ANSWER_CACHE_MIN_SIMILARITY")
+    ask_batch_max_items: int = Field(default=256, alias="ASK_BATCH_MAX_ITEMS")
+    ask_batch_llm_concurrency: int = Field(default=8, alias="ASK_BATCH_LLM_CONCURRENCY")
     cors_origins: str = Field(default="*", alias="CORS_ORIGINS")
 
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_format: str = Field(default="text", alias="LOG_FORMAT")  # text | json
+    log_queue: bool = Field(default=True, alias="LOG_QUEUE")
+    log_sample_rate: float = Field(default=1.0, alias="LOG_SAMPLE_RATE")
+    log_sampled_events: str = Field(default="ask_ok,ask_stream_ok", alias="LOG_SAMPLED_EVENTS")
 
 settings = Settings()
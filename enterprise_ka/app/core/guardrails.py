@@ -1,6 +1,7 @@
-import re
 from dataclasses import dataclass
 
+from app.core.rules import Rule, RuleEngine, load_rules
+
 
 @dataclass(frozen=True)
 class GuardrailFinding:
@@ -18,49 +19,29 @@ class Guardrails:
     """
     Lightweight, rule-based guardrails to deflect obviously unsafe or irrelevant queries
     before they reach the LLM. This is intentionally simple (no network calls) to keep
-    the PoC self-contained.
+    the PoC self-contained. Rules come from a JSON file (`GUARDRAIL_RULES_PATH`, default
+    `app/core/guardrail_rules.json`) and are compiled once into a RuleEngine.
     """
-    def __init__(self, min_relevance_score: float = 0.22):
+    def __init__(self, min_relevance_score: float = 0.22, rules_path: str = "", rules: list[Rule] | None = None):
         self.min_relevance_score = min_relevance_score
-        self.denylist_patterns = [
-            ("prompt_injection", re.compile(r"ignore (all )?previous instructions|reset the rules", re.I)),
-            ("credential_exfiltration", re.compile(r"(password|api key|secret key|token|credential)", re.I)),
-            ("destructive_ops", re.compile(r"(drop (table|database)|rm -rf|format c:|shutdown)", re.I)),
-        ]
-        self.off_topic_keywords = [
-            "movie", "recipe", "song", "weather", "politics", "sports", "celebrity", "stock price"
-        ]
+        self.engine = RuleEngine(rules if rules is not None else load_rules(rules_path))
 
     def pre_screen(self, question: str) -> GuardrailDecision:
-        q = question.lower()
-        findings: list[GuardrailFinding] = []
+        matches = self.engine.scan(question)
 
-        for category, pattern in self.denylist_patterns:
-            if pattern.search(q):
-                findings.append(
-                    GuardrailFinding(
-                        category=category,
-                        action="block",
-                        detail="Rejected due to unsafe or system-override intent.",
-                    )
-                )
+        # First block rule (in file order) wins and is the only finding, as before.
+        for m in matches:
+            if m.rule.action == "block":
+                finding = GuardrailFinding(category=m.rule.category, action="block", detail=m.rule.describe(m.text))
                 return GuardrailDecision(
                     blocked=True,
-                    findings=findings,
+                    findings=[finding],
                     message="This assistant only answers enterprise documentation questions; this request was blocked by safety rules.",
                 )
 
-        for keyword in self.off_topic_keywords:
-            if keyword in q:
-                findings.append(
-                    GuardrailFinding(
-                        category="off_topic",
-                        action="warn",
-                        detail=f"Question appears unrelated to enterprise docs (keyword: {keyword}).",
-                    )
-                )
-                break
-
+        findings = [
+            GuardrailFinding(category=m.rule.category, action="warn", detail=m.rule.describe(m.text)) for m in matches
+        ]
         return GuardrailDecision(blocked=False, findings=findings)
 
     def relevance_guard(self, top_score: float) -> GuardrailFinding | None:
@@ -1,10 +1,118 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import time
+from collections.abc import Iterable
 
+from app.core.responses import dumps
 
-def configure_logging(level: str = "INFO") -> None:
-    logging.basicConfig(
-        level=getattr(logging, level.upper(), logging.INFO),
-        format="%(asctime)s %(levelname)s %(name)s %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+# Attributes every LogRecord has; anything else on a record came from `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_installed: tuple[logging.Handler, logging.handlers.QueueListener | None] | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, every `extra` field, and exc (traceback) if any."""
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        if record.stack_info:
+            out["stack"] = self.formatStack(record.stack_info)
+        return dumps(out, default=str).decode("utf-8")
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of the records whose message is in `events` and level below WARNING; passes the rest."""
+    def __init__(self, rate: float, events: Iterable[str]):
+        super().__init__()
+        self.rate = rate
+        self.events = frozenset(events)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING or record.msg not in self.events:
+            return True
+        return random.random() < self.rate
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process: resolve %-args now, but leave formatting (and
+        # exc_info/extras) to the listener thread instead of pre-rendering the text like the base class.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "text",
+    use_queue: bool = False,
+    sample_rate: float = 1.0,
+    sampled_events: Iterable[str] = (),
+) -> None:
+    """
+    Root logging to stdout, `fmt` "text" or "json". With `use_queue`, the event loop thread only
+    enqueues records and a background QueueListener thread formats and writes them, so a slow
+    stdout never stalls request handling. `sample_rate` < 1 keeps that share of `sampled_events`
+    (warnings and errors are always kept). Calling it again replaces the previous setup.
+    """
+    global _installed
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    if _installed is not None:
+        root.removeHandler(_installed[0])
+        if _installed[1] is not None:
+            _installed[1].stop()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    listener: logging.handlers.QueueListener | None = None
+    handler: logging.Handler = stream
+    if use_queue:
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        handler = _LocalQueueHandler(records)
+        listener = logging.handlers.QueueListener(records, stream)
+        listener.start()
+    if sample_rate < 1.0:
+        handler.addFilter(SamplingFilter(sample_rate, sampled_events))
+    root.addHandler(handler)
+    _installed = (handler, listener)
+
+def stop_logging() -> None:
+    """Drains and stops the queue listener, if any (runs at exit; call it before `os._exit`)."""
+    global _installed
+    if _installed is not None and _installed[1] is not None:
+        listener = _installed[1]
+        _installed = (_installed[0], None)
+        listener.stop()
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork: a preforked worker gets its own queue and thread.
+    global _installed
+    if _installed is None:
+        return
+    handler, parent = _installed
+    if parent is None or not isinstance(handler, logging.handlers.QueueHandler):
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler.queue = records
+    listener = logging.handlers.QueueListener(records, *parent.handlers)
+    listener.start()
+    _installed = (handler, listener)
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,154 @@
+import bisect
+import math
+import threading
+from collections.abc import Callable, Iterable
+
+# Seconds; covers a cache hit (~1 ms) up to a slow LLM answer.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter per label-value tuple."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for values, total in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, values)} {_number(total)}"
+
+class Histogram:
+    """Cumulative-bucket histogram per label-value tuple (Prometheus semantics)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # per label tuple: [count per bucket (+Inf last), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][i] += 1
+            series[1][0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {_number(total[0])}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._collectors: dict[str, Callable[[], Iterable[str]]] = {}
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:  # module reloads (tests) keep one series per name
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def set_collector(self, name: str, collect: Callable[[], Iterable[str]]) -> None:
+        """`collect()` returns ready exposition lines (TYPE included), evaluated at scrape time; replaces `name`."""
+        self._collectors[name] = collect
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collect in self._collectors.values():
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+def snapshot_lines(prefix: str, snapshot: dict, counters: Iterable[str] = ("hits", "misses", "evictions", "expirations")) -> list[str]:
+    """Exposition lines for the numeric fields of a `snapshot()` dict: `counters` as counters, the rest as gauges."""
+    counter_fields = set(counters)
+    lines: list[str] = []
+    for field, value in snapshot.items():
+        if isinstance(value, bool) or not isinstance(value, int | float):
+            continue
+        if field in counter_fields:
+            name, kind = f"{prefix}_{field}_total", "counter"
+        else:
+            name, kind = f"{prefix}_{field}", "gauge"
+        lines += [f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+    return lines
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter(
+    "ka_requests_total", "Ask requests by endpoint, provider, prompt template and outcome.",
+    ("endpoint", "provider", "template", "outcome"),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ka_request_duration_seconds", "Ask request latency by endpoint, provider and outcome.",
+    ("endpoint", "provider", "outcome"),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "ka_stage_duration_seconds", "Time spent per pipeline stage (guardrails, embed, search, prompt, llm, ...).",
+    ("stage",),
+)
+ANSWER_CACHE = REGISTRY.counter(
+    "ka_answer_cache_requests_total", "Answer cache lookups by prompt template and result (hit|miss).",
+    ("template", "result"),
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "ka_upstream_retries_total", "Provider calls retried by the tenacity decorators.", ("provider", "operation"),
+)
+
+def count_retry(provider: str, operation: str) -> Callable[[object], None]:
+    """tenacity `before_sleep` hook: counts every retry of a provider call."""
+    def before_sleep(retry_state: object) -> None:
+        UPSTREAM_RETRIES.inc(provider, operation)
+    return before_sleep
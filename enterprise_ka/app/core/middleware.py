@@ -1,14 +1,51 @@
 import uuid
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.timing import SERVER_TIMING_HEADER, start_request
 
 REQUEST_ID_HEADER = "x-request-id"
 
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get(REQUEST_ID_HEADER) or str(uuid.uuid4())
-        request.state.request_id = request_id
-        response = await call_next(request)
-        response.headers[REQUEST_ID_HEADER] = request_id
-        return response
+# Pure ASGI (no BaseHTTPMiddleware): no extra task or body re-streaming per request, and
+# streaming responses pass straight through.
+
+class RequestIdMiddleware:
+    """Uses the incoming `x-request-id` or a new uuid4; exposed as `request.state.request_id` and echoed back."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER) or str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
+
+class ServerTimingMiddleware:
+    """
+    Collects `app.core.timing.span` stages for each request and returns them in a `Server-Timing`
+    header. Streaming responses send headers first, so they only carry the stages before the stream.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = start_request()
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[SERVER_TIMING_HEADER] = timings.header()
+            await send(message)
+
+        await self.app(scope, receive, send_with_timings)
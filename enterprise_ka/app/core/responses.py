@@ -0,0 +1,31 @@
+import json
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency; stdlib json below
+    orjson = None  # type: ignore[assignment]
+
+
+def dumps(content: Any, default: Callable[[Any], Any] | None = None) -> bytes:
+    """
+    Compact UTF-8 JSON; orjson when installed (also takes numpy arrays), stdlib otherwise.
+    `default` converts otherwise unserializable values (e.g. `str`).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=default
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `dumps`. For endpoints without a response model: routes with one
+    keep FastAPI's default class, which serializes the model straight to JSON bytes in pydantic-core
+    (faster still, and a custom class would turn that path off).
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+try:  # private CPython modules; without them every regex rule is simply searched on its own
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+except ImportError:  # pragma: no cover
+    sre_constants = sre_parse = None
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "guardrail_rules.json")
+DEFAULT_BLOCK_DETAIL = "Rejected due to unsafe or system-override intent."
+_MIN_ANCHOR = 3  # shorter literal prefixes would make nearly every question a candidate
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One guardrail rule: a regex `pattern` or a list of literal `keywords` (case-insensitive substrings)."""
+    id: str
+    category: str
+    action: str  # block | warn
+    pattern: str | None = None
+    keywords: tuple[str, ...] = ()
+    detail: str = ""
+
+    def describe(self, match: str) -> str:
+        if self.detail:
+            return self.detail.format(match=match)
+        return DEFAULT_BLOCK_DETAIL if self.action == "block" else f"Matched guardrail rule {self.id} ({match})."
+
+@dataclass(frozen=True)
+class RuleMatch:
+    rule: Rule
+    text: str
+
+def load_rules(path: str = "") -> list[Rule]:
+    with open(path or DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    return parse_rules(config["rules"])
+
+def parse_rules(raw_rules: Iterable[dict]) -> list[Rule]:
+    rules: list[Rule] = []
+    seen: set[str] = set()
+    for raw in raw_rules:
+        rule = Rule(
+            id=raw["id"],
+            category=raw.get("category", raw["id"]),
+            action=raw.get("action", "block"),
+            pattern=raw.get("pattern"),
+            keywords=tuple(k.lower() for k in raw.get("keywords", ())),
+            detail=raw.get("detail", ""),
+        )
+        if rule.id in seen:
+            raise ValueError(f"Duplicate guardrail rule id {rule.id!r}")
+        if rule.action not in ("block", "warn"):
+            raise ValueError(f"Guardrail rule {rule.id!r}: action must be block or warn")
+        if (rule.pattern is None) == (not rule.keywords):
+            raise ValueError(f"Guardrail rule {rule.id!r}: set exactly one of pattern / keywords")
+        if rule.pattern is not None:
+            try:
+                re.compile(rule.pattern)
+            except re.error as e:
+                raise ValueError(f"Guardrail rule {rule.id!r}: invalid pattern: {e}") from e
+        seen.add(rule.id)
+        rules.append(rule)
+    return rules
+
+def _sequence_anchors(items: list) -> list[str] | None:
+    prefix: list[str] = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            prefix.append(chr(av))
+            continue
+        if not prefix and op is sre_constants.SUBPATTERN:
+            return _sequence_anchors(list(av[-1]))
+        if not prefix and op is sre_constants.BRANCH:
+            branches = [_sequence_anchors(list(branch)) for branch in av[1]]
+            if any(b is None for b in branches):
+                return None
+            return [a for b in branches if b is not None for a in b]
+        break
+    literal = "".join(prefix).lower()
+    return [literal] if len(literal) >= _MIN_ANCHOR else None
+
+def literal_anchors(pattern: str) -> list[str] | None:
+    """
+    Literal prefixes one of which every match of `pattern` must start with, e.g.
+    "drop (table|database)" -> ["drop table", "drop database"]; None when there is no usable prefix.
+    """
+    if sre_parse is None:
+        return None
+    try:
+        return _sequence_anchors(list(sre_parse.parse(pattern, re.IGNORECASE)))
+    except (re.error, TypeError, ValueError):
+        return None
+
+class AhoCorasick:
+    """Multi-keyword automaton: every occurrence of every keyword in one left-to-right pass."""
+    def __init__(self, keywords: Iterable[tuple[str, int]]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[tuple[str, int]]] = [[]]
+        for keyword, payload in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((keyword, payload))
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:  # BFS; the list grows while iterating
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def iter_matches(self, text: str) -> Iterator[tuple[str, int]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        state = 0
+        for ch in text:
+            if state == 0:
+                state = root.get(ch, 0)
+            else:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+class RuleEngine:
+    """
+    Compiles a rule set once. Keywords and the literal prefixes ("anchors") of regex rules go
+    into one Aho-Corasick automaton, so one pass over the question finds every keyword hit and
+    every regex that could possibly match; only those regexes are then run. Regexes without an
+    anchor are searched one by one: an alternation of them would report only the first rule
+    matching at a position and could hide an overlapping block rule behind a warn rule.
+    """
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+        self._compiled: dict[int, re.Pattern] = {}
+        self._unanchored: list[int] = []
+        entries: list[tuple[str, int]] = []
+        for i, rule in enumerate(rules):
+            entries.extend((kw, i) for kw in rule.keywords)
+            if rule.pattern is None:
+                continue
+            self._compiled[i] = re.compile(rule.pattern, re.IGNORECASE)
+            anchors = literal_anchors(rule.pattern)
+            if anchors:
+                entries.extend((a, i) for a in anchors)
+            else:
+                self._unanchored.append(i)
+        self._automaton = AhoCorasick(entries)
+        self._keyword_rank = {(i, kw): n for i, r in enumerate(rules) for n, kw in enumerate(r.keywords)}
+
+    def scan(self, text: str) -> list[RuleMatch]:
+        """
+        Matched rules in rule-file order, each with its first matching text (for keyword rules,
+        the earliest-listed keyword found).
+        """
+        found: dict[int, str] = {}
+        candidates: set[int] = set(self._unanchored)
+        for literal, i in self._automaton.iter_matches(text.lower()):
+            if i in self._compiled:
+                candidates.add(i)
+                continue
+            current = found.get(i)
+            if current is None or self._keyword_rank[(i, literal)] < self._keyword_rank[(i, current)]:
+                found[i] = literal
+        for i in candidates:
+            m = self._compiled[i].search(text)
+            if m is not None:
+                found[i] = m.group()
+        return [RuleMatch(self.rules[i], found[i]) for i in sorted(found)]
+
+    def profile(self, texts: list[str], repeat: int = 3) -> list[dict]:
+        """
+        Diagnostic: time each rule on its own over `texts` (best of `repeat`), slowest first.
+        Use it to find the patterns that dominate the combined scan.
+        """
+        lowered = [t.lower() for t in texts]
+        report: list[dict] = []
+        for rule in self.rules:
+            best, matches = float("inf"), 0
+            pattern = re.compile(rule.pattern, re.IGNORECASE) if rule.pattern is not None else None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                if pattern is not None:
+                    matches = sum(pattern.search(t) is not None for t in texts)
+                else:
+                    matches = sum(any(k in t for k in rule.keywords) for t in lowered)
+                best = min(best, time.perf_counter() - t0)
+            report.append({"rule": rule.id, "us_per_text": round(best * 1e6 / max(len(texts), 1), 2), "matches": matches})
+        report.sort(key=lambda r: r["us_per_text"], reverse=True)
+        return report
@@ -0,0 +1,59 @@
+import time
+from contextvars import ContextVar
+
+from app.core.metrics import STAGE_SECONDS
+
+SERVER_TIMING_HEADER = "server-timing"
+
+_current: ContextVar["RequestTimings | None"] = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Per-request stage durations (seconds, summed when a stage runs more than once)."""
+    __slots__ = ("start", "stages")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_ms(self) -> dict[str, float]:
+        out = {stage: round(s * 1000, 3) for stage, s in self.stages.items()}
+        out["total"] = round((time.perf_counter() - self.start) * 1000, 3)
+        return out
+
+    def header(self) -> str:
+        """`Server-Timing` value, e.g. `guardrails;dur=0.2, retrieve;dur=41.3, llm;dur=812.0, total;dur=855.1`."""
+        return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in self.as_ms().items())
+
+def start_request() -> RequestTimings:
+    """Start collecting spans for the current request (context); returns the collector."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+class span:
+    """
+    `with span("embed"): ...` times a pipeline stage into the current request's timings (if any)
+    and the `ka_stage_duration_seconds` histogram. Cost is two perf_counter calls and a dict update.
+    """
+    __slots__ = ("stage", "_t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "span":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self._t0
+        timings = _current.get()
+        if timings is not None:
+            timings.add(self.stage, elapsed)
+        STAGE_SECONDS.observe(elapsed, self.stage)
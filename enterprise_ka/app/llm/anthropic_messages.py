@@ -1,17 +1,27 @@
-import httpx
+from collections.abc import AsyncIterator
+
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from app.core.metrics import count_retry
 from app.llm.base import LLMClient
+from app.llm.http import HttpClientPool
+from app.llm.sse import iter_sse_json
 
 
 class AnthropicMessagesClient(LLMClient):
-    def __init__(self, api_key: str, model: str, base_url: str = "https://api.anthropic.com"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = "https://api.anthropic.com",
+        http: HttpClientPool | None = None,
+    ):
         self.api_key = api_key
         self.model = model
         self.base_url = base_url.rstrip("/")
+        self.http = http or HttpClientPool()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=0.5, max=4))
-    async def generate(self, system: str, user: str) -> str:
+    def _request(self, system: str, user: str) -> tuple[str, dict, dict]:
         url = f"{self.base_url}/v1/messages"
         headers = {
             "x-api-key": self.api_key,
@@ -24,9 +34,33 @@ class AnthropicMessagesClient(LLMClient):
             "system": system,
             "messages": [{"role": "user", "content": user}],
         }
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(url, headers=headers, json=payload)
+        return url, headers, payload
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(min=0.5, max=4),
+        before_sleep=count_retry("anthropic", "messages"),
+    )
+    async def generate(self, system: str, user: str) -> str:
+        url, headers, payload = self._request(system, user)
+        r = await self.http.client(self.base_url).post(url, headers=headers, json=payload)
+        r.raise_for_status()
+        data = r.json()
+        # Claude returns a list of content blocks
+        return "".join(block.get("text", "") for block in data.get("content", []))
+
+    async def stream(self, system: str, user: str) -> AsyncIterator[str]:
+        # No retry here: once tokens have been forwarded to the caller a replay would duplicate them.
+        url, headers, payload = self._request(system, user)
+        payload["stream"] = True
+        async with self.http.client(self.base_url).stream("POST", url, headers=headers, json=payload) as r:
             r.raise_for_status()
-            data = r.json()
-            # Claude returns a list of content blocks
-            return "".join(block.get("text", "") for block in data.get("content", []))
+            async for event, data in iter_sse_json(r):
+                if event == "message_stop":
+                    break
+                if event == "error" and data:
+                    raise RuntimeError(f"Anthropic stream error: {data.get('error', {}).get('message', data)}")
+                if event == "content_block_delta" and data:
+                    text = (data.get("delta") or {}).get("text")
+                    if text:
+                        yield text
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
 
 class LLMClient(ABC):
@@ -6,7 +7,14 @@ class LLMClient(ABC):
     async def generate(self, system: str, user: str) -> str:
         raise NotImplementedError
 
+    async def stream(self, system: str, user: str) -> AsyncIterator[str]:
+        # Providers override this with token-level streaming; the fallback yields the full answer once.
+        yield await self.generate(system=system, user=user)
+
 class Embedder(ABC):
+    # Identifies the vector space; cached/persisted vectors are only reused for the same model.
+    model: str = ""
+
     @abstractmethod
     async def embed(self, texts: list[str]) -> list[list[float]]:
         raise NotImplementedError
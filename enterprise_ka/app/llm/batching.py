@@ -0,0 +1,21 @@
+from app.llm.tokens import estimate_tokens
+
+
+def plan_batches(texts: list[str], max_items: int, max_tokens: int) -> list[list[int]]:
+    """
+    Split texts into contiguous batches of indices that respect both an item and an
+    estimated-token budget. A single text over the token budget gets a batch of its own.
+    """
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from functools import partial
+
+from app.llm.base import Embedder
+
+log = logging.getLogger("llm")
+
+
+@dataclass
+class CoalescerStats:
+    texts_requested: int = 0
+    texts_deduped: int = 0
+    upstream_calls: int = 0
+    upstream_texts: int = 0
+
+class CoalescingEmbedder(Embedder):
+    """
+    Wraps an Embedder for the query path: texts arriving within `window_ms` of each other
+    (or until `max_batch` is reached) are sent upstream as one embeddings request and the
+    vectors are fanned back out to the waiting callers. Identical texts already queued or
+    in flight share a single upstream slot. window_ms <= 0 passes calls straight through.
+    """
+    def __init__(self, inner: Embedder, window_ms: float = 2.0, max_batch: int = 64):
+        self.inner = inner
+        self.model = inner.model
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self.stats = CoalescerStats()
+        self._inflight: dict[str, asyncio.Future[list[float]]] = {}
+        self._queued: list[tuple[str, asyncio.Future[list[float]]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.window_s <= 0:
+            return await self.inner.embed(texts)
+        futures = [self._submit(text) for text in texts]
+        # shield: a cancelled caller must not cancel a future other callers are waiting on
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def _submit(self, text: str) -> asyncio.Future[list[float]]:
+        self.stats.texts_requested += 1
+        future = self._inflight.get(text)
+        if future is not None:
+            self.stats.texts_deduped += 1
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[text] = future
+        self._queued.append((text, future))
+        if len(self._queued) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queued = self._queued, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(partial(self._run_done, batch))
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future[list[float]]]]) -> None:
+        self.stats.upstream_calls += 1
+        self.stats.upstream_texts += len(batch)
+        try:
+            vectors = await self.inner.embed([text for text, _ in batch])
+            if len(vectors) != len(batch):
+                raise ValueError(f"Embeddings response has {len(vectors)} vectors for {len(batch)} texts")
+        except Exception as e:
+            log.warning("coalesced_embed_failed", extra={"batch": len(batch), "error": str(e)})
+            self._settle(batch, error=e)
+            return
+        self._settle(batch, vectors)
+
+    def _run_done(self, batch: list[tuple[str, asyncio.Future[list[float]]]], task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        # Cancelled (e.g. at loop shutdown, possibly before it started) or died of a BaseException:
+        # fail whatever is left so no caller waits forever on a text stuck in _inflight.
+        self._settle(batch, error=RuntimeError("Coalesced embeddings request did not complete"))
+
+    def _settle(
+        self,
+        batch: list[tuple[str, asyncio.Future[list[float]]]],
+        vectors: list[list[float]] | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        for i, (text, future) in enumerate(batch):
+            if self._inflight.get(text) is future:
+                del self._inflight[text]
+            if future.done():
+                continue
+            if vectors is not None:
+                future.set_result(vectors[i])
+            else:
+                future.set_exception(error or RuntimeError("Coalesced embeddings request failed"))
+
+    def snapshot(self) -> dict:
+        s = self.stats
+        return {
+            "window_ms": self.window_s * 1000,
+            "max_batch": self.max_batch,
+            "texts_requested": s.texts_requested,
+            "texts_deduped": s.texts_deduped,
+            "upstream_calls": s.upstream_calls,
+            "upstream_texts": s.upstream_texts,
+            "avg_batch": round(s.upstream_texts / s.upstream_calls, 2) if s.upstream_calls else 0.0,
+        }
@@ -0,0 +1,79 @@
+import importlib.util
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import httpx
+
+if TYPE_CHECKING:
+    from app.core.config import Settings
+
+log = logging.getLogger("llm")
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry_s: float = 30.0
+    http2: bool = False
+    connect_timeout_s: float = 5.0
+    read_timeout_s: float = 30.0
+    write_timeout_s: float = 30.0
+    pool_timeout_s: float = 5.0
+
+class HttpClientPool:
+    """
+    One long-lived httpx.AsyncClient per provider base URL so requests reuse
+    keep-alive connections instead of paying a TCP/TLS handshake each call.
+    Clients are created lazily on first use; `aclose()` is called from the app lifespan.
+    """
+    def __init__(self, config: HttpPoolConfig | None = None, transport: httpx.AsyncBaseTransport | None = None):
+        self.config = config or HttpPoolConfig()
+        self._transport = transport
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._http2 = self.config.http2
+        if self._http2 and importlib.util.find_spec("h2") is None:
+            log.warning("HTTP2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+            self._http2 = False
+
+    def client(self, base_url: str) -> httpx.AsyncClient:
+        key = base_url.rstrip("/")
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            cfg = self.config
+            client = httpx.AsyncClient(
+                http2=self._http2,
+                limits=httpx.Limits(
+                    max_connections=cfg.max_connections,
+                    max_keepalive_connections=cfg.max_keepalive_connections,
+                    keepalive_expiry=cfg.keepalive_expiry_s,
+                ),
+                timeout=httpx.Timeout(
+                    connect=cfg.connect_timeout_s,
+                    read=cfg.read_timeout_s,
+                    write=cfg.write_timeout_s,
+                    pool=cfg.pool_timeout_s,
+                ),
+                transport=self._transport,
+            )
+            self._clients[key] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+def build_http_pool(settings: "Settings") -> HttpClientPool:
+    return HttpClientPool(
+        HttpPoolConfig(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry_s=settings.http_keepalive_expiry_s,
+            http2=settings.http2,
+            connect_timeout_s=settings.http_connect_timeout_s,
+            read_timeout_s=settings.http_read_timeout_s,
+            pool_timeout_s=settings.http_pool_timeout_s,
+        )
+    )
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import os
+import re
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.llm.base import Embedder
+
+if TYPE_CHECKING:
+    from app.core.config import Settings
+
+_NON_WORD = re.compile(r"[\W_]+")
+_PRIME = np.uint64(1_099_511_628_211)  # FNV-64 prime: rolling n-gram hash
+_MIX = np.uint64(0x9E3779B97F4A7C15)  # Fibonacci hashing: top bits of h * _MIX pick the feature
+_PROJECTION_NNZ = 4  # columns each feature contributes to
+
+
+class HashingEmbedder(Embedder):
+    """
+    Embeddings computed in-process on CPU, no network call. Character n-grams of the casefolded
+    text are hashed into 2^bits features, weighted by sublinear tf (times idf when a model file is
+    loaded) and mapped to `dim` dimensions by a fixed sparse random projection: each feature adds
+    +-1/2 to 4 seeded columns. Every step is an array op over the whole batch.
+    Instances only hold read-only arrays, so one embedder can be shared by any number of threads.
+    """
+    def __init__(
+        self,
+        dim: int = 1_024,
+        bits: int = 18,
+        ngrams: tuple[int, int] = (3, 5),
+        seed: int = 0,
+        idf: np.ndarray | None = None,
+        max_batch_items: int = 512,
+        inline_chars: int = 4_096,
+    ):
+        if idf is not None and idf.shape != (1 << bits,):
+            raise ValueError(f"idf must have 2^{bits} entries, got {idf.shape}")
+        self.dim = dim
+        self.bits = bits
+        self.ngrams = ngrams
+        self.seed = seed
+        self.idf = idf
+        self.max_batch_items = max_batch_items
+        # Below this many characters the batch is embedded on the calling thread (cheaper than a thread hop).
+        self.inline_chars = inline_chars
+        # One odd multiplier per projection nonzero: the top bits of feature * multiplier pick its column,
+        # the next bit the sign. Same mapping as a seeded random table, without the table lookups.
+        rng = np.random.default_rng(seed)
+        self._multipliers = rng.integers(1 << 32, 1 << 63, size=_PROJECTION_NNZ, dtype=np.uint64) | np.uint64(1)
+        self.model = f"local-hash-v1-d{dim}-b{bits}-n{ngrams[0]}{ngrams[1]}-s{seed}"
+        if idf is not None:
+            self.model += f"-idf{hashlib.sha256(idf.tobytes()).hexdigest()[:12]}"
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "HashingEmbedder":
+        """An embedder with the idf weights and hashing parameters saved by `save` (see scripts/fit_local_embedder.py)."""
+        with np.load(path) as data:
+            return cls(
+                dim=int(data["dim"]),
+                bits=int(data["bits"]),
+                ngrams=(int(data["ngram_min"]), int(data["ngram_max"])),
+                seed=int(data["seed"]),
+                idf=np.asarray(data["idf"], dtype=np.float32),
+                **kwargs,
+            )
+
+    def save(self, path: str) -> None:
+        if self.idf is None:
+            raise ValueError("Nothing to save: fit idf weights first (HashingEmbedder.fit)")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(
+            path,
+            idf=self.idf,
+            dim=self.dim,
+            bits=self.bits,
+            ngram_min=self.ngrams[0],
+            ngram_max=self.ngrams[1],
+            seed=self.seed,
+        )
+
+    def _features(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """(text index, feature id) of every n-gram occurrence in the batch."""
+        encoded = [f" {_NON_WORD.sub(' ', t.casefold()).strip()} ".encode() for t in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        owner = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        shift = np.uint64(64 - self.bits)
+        docs: list[np.ndarray] = []
+        feats: list[np.ndarray] = []
+        for n in range(self.ngrams[0], self.ngrams[1] + 1):
+            m = buf.shape[0] - n + 1
+            if m <= 0:
+                continue
+            h = np.full(m, n, dtype=np.uint64)  # seeded with n: the same bytes at different n differ
+            for j in range(n):
+                h *= _PRIME
+                h += buf[j:j + m]
+            inside = owner[:m] == owner[n - 1:n - 1 + m]  # drop n-grams spanning two texts
+            docs.append(owner[:m][inside])
+            feats.append(((h[inside] * _MIX) >> shift).astype(np.int64))
+        if not docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(docs), np.concatenate(feats)
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), dim) float32, L2-normalized; all-zero for texts without n-grams."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.max_batch_items):
+            batch = texts[start:start + self.max_batch_items]
+            docs, feats = self._features(batch)
+            keys, tf = np.unique(docs * (1 << self.bits) + feats, return_counts=True)
+            docs, feats = keys >> self.bits, keys & ((1 << self.bits) - 1)
+            weights = (1.0 + np.log(tf)).astype(np.float32)
+            if self.idf is not None:
+                weights *= self.idf[feats]
+            block = self._project(docs, feats, weights, len(batch))
+            out[start:start + len(batch)] = block
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def _project(self, docs: np.ndarray, feats: np.ndarray, weights: np.ndarray, rows: int) -> np.ndarray:
+        """Sum of +-weight/2 over the projection columns of every (text, feature) pair, as (rows, dim)."""
+        base = docs * self.dim
+        ids = feats.astype(np.uint64)
+        cells = np.empty((_PROJECTION_NNZ, ids.shape[0]), dtype=np.int64)
+        values = np.empty((_PROJECTION_NNZ, ids.shape[0]), dtype=np.float32)
+        half = weights * np.float32(1.0 / np.sqrt(_PROJECTION_NNZ))
+        for k, multiplier in enumerate(self._multipliers):
+            h = ids * multiplier
+            cells[k] = base + ((h >> np.uint64(40)) % np.uint64(self.dim)).astype(np.int64)
+            values[k] = np.where(h & np.uint64(1 << 39), half, -half)
+        block = np.bincount(cells.ravel(), weights=values.ravel(), minlength=rows * self.dim)
+        return block.reshape(rows, self.dim)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if sum(len(t) for t in texts) <= self.inline_chars:
+            return self.embed_array(texts).tolist()
+        # CPU-bound: keep the event loop free; NumPy releases the GIL for most of the work.
+        return (await asyncio.to_thread(self.embed_array, texts)).tolist()
+
+    def fit(self, texts: Iterable[str], batch_size: int = 1_024) -> "HashingEmbedder":
+        """A copy of this embedder with smoothed idf weights from `texts` (streamed in batches)."""
+        features = 1 << self.bits
+        df = np.zeros(features, dtype=np.int64)
+        count = 0
+
+        def add(batch: list[str]) -> None:
+            docs, feats = self._features(batch)
+            keys = np.unique(docs * features + feats)
+            df[:] += np.bincount(keys & (features - 1), minlength=features)
+
+        batch: list[str] = []
+        for text in texts:
+            batch.append(text)
+            count += 1
+            if len(batch) >= batch_size:
+                add(batch)
+                batch = []
+        if batch:
+            add(batch)
+        idf = (np.log((1.0 + count) / (1.0 + df)) + 1.0).astype(np.float32)
+        return HashingEmbedder(
+            self.dim, self.bits, self.ngrams, self.seed, idf, self.max_batch_items, self.inline_chars
+        )
+
+def build_local_embedder(settings: "Settings") -> HashingEmbedder:
+    """The local embedder; idf weights and hashing parameters come from LOCAL_EMBED_MODEL_PATH when it exists."""
+    path = settings.local_embed_model_path
+    if path and os.path.isfile(path):
+        return HashingEmbedder.load(path, max_batch_items=settings.embed_batch_size)
+    return HashingEmbedder(dim=settings.local_embed_dim, max_batch_items=settings.embed_batch_size)
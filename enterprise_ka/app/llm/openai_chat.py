@@ -1,17 +1,29 @@
-import httpx
+import asyncio
+from collections.abc import AsyncIterator
+
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from app.core.metrics import count_retry
 from app.llm.base import Embedder, LLMClient
+from app.llm.batching import plan_batches
+from app.llm.http import HttpClientPool
+from app.llm.sse import iter_sse_json
 
 
 class OpenAIChatClient(LLMClient):
-    def __init__(self, api_key: str, model: str, base_url: str = "https://api.openai.com/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = "https://api.openai.com/v1",
+        http: HttpClientPool | None = None,
+    ):
         self.api_key = api_key
         self.model = model
         self.base_url = base_url.rstrip("/")
+        self.http = http or HttpClientPool()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=0.5, max=4))
-    async def generate(self, system: str, user: str) -> str:
+    def _request(self, system: str, user: str) -> tuple[str, dict, dict]:
         url = f"{self.base_url}/chat/completions"
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         payload = {
@@ -22,25 +34,92 @@ class OpenAIChatClient(LLMClient):
             ],
             "temperature": 0.2,
         }
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(url, headers=headers, json=payload)
+        return url, headers, payload
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(min=0.5, max=4),
+        before_sleep=count_retry("openai", "chat"),
+    )
+    async def generate(self, system: str, user: str) -> str:
+        url, headers, payload = self._request(system, user)
+        r = await self.http.client(self.base_url).post(url, headers=headers, json=payload)
+        r.raise_for_status()
+        data = r.json()
+        return data["choices"][0]["message"]["content"]
+
+    async def stream(self, system: str, user: str) -> AsyncIterator[str]:
+        # No retry here: once tokens have been forwarded to the caller a replay would duplicate them.
+        url, headers, payload = self._request(system, user)
+        payload["stream"] = True
+        async with self.http.client(self.base_url).stream("POST", url, headers=headers, json=payload) as r:
             r.raise_for_status()
-            data = r.json()
-            return data["choices"][0]["message"]["content"]
+            async for _, data in iter_sse_json(r):
+                if data is None:  # "data: [DONE]"
+                    break
+                for choice in data.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
 
 class OpenAIEmbedder(Embedder):
-    def __init__(self, api_key: str, model: str, base_url: str = "https://api.openai.com/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = "https://api.openai.com/v1",
+        max_batch_items: int = 256,
+        max_batch_tokens: int = 100_000,
+        max_concurrency: int = 4,
+        http: HttpClientPool | None = None,
+    ):
         self.api_key = api_key
         self.model = model
         self.base_url = base_url.rstrip("/")
+        self.http = http or HttpClientPool()
+        self.max_batch_items = max_batch_items
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=0.5, max=4))
     async def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        batches = plan_batches(texts, self.max_batch_items, self.max_batch_tokens)
+        if len(batches) == 1:
+            return await self._embed_batch(texts)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch: list[int]) -> list[list[float]]:
+            async with semaphore:
+                return await self._embed_batch([texts[i] for i in batch])
+
+        # TaskGroup cancels the remaining batches if one still fails after its retries. Its
+        # ExceptionGroup is unwrapped so callers see the upstream error itself (e.g. the HTTP status).
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(run(batch)) for batch in batches]
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0] from None
+
+        vectors: list[list[float]] = [[] for _ in texts]
+        for batch, task in zip(batches, tasks, strict=True):
+            for i, vector in zip(batch, task.result(), strict=True):
+                vectors[i] = vector
+        return vectors
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(min=0.5, max=4),
+        reraise=True,  # the last upstream error, not tenacity's RetryError
+        before_sleep=count_retry("openai", "embeddings"),
+    )
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
         url = f"{self.base_url}/embeddings"
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         payload = {"model": self.model, "input": texts}
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(url, headers=headers, json=payload)
-            r.raise_for_status()
-            data = r.json()
-            return [item["embedding"] for item in data["data"]]
+        r = await self.http.client(self.base_url).post(url, headers=headers, json=payload)
+        r.raise_for_status()
+        data = r.json()
+        items = sorted(data["data"], key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in items]
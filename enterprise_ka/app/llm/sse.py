@@ -0,0 +1,31 @@
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+
+
+async def iter_sse_json(response: httpx.Response) -> AsyncIterator[tuple[str, dict | None]]:
+    """
+    Parse a text/event-stream response into (event, data) pairs.
+    `data` is the decoded JSON payload, or None for non-JSON sentinels such as `[DONE]`.
+    """
+    event = "message"
+    data_lines: list[str] = []
+    async for line in response.aiter_lines():
+        if line == "":
+            if data_lines:
+                raw = "\n".join(data_lines)
+                try:
+                    yield event, json.loads(raw)
+                except json.JSONDecodeError:
+                    yield event, None
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip())
+    if data_lines:
+        try:
+            yield event, json.loads("\n".join(data_lines))
+        except json.JSONDecodeError:
+            yield event, None
@@ -0,0 +1,3 @@
+def estimate_tokens(text: str) -> int:
+    # ~4 chars/token for English prose with BPE tokenizers; cheap enough for the hot path.
+    return max(1, (len(text) + 3) // 4)
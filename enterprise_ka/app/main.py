@@ -1,60 +1,147 @@
+import asyncio
 import logging
+import secrets
 import time
 from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 
 import httpx
+import numpy as np
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from app.core.config import settings
 from app.core.guardrails import GuardrailFinding, Guardrails
 from app.core.logging import configure_logging
-from app.core.middleware import RequestIdMiddleware
+from app.core.metrics import (
+    ANSWER_CACHE,
+    CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_SECONDS,
+    REQUESTS,
+    snapshot_lines,
+)
+from app.core.middleware import RequestIdMiddleware, ServerTimingMiddleware
+from app.core.responses import FastJSONResponse, dumps
+from app.core.timing import current_timings, span
 from app.llm.anthropic_messages import AnthropicMessagesClient
+from app.llm.base import Embedder
+from app.llm.coalescer import CoalescingEmbedder
+from app.llm.http import build_http_pool
+from app.llm.local_embed import build_local_embedder
 from app.llm.openai_chat import OpenAIChatClient, OpenAIEmbedder
-from app.rag.prompts import build_prompts
-from app.rag.retriever import Retriever
-from app.schemas import AskRequest, AskResponse, Citation, GuardrailEvent, PromptTrace
+from app.rag.ann import build_ann_config
+from app.rag.answer_cache import AnswerCache
+from app.rag.index import DocFilter
+from app.rag.lexical import build_hybrid_config
+from app.rag.packing import pack_context
+from app.rag.prompts import DEFAULT_TEMPLATE, PROMPT_TEMPLATES, build_prompts
+from app.rag.retriever import Retrieval, Retriever, build_query_cache
+from app.schemas import (
+    AskBatchItem,
+    AskBatchRequest,
+    AskBatchResponse,
+    AskRequest,
+    AskResponse,
+    Citation,
+    GuardrailEvent,
+    PromptTrace,
+)
 
-configure_logging(settings.log_level)
+configure_logging(
+    settings.log_level,
+    fmt=settings.log_format,
+    use_queue=settings.log_queue,
+    sample_rate=settings.log_sample_rate,
+    sampled_events=[e.strip() for e in settings.log_sampled_events.split(",") if e.strip()],
+)
 log = logging.getLogger("app")
+ADMIN_TOKEN_HEADER = "x-admin-token"
+http_pool = build_http_pool(settings)
+
+def build_openai_embedder(api_key: str) -> OpenAIEmbedder:
+    return OpenAIEmbedder(
+        api_key,
+        settings.openai_embed_model,
+        settings.openai_base_url,
+        max_batch_items=settings.embed_batch_size,
+        max_batch_tokens=settings.embed_batch_max_tokens,
+        max_concurrency=settings.embed_max_concurrency,
+        http=http_pool,
+    )
+
+def build_embedder() -> Embedder:
+    if settings.embed_provider == "local":
+        # In-process CPU embeddings: no API key and no network call on the query path.
+        return build_local_embedder(settings)
+    if settings.embed_provider == "openai":
+        if not settings.openai_api_key:
+            raise RuntimeError("For embeddings, OPENAI_API_KEY is required (or set EMBED_PROVIDER=local).")
+        return build_openai_embedder(settings.openai_api_key)
+    raise RuntimeError(f"Unsupported EMBED_PROVIDER={settings.embed_provider}")
 
 def build_llm_and_embedder():
     if settings.llm_provider == "openai":
         if not settings.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY is missing")
-        llm = OpenAIChatClient(settings.openai_api_key, settings.openai_model, settings.openai_base_url)
-        embedder = OpenAIEmbedder(settings.openai_api_key, settings.openai_embed_model, settings.openai_base_url)
-        return llm, embedder
+        llm = OpenAIChatClient(settings.openai_api_key, settings.openai_model, settings.openai_base_url, http=http_pool)
+        return llm, build_embedder()
 
     if settings.llm_provider == "anthropic":
         if not settings.anthropic_api_key:
             raise RuntimeError("ANTHROPIC_API_KEY is missing")
-        llm = AnthropicMessagesClient(settings.anthropic_api_key, settings.anthropic_model, settings.anthropic_base_url)
-
-        # For PoC simplicity: still use OpenAI embeddings even if Anthropic is the generator.
-        # In enterprise, you'd standardize embeddings vendor or self-host embeddings.
-        if not settings.openai_api_key:
-            raise RuntimeError("For embeddings, OPENAI_API_KEY is required in this PoC.")
-        embedder = OpenAIEmbedder(settings.openai_api_key, settings.openai_embed_model, settings.openai_base_url)
-        return llm, embedder
+        llm = AnthropicMessagesClient(
+            settings.anthropic_api_key, settings.anthropic_model, settings.anthropic_base_url, http=http_pool
+        )
+        # Anthropic has no embeddings API: OpenAI embeddings, or EMBED_PROVIDER=local for no second vendor.
+        return llm, build_embedder()
 
     raise RuntimeError(f"Unsupported LLM_PROVIDER={settings.llm_provider}")
 
 llm_client, embedder = build_llm_and_embedder()
+query_embedder = CoalescingEmbedder(
+    embedder,
+    # A local query embeds in well under a millisecond: waiting for company would only add latency.
+    window_ms=0 if settings.embed_provider == "local" else settings.embed_coalesce_window_ms,
+    max_batch=settings.embed_coalesce_max_batch,
+)
+query_cache = build_query_cache(settings.query_cache_max_entries, settings.query_cache_max_bytes, settings.query_cache_ttl_s)
 retriever = Retriever(
     docs_dir=settings.docs_dir,
     index_path=settings.index_path,
     embedder=embedder,
     max_chars=settings.chunk_max_chars,
     overlap=settings.chunk_overlap_chars,
+    query_cache=query_cache,
+    query_embedder=query_embedder,
+    ann=build_ann_config(settings),
+    vector_dtype=settings.vector_dtype,
+    rescore_factor=settings.rescore_factor,
+    hybrid=build_hybrid_config(settings),
+    chunk_boundary=settings.chunk_boundary,
+)
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    max_bytes=settings.answer_cache_max_bytes,
+    ttl_s=settings.answer_cache_ttl_s,
+    min_similarity=settings.answer_cache_min_similarity,
 )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # PoC: build/load index at startup for predictable first-request latency.
-    await retriever.warmup()
-    yield
+    # Provider connection pools live for the whole app lifetime and are closed on shutdown.
+    watcher = None
+    try:
+        await retriever.warmup()
+        if settings.index_watch_interval_s > 0:
+            watcher = asyncio.create_task(retriever.watch(settings.index_watch_interval_s))
+        yield
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        await http_pool.aclose()
 
 app = FastAPI(title="Enterprise Knowledge Assistant", version="0.1.0", lifespan=lifespan)
 origins = ["*"] if settings.cors_origins.strip() == "*" else [o.strip() for o in settings.cors_origins.split(",") if o.strip()]
@@ -66,131 +153,449 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(RequestIdMiddleware)
-guardrails = Guardrails(min_relevance_score=settings.min_relevance_score)
+app.add_middleware(ServerTimingMiddleware)
+guardrails = Guardrails(min_relevance_score=settings.min_relevance_score, rules_path=settings.guardrail_rules_path)
 
 def _serialize_guardrails(findings: list[GuardrailFinding]) -> list[GuardrailEvent]:
     return [GuardrailEvent(category=f.category, action=f.action, detail=f.detail) for f in findings]
 
-@app.get("/healthz")
+@app.get("/healthz", response_class=FastJSONResponse)
 async def healthz():
     return {"ok": True}
 
-@app.post("/v1/ask", response_model=AskResponse)
-async def ask(req: AskRequest, request: Request):
-    start = time.time()
-    rid = getattr(request.state, "request_id", "")
-    guardrail_findings: list[GuardrailFinding] = []
+@app.get("/v1/stats", response_class=FastJSONResponse)
+async def stats():
+    return {
+        "query_cache": query_cache.snapshot(),
+        "answer_cache": answer_cache.snapshot(),
+        "query_embedding": query_embedder.snapshot(),
+        "index": retriever.index_info(),
+    }
+
+@app.get("/v1/index", response_class=FastJSONResponse)
+async def index_info():
+    """Active index: version (build id), build timestamp, load time, size, reload count."""
+    return retriever.index_info()
 
+@app.post("/v1/admin/reload", response_class=FastJSONResponse)
+async def reload_index(request: Request, rebuild: bool = False):
+    """
+    Swap in the index currently published at INDEX_PATH (`?rebuild=true`: rebuild it from DOCS_DIR
+    first) without dropping in-flight requests. Requires `x-admin-token: <ADMIN_TOKEN>`.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not secrets.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ""), settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
     try:
-        precheck = guardrails.pre_screen(req.question)
-        guardrail_findings.extend(precheck.findings)
-        if precheck.blocked:
-            latency_ms = int((time.time() - start) * 1000)
-            serialized_guardrails = _serialize_guardrails(guardrail_findings)
-            log.warning(
-                "ask_blocked",
-                extra={
-                    "provider": settings.llm_provider,
-                    "latency_ms": latency_ms,
-                    "findings": [f.model_dump() for f in serialized_guardrails],
-                },
-            )
-            return AskResponse(
-                request_id=rid,
-                answer=precheck.message or "Request blocked by safety policy.",
-                citations=[],
-                latency_ms=latency_ms,
-                guardrails=serialized_guardrails,
-            )
+        return await retriever.reload(rebuild=rebuild)
+    except Exception as e:
+        log.exception("index_reload_failed")
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous index still active: {e}") from e
 
-        top_k = req.top_k or settings.top_k
-        results = await retriever.search(req.question, top_k=top_k)
-
-        if not results:
-            latency_ms = int((time.time() - start) * 1000)
-            serialized_guardrails = _serialize_guardrails(guardrail_findings)
-            return AskResponse(
-                request_id=rid,
-                answer="No documents available to answer this question.",
-                citations=[],
-                latency_ms=latency_ms,
-                guardrails=serialized_guardrails,
-            )
+REGISTRY.set_collector("index", lambda: snapshot_lines("ka_index", retriever.index_info(), counters=("reloads",)))
+REGISTRY.set_collector("query_cache", lambda: snapshot_lines("ka_query_cache", query_cache.snapshot()))
+REGISTRY.set_collector(
+    "answer_cache",
+    lambda: snapshot_lines("ka_answer_cache", answer_cache.snapshot(), counters=("hits", "misses", "evictions", "expirations", "similarity_rejects")),
+)
+REGISTRY.set_collector(
+    "query_embedding",
+    lambda: snapshot_lines(
+        "ka_query_embedding", query_embedder.snapshot(),
+        counters=("texts_requested", "texts_deduped", "upstream_calls", "upstream_texts"),
+    ),
+)
 
-        context_blocks = []
-        citations = []
-        for item, score in results:
-            context_blocks.append({"doc_id": item.doc_id, "chunk_id": item.chunk_id, "text": item.text})
-            citations.append(Citation(doc_id=item.doc_id, chunk_id=item.chunk_id, score=score))
-
-        top_score = citations[0].score if citations else 0.0
-        relevance = guardrails.relevance_guard(top_score)
-        if relevance:
-            guardrail_findings.append(relevance)
-            latency_ms = int((time.time() - start) * 1000)
-            serialized_guardrails = _serialize_guardrails(guardrail_findings)
-            log.info(
-                "ask_low_relevance",
-                extra={
-                    "provider": settings.llm_provider,
-                    "top_k": top_k,
-                    "latency_ms": latency_ms,
-                    "top_score": top_score,
-                    "guardrails": [f.model_dump() for f in serialized_guardrails],
-                },
-            )
-            return AskResponse(
-                request_id=rid,
-                answer="The question looks unrelated to the enterprise knowledge base. Please ask about policies, incidents, or runbooks.",
-                citations=[],
-                latency_ms=latency_ms,
-                guardrails=serialized_guardrails,
-            )
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition: request/stage latency histograms, cache and retry counters."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@dataclass
+class PreparedAsk:
+    """Everything needed to call the LLM, or an early response when the pipeline short-circuits."""
+    request_id: str
+    start: float
+    top_k: int = 0
+    guardrail_findings: list[GuardrailFinding] = field(default_factory=list)
+    citations: list[Citation] = field(default_factory=list)
+    system_prompt: str = ""
+    user_prompt: str = ""
+    prompt_trace: PromptTrace | None = None
+    query_vector: np.ndarray | None = None
+    index_version: str = ""
+    retrieval_mode: str = ""
+    template: str = DEFAULT_TEMPLATE
+    cache_key: tuple = ()
+    early: AskResponse | None = None
+    outcome: str = "ok"  # ok | blocked | no_docs | low_relevance (metrics label)
+
+    def latency_ms(self) -> int:
+        return int((time.time() - self.start) * 1000)
+
+def _screen(req: AskRequest, rid: str, start: float) -> PreparedAsk:
+    """Guardrail pre-screen; sets `early` when the question is blocked."""
+    template = req.prompt_template or settings.prompt_template
+    prepared = PreparedAsk(
+        request_id=rid,
+        start=start,
+        top_k=req.top_k or settings.top_k,
+        template=template if template in PROMPT_TEMPLATES else DEFAULT_TEMPLATE,
+    )
+    guardrail_findings = prepared.guardrail_findings
 
-        safety_notes = [f.detail for f in guardrail_findings if f.action == "warn"]
-        system_prompt, user_prompt, template = build_prompts(
-            req.question,
-            context_blocks,
-            template_name=req.prompt_template or settings.prompt_template,
-            safety_notes=safety_notes,
+    with span("guardrails"):
+        precheck = guardrails.pre_screen(req.question)
+    guardrail_findings.extend(precheck.findings)
+    if precheck.blocked:
+        prepared.outcome = "blocked"
+        latency_ms = prepared.latency_ms()
+        serialized_guardrails = _serialize_guardrails(guardrail_findings)
+        log.warning(
+            "ask_blocked",
+            extra={
+                "provider": settings.llm_provider,
+                "latency_ms": latency_ms,
+                "findings": [f.model_dump() for f in serialized_guardrails],
+            },
         )
-        prompt_trace = PromptTrace(
-            template=template.name,
-            version=template.version,
-            description=template.description,
+        prepared.early = AskResponse(
+            request_id=rid,
+            answer=precheck.message or "Request blocked by safety policy.",
+            citations=[],
+            latency_ms=latency_ms,
+            guardrails=serialized_guardrails,
         )
-        if req.debug_prompt:
-            prompt_trace.system_prompt = system_prompt
-            prompt_trace.user_prompt = user_prompt
+    return prepared
+
+def _doc_filter(req: AskRequest) -> DocFilter | None:
+    doc_filter = DocFilter(
+        doc_ids=tuple(req.doc_ids or ()), prefixes=tuple(req.doc_prefixes or ()), tags=tuple(req.tags or ())
+    )
+    return doc_filter if doc_filter.enabled else None
 
-        answer = await llm_client.generate(system=system_prompt, user=user_prompt)
+async def _prepare(req: AskRequest, rid: str, start: float) -> PreparedAsk:
+    prepared = _screen(req, rid, start)
+    if prepared.early is None:
+        with span("retrieve"):
+            retrieval = await retriever.retrieve(req.question, top_k=prepared.top_k, doc_filter=_doc_filter(req))
+        _apply_retrieval(prepared, req, retrieval)
+    return prepared
+
+def _apply_retrieval(prepared: PreparedAsk, req: AskRequest, retrieval: Retrieval) -> None:
+    """Citations, relevance guard and prompts for a screened question; sets `early` on a short-circuit."""
+    rid, top_k = prepared.request_id, prepared.top_k
+    guardrail_findings = prepared.guardrail_findings
+    results = retrieval.hits
+    prepared.query_vector = retrieval.query_vector
+    prepared.index_version = retrieval.index_version
+    prepared.retrieval_mode = retrieval.mode
+
+    if not results:
+        prepared.outcome = "no_docs"
+        prepared.early = AskResponse(
+            request_id=rid,
+            answer=(
+                "No documents match the requested doc_ids/doc_prefixes/tags."
+                if _doc_filter(req) is not None
+                else "No documents available to answer this question."
+            ),
+            citations=[],
+            latency_ms=prepared.latency_ms(),
+            guardrails=_serialize_guardrails(guardrail_findings),
+        )
+        return
 
-        latency_ms = int((time.time() - start) * 1000)
+    context_blocks = []
+    citations = prepared.citations
+    for item, score in results:
+        context_blocks.append({"doc_id": item.doc_id, "chunk_id": item.chunk_id, "text": item.text})
+        citations.append(Citation(doc_id=item.doc_id, chunk_id=item.chunk_id, score=score))
+
+    top_score = citations[0].score if citations else 0.0
+    relevance = guardrails.relevance_guard(top_score)
+    if relevance:
+        prepared.outcome = "low_relevance"
+        guardrail_findings.append(relevance)
+        latency_ms = prepared.latency_ms()
         serialized_guardrails = _serialize_guardrails(guardrail_findings)
         log.info(
-            "ask_ok",
+            "ask_low_relevance",
             extra={
                 "provider": settings.llm_provider,
                 "top_k": top_k,
                 "latency_ms": latency_ms,
-                "citations": [c.model_dump() for c in citations],
-                "prompt_template": template.name,
+                "top_score": top_score,
                 "guardrails": [f.model_dump() for f in serialized_guardrails],
             },
         )
-
-        return AskResponse(
-            request_id=rid,  # populated by middleware response header; keep body minimal
-            answer=answer,
-            citations=citations,
+        prepared.early = AskResponse(
+            request_id=rid,
+            answer="The question looks unrelated to the enterprise knowledge base. Please ask about policies, incidents, or runbooks.",
+            citations=[],
             latency_ms=latency_ms,
-            prompt=prompt_trace,
             guardrails=serialized_guardrails,
         )
+        return
+
+    with span("prompt"):
+        _render_prompt(prepared, req, context_blocks)
+
+def _render_prompt(prepared: PreparedAsk, req: AskRequest, context_blocks: list[dict]) -> None:
+    citations = prepared.citations
+    # Merge adjacent/overlapping chunks and fit the budget; cite only what the LLM actually sees.
+    packed = pack_context(context_blocks, token_budget=settings.context_token_budget)
+    included = set(packed.chunk_ids)
+    citations[:] = [c for c in citations if c.chunk_id in included]
+
+    safety_notes = [f.detail for f in prepared.guardrail_findings if f.action == "warn"]
+    system_prompt, user_prompt, template = build_prompts(
+        req.question,
+        packed.blocks,
+        template_name=prepared.template,
+        safety_notes=safety_notes,
+    )
+    prompt_trace = PromptTrace(
+        template=template.name,
+        version=template.version,
+        description=template.description,
+        context_tokens=packed.tokens,
+        tokens_saved=packed.tokens_saved,
+    )
+    if req.debug_prompt:
+        prompt_trace.system_prompt = system_prompt
+        prompt_trace.user_prompt = user_prompt
 
+    prepared.system_prompt = system_prompt
+    prepared.user_prompt = user_prompt
+    prepared.prompt_trace = prompt_trace
+    prepared.cache_key = AnswerCache.key(template.name, template.version, [c.chunk_id for c in citations], safety_notes)
+
+def _cached_answer(prepared: PreparedAsk) -> str | None:
+    answer = answer_cache.get(prepared.cache_key, prepared.index_version, prepared.query_vector)
+    if answer_cache.enabled:
+        ANSWER_CACHE.inc(prepared.template, "miss" if answer is None else "hit")
+    return answer
+
+def _store_answer(prepared: PreparedAsk, answer: str) -> None:
+    answer_cache.put(prepared.cache_key, prepared.index_version, prepared.query_vector, answer)
+
+def _log_ask_ok(prepared: PreparedAsk, latency_ms: int, cached: bool, event: str = "ask_ok") -> None:
+    assert prepared.prompt_trace is not None
+    log.info(
+        event,
+        extra={
+            "provider": settings.llm_provider,
+            "top_k": prepared.top_k,
+            "latency_ms": latency_ms,
+            "cached": cached,
+            "retrieval": prepared.retrieval_mode,
+            "citations": [c.model_dump() for c in prepared.citations],
+            "prompt_template": prepared.prompt_trace.template,
+            "context_tokens": prepared.prompt_trace.context_tokens,
+            "tokens_saved": prepared.prompt_trace.tokens_saved,
+            "guardrails": [f.model_dump() for f in _serialize_guardrails(prepared.guardrail_findings)],
+            "timings_ms": timings.as_ms() if (timings := current_timings()) is not None else None,
+        },
+    )
+
+def _observe(endpoint: str, prepared: PreparedAsk | None, outcome: str) -> None:
+    template = prepared.template if prepared is not None else ""
+    REQUESTS.inc(endpoint, settings.llm_provider, template, outcome)
+    if prepared is not None:
+        REQUEST_SECONDS.observe(time.time() - prepared.start, endpoint, settings.llm_provider, outcome)
+
+@app.post("/v1/ask", response_model=AskResponse)
+async def ask(req: AskRequest, request: Request):
+    start = time.time()
+    rid = getattr(request.state, "request_id", "")
+
+    prepared: PreparedAsk | None = None
+    try:
+        prepared = await _prepare(req, rid, start)
+        if prepared.early is not None:
+            _observe("ask", prepared, prepared.outcome)
+            return prepared.early
+        response = await _answer(prepared)
+        _observe("ask", prepared, "ok")
+        return response
+
+    except httpx.HTTPStatusError as e:
+        _observe("ask", prepared, "error")
+        log.exception("upstream_http_error")
+        raise HTTPException(status_code=502, detail=f"Upstream error: {e.response.status_code}") from e
+    except Exception as e:
+        _observe("ask", prepared, "error")
+        log.exception("ask_failed")
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+async def _answer(prepared: PreparedAsk) -> AskResponse:
+    answer = _cached_answer(prepared)
+    cached = answer is not None
+    if answer is None:
+        with span("llm"):
+            answer = await llm_client.generate(system=prepared.system_prompt, user=prepared.user_prompt)
+        _store_answer(prepared, answer)
+
+    latency_ms = prepared.latency_ms()
+    _log_ask_ok(prepared, latency_ms, cached)
+
+    return AskResponse(
+        request_id=prepared.request_id,  # populated by middleware response header; keep body minimal
+        answer=answer,
+        citations=prepared.citations,
+        latency_ms=latency_ms,
+        prompt=prepared.prompt_trace,
+        guardrails=_serialize_guardrails(prepared.guardrail_findings),
+        cached=cached,
+    )
+
+def _error_detail(e: Exception) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"Upstream error: {e.response.status_code}"
+    return str(e) or type(e).__name__
+
+@app.post("/v1/ask/batch", response_model=AskBatchResponse)
+async def ask_batch(req: AskBatchRequest, request: Request):
+    """
+    Answer many questions in one call. All questions are pre-screened, the ones that pass are
+    embedded together and retrieved with one matrix-matrix product, and the LLM calls run with at
+    most ASK_BATCH_LLM_CONCURRENCY in flight. A failing item is reported in its own `error`
+    instead of failing the batch; item request ids are `<request id>-<index>`.
+    """
+    start = time.time()
+    rid = getattr(request.state, "request_id", "")
+    if len(req.items) > settings.ask_batch_max_items:
+        raise HTTPException(status_code=413, detail=f"At most {settings.ask_batch_max_items} items per batch")
+
+    prepared = [_screen(item, f"{rid}-{i}", start) for i, item in enumerate(req.items)]
+    errors: dict[int, str] = {}
+    pending = [i for i, p in enumerate(prepared) if p.early is None]
+    try:
+        with span("retrieve"):
+            retrievals = await retriever.retrieve_many(
+                [req.items[i].question for i in pending],
+                [prepared[i].top_k for i in pending],
+                [_doc_filter(req.items[i]) for i in pending],
+            )
+        for i, retrieval in zip(pending, retrievals, strict=True):
+            _apply_retrieval(prepared[i], req.items[i], retrieval)
+    except Exception as e:
+        log.exception("ask_batch_retrieval_failed")
+        errors.update((i, _error_detail(e)) for i in pending)
+
+    semaphore = asyncio.Semaphore(max(1, settings.ask_batch_llm_concurrency))
+
+    async def answer(i: int) -> AskResponse:
+        async with semaphore:
+            return await _answer(prepared[i])
+
+    generate = [i for i, p in enumerate(prepared) if p.early is None and i not in errors]
+    answers = await asyncio.gather(*(answer(i) for i in generate), return_exceptions=True)
+    responses: dict[int, AskResponse] = {}
+    for i, result in zip(generate, answers, strict=True):
+        if isinstance(result, BaseException):
+            log.error("ask_batch_item_failed", exc_info=result, extra={"item": i})
+            errors[i] = _error_detail(result) if isinstance(result, Exception) else type(result).__name__
+        else:
+            responses[i] = result
+
+    for i, p in enumerate(prepared):
+        _observe("ask_batch", p, "error" if i in errors else p.outcome)
+    items = [
+        AskBatchItem(index=i, error=errors[i]) if i in errors
+        else AskBatchItem(index=i, response=responses.get(i) or p.early)
+        for i, p in enumerate(prepared)
+    ]
+    latency_ms = int((time.time() - start) * 1000)
+    log.info("ask_batch_ok", extra={"items": len(items), "failed": len(errors), "latency_ms": latency_ms})
+    return AskBatchResponse(request_id=rid, items=items, failed=len(errors), latency_ms=latency_ms)
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+@app.post("/v1/ask/stream")
+async def ask_stream(req: AskRequest, request: Request):
+    """
+    Server-Sent Events variant of /v1/ask:
+      event: meta   -> {request_id, citations, guardrails, prompt}   (sent before the LLM call)
+      event: token  -> {text}                                         (one per upstream delta)
+      event: done   -> {latency_ms, first_token_ms}
+      event: error  -> {detail}                                       (stream ends after it)
+    Short-circuited requests (blocked, no docs, low relevance) send meta, one token, done.
+    """
+    start = time.time()
+    rid = getattr(request.state, "request_id", "")
+
+    try:
+        prepared = await _prepare(req, rid, start)
     except httpx.HTTPStatusError as e:
+        _observe("ask_stream", None, "error")
         log.exception("upstream_http_error")
         raise HTTPException(status_code=502, detail=f"Upstream error: {e.response.status_code}") from e
     except Exception as e:
+        _observe("ask_stream", None, "error")
         log.exception("ask_failed")
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+    async def events():
+        if prepared.early is not None:
+            _observe("ask_stream", prepared, prepared.outcome)
+            early = prepared.early
+            yield _sse("meta", {"request_id": rid, "citations": [], "guardrails": [g.model_dump() for g in early.guardrails], "prompt": None})
+            yield _sse("token", {"text": early.answer})
+            yield _sse("done", {"latency_ms": early.latency_ms, "first_token_ms": early.latency_ms})
+            return
+
+        assert prepared.prompt_trace is not None
+        cached_answer = _cached_answer(prepared)
+        yield _sse(
+            "meta",
+            {
+                "request_id": rid,
+                "citations": [c.model_dump() for c in prepared.citations],
+                "guardrails": [g.model_dump() for g in _serialize_guardrails(prepared.guardrail_findings)],
+                "prompt": prepared.prompt_trace.model_dump(),
+                "cached": cached_answer is not None,
+            },
+        )
+        if cached_answer is not None:
+            latency_ms = prepared.latency_ms()
+            yield _sse("token", {"text": cached_answer})
+            _log_ask_ok(prepared, latency_ms, cached=True, event="ask_stream_ok")
+            _observe("ask_stream", prepared, "ok")
+            yield _sse("done", {"latency_ms": latency_ms, "first_token_ms": latency_ms})
+            return
+
+        first_token_ms: int | None = None
+        parts: list[str] = []
+        try:
+            with span("llm"):
+                async for delta in llm_client.stream(system=prepared.system_prompt, user=prepared.user_prompt):
+                    if first_token_ms is None:
+                        first_token_ms = prepared.latency_ms()
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+        except httpx.HTTPStatusError as e:
+            _observe("ask_stream", prepared, "error")
+            log.exception("upstream_http_error")
+            yield _sse("error", {"detail": f"Upstream error: {e.response.status_code}"})
+            return
+        except Exception as e:
+            _observe("ask_stream", prepared, "error")
+            log.exception("ask_stream_failed")
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        _store_answer(prepared, "".join(parts))
+        latency_ms = prepared.latency_ms()
+        _log_ask_ok(prepared, latency_ms, cached=False, event="ask_stream_ok")
+        _observe("ask_stream", prepared, "ok")
+        yield _sse("done", {"latency_ms": latency_ms, "first_token_ms": first_token_ms})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
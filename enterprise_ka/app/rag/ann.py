@@ -0,0 +1,124 @@
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.rag.index import atomic_output, load_npz, normalize_rows, top_k_indices
+
+if TYPE_CHECKING:
+    from app.core.config import Settings
+
+ANN_FILE = "ivf.npz"
+_ASSIGN_BLOCK = 65_536
+
+
+@dataclass(frozen=True)
+class AnnConfig:
+    mode: str = "exact"  # exact | ivf
+    nlist: int = 0  # 0 -> ~4 * sqrt(N)
+    nprobe: int = 8
+    min_chunks: int = 10_000  # below this brute force is already fast enough
+    train_iters: int = 10
+    seed: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "ivf"
+
+def build_ann_config(settings: "Settings") -> AnnConfig:
+    return AnnConfig(
+        mode=settings.ann_mode,
+        nlist=settings.ann_nlist,
+        nprobe=settings.ann_nprobe,
+        min_chunks=settings.ann_min_chunks,
+    )
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], _ASSIGN_BLOCK):
+        block = np.asarray(matrix[start:start + _ASSIGN_BLOCK], dtype=np.float32)
+        labels[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+def train_centroids(matrix: np.ndarray, nlist: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a row sample; rows are already L2-normalized so argmax(dot) == nearest."""
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    sample_size = min(n, max(nlist * 64, 10_000))
+    sample_rows = np.sort(rng.choice(n, size=sample_size, replace=False))
+    sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+
+    centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength=nlist)
+        order = np.argsort(labels, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+        empty = ~nonempty
+        if empty.any():
+            # re-seed empty lists from random sample rows so every list stays useful
+            sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over a VectorIndex matrix: rows are bucketed under their nearest
+    k-means centroid and a query only scores the rows of its `nprobe` closest lists.
+    """
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray, build_id: str = ""):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.build_id = build_id
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, config: AnnConfig, build_id: str = "") -> "IVFIndex":
+        n = matrix.shape[0]
+        nlist = config.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        centroids = train_centroids(matrix, nlist, iters=config.train_iters, seed=config.seed)
+        labels = _assign(matrix, centroids)
+        list_rows = np.argsort(labels, kind="stable").astype(np.int64)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_rows, build_id)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probe = top_k_indices(self.centroids @ query, min(nprobe, self.nlist))
+        rows = [self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe]
+        # sorted rows keep the gather from the (possibly memory-mapped) matrix sequential
+        return np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, top_k: int, nprobe: int) -> tuple[np.ndarray, np.ndarray]:
+        q = normalize_rows(np.asarray(query, dtype=np.float32))
+        rows = self.candidates(q, nprobe)
+        scores = matrix[rows] @ q
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def save(self, index_dir: str) -> None:
+        with atomic_output(os.path.join(index_dir, ANN_FILE)) as path:
+            np.savez(
+                path,
+                centroids=self.centroids,
+                list_offsets=self.list_offsets,
+                list_rows=self.list_rows,
+                build_id=np.array(self.build_id),
+            )
+
+    @classmethod
+    def load(cls, index_dir: str) -> "IVFIndex | None":
+        path = os.path.join(index_dir, ANN_FILE)
+        if not os.path.isfile(path):
+            return None
+        data = load_npz(path)
+        return cls(data["centroids"], data["list_offsets"], data["list_rows"], str(data["build_id"]))
@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.cache import LRUCache
+
+# Replaced index versions remembered as retired; requests still draining on anything older are long done.
+RETIRED_VERSIONS = 8
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    answer: str
+    query_vector: np.ndarray | None
+
+def _sizeof(entry: CachedAnswer) -> int:
+    vector_bytes = entry.query_vector.nbytes if entry.query_vector is not None else 0
+    return len(entry.answer.encode("utf-8")) + vector_bytes + 200
+
+class AnswerCache:
+    """
+    Caches LLM answers keyed by (template name/version, retrieved chunk-id set, safety notes).
+    Paraphrases that retrieve the same chunks under the same template share an answer; when
+    `min_similarity` > 0 the query vectors must also be at least that cosine-similar.
+    Entries belong to one index version and are dropped as soon as a different version is seen;
+    the last RETIRED_VERSIONS replaced versions are not adopted again, so requests still draining
+    on one after a hot reload miss instead of flushing the new version's entries.
+    """
+    def __init__(self, max_entries: int, max_bytes: int, ttl_s: float, min_similarity: float = 0.0):
+        self.min_similarity = min_similarity
+        self.similarity_rejects = 0
+        self._cache: LRUCache[CachedAnswer] = LRUCache(
+            max_entries=max_entries, max_bytes=max_bytes, ttl_s=ttl_s, sizeof=_sizeof
+        )
+        self._index_version = ""
+        self._retired: deque[str] = deque(maxlen=RETIRED_VERSIONS)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.enabled
+
+    @staticmethod
+    def key(template_name: str, template_version: str, chunk_ids: list[str], safety_notes: list[str]) -> tuple:
+        return (template_name, template_version, frozenset(chunk_ids), tuple(safety_notes))
+
+    def invalidate(self, index_version: str = "") -> None:
+        with self._lock:
+            self._cache.clear()
+            self._index_version = index_version
+
+    def _check_version(self, index_version: str) -> bool:
+        """False for a retired (older) index version: skip the cache for that request."""
+        if index_version == self._index_version:
+            return True
+        if index_version in self._retired:
+            return False
+        if self._index_version:
+            self._retired.append(self._index_version)
+        self.invalidate(index_version)
+        return True
+
+    def get(self, key: tuple, index_version: str, query_vector: np.ndarray | None) -> str | None:
+        if not self.enabled or not self._check_version(index_version):
+            return None
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if self.min_similarity > 0:
+            if query_vector is None or entry.query_vector is None:
+                self.similarity_rejects += 1
+                return None
+            a, b = query_vector, entry.query_vector
+            similarity = float(np.dot(a, b) / ((np.linalg.norm(a) * np.linalg.norm(b)) + 1e-12))
+            if similarity < self.min_similarity:
+                self.similarity_rejects += 1
+                return None
+        return entry.answer
+
+    def put(self, key: tuple, index_version: str, query_vector: np.ndarray | None, answer: str) -> None:
+        if not self.enabled or not self._check_version(index_version):
+            return
+        self._cache.put(key, CachedAnswer(answer=answer, query_vector=query_vector))
+
+    def snapshot(self) -> dict:
+        stats = self._cache.snapshot()
+        # A similarity reject is counted as a hit by the LRU but served as a miss.
+        stats["hits"] -= self.similarity_rejects
+        stats["misses"] += self.similarity_rejects
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        stats["similarity_rejects"] = self.similarity_rejects
+        stats["index_version"] = self._index_version
+        return stats
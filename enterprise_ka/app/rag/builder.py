@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.llm.base import Embedder
+from app.rag.chunking import Chunk, iter_file_chunks, read_blocks
+from app.rag.index import (
+    DocSpan,
+    StringTable,
+    StringTableWriter,
+    VectorIndex,
+    iter_doc_paths,
+    load_doc_metadata,
+    normalize_rows,
+)
+
+log = logging.getLogger("rag")
+
+
+@dataclass
+class BuildStats:
+    docs_total: int = 0
+    docs_reused: int = 0
+    docs_changed: int = 0
+    docs_removed: int = 0
+    chunks_total: int = 0
+    chunks_reused: int = 0
+    chunks_embedded: int = 0
+    removed: list[str] = field(default_factory=list)
+
+class SpooledChunkKeys(Mapping[str, list[str]]):
+    """The manifest's {doc_id: chunk keys}, read from a spooled key table one document at a time."""
+    def __init__(self, keys: StringTable, spans: list[DocSpan]):
+        self._keys = keys
+        self._spans = {span.doc_id: span for span in spans}
+
+    def __getitem__(self, doc_id: str) -> list[str]:
+        span = self._spans[doc_id]
+        return [self._keys[row] for row in range(span.start, span.end)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+def content_hash(*parts: str | Iterable[str]) -> str:
+    """sha256 over NUL-terminated parts; an iterable part is hashed block by block (e.g. a file stream)."""
+    h = hashlib.sha256()
+    for part in parts:
+        for block in [part] if isinstance(part, str) else part:
+            h.update(block.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _doc_key_parts(embed_model: str, max_chars: int, overlap: int, boundary: str) -> list[str]:
+    parts = ["doc", embed_model, str(max_chars), str(overlap)]
+    if boundary != "none":  # keeps keys of existing (boundary-less) builds valid
+        parts.append(boundary)
+    return parts
+
+def doc_key(text: str, embed_model: str, max_chars: int, overlap: int, boundary: str = "none") -> str:
+    # A document is reusable as-is only if its content, the chunking and the vector space are unchanged.
+    return content_hash(*_doc_key_parts(embed_model, max_chars, overlap, boundary), text)
+
+def file_doc_key(path: str, embed_model: str, max_chars: int, overlap: int, boundary: str = "none") -> str:
+    """doc_key of a file's contents, streamed so large files are never held in memory."""
+    return content_hash(*_doc_key_parts(embed_model, max_chars, overlap, boundary), read_blocks(path))
+
+def chunk_key(text: str, embed_model: str) -> str:
+    # Vectors depend only on the chunk text and the model, so a chunk whose text survives
+    # a re-chunk (or moves between documents) keeps its cached vector.
+    return content_hash("chunk", embed_model, text)
+
+@dataclass
+class ChunkedDoc:
+    doc_id: str
+    key: str  # doc_key of the file contents
+    path: str = ""
+    # (chunk, chunk_key) pairs; None when `key` matches the previous build and its rows are reused
+    chunks: Iterable[tuple[Chunk, str]] | None = None
+
+def iter_doc_chunks(
+    doc_id: str, path: str, embed_model: str, max_chars: int, overlap: int, boundary: str = "none"
+) -> Iterator[tuple[Chunk, str]]:
+    """(chunk, chunk_key) pairs of a file, streamed."""
+    for chunk in iter_file_chunks(doc_id, path, max_chars=max_chars, overlap=overlap, boundary=boundary):
+        yield chunk, chunk_key(chunk.text, embed_model)
+
+def chunk_doc(
+    doc_id: str,
+    path: str,
+    embed_model: str,
+    max_chars: int,
+    overlap: int,
+    boundary: str = "none",
+    known_key: str = "",
+    lazy: bool = True,
+) -> ChunkedDoc:
+    """Hash a file and, unless it matches `known_key`, chunk it. lazy=False materializes the chunks (for process pools)."""
+    dkey = file_doc_key(path, embed_model, max_chars, overlap, boundary)
+    if dkey == known_key:
+        return ChunkedDoc(doc_id, dkey, path)
+    chunks = iter_doc_chunks(doc_id, path, embed_model, max_chars, overlap, boundary)
+    return ChunkedDoc(doc_id, dkey, path, chunks if lazy else list(chunks))
+
+# Given {doc_id: doc_key} of the previous build, yields every document of the corpus in order.
+Chunker = Callable[[dict[str, str]], Iterable[ChunkedDoc]]
+
+async def build_index(
+    docs_dir: str,
+    embedder: Embedder,
+    max_chars: int,
+    overlap: int,
+    previous: VectorIndex | None = None,
+    previous_manifest: dict | None = None,
+    boundary: str = "none",
+    embed_flush: int = 2048,
+    chunker: Chunker | None = None,
+    spool_dir: str = "",
+) -> tuple[VectorIndex, dict, BuildStats]:
+    """
+    Build a VectorIndex from docs_dir, reusing rows and vectors from `previous` wherever the
+    content-hash manifest says nothing changed. Only new or changed chunks are embedded.
+    Files are streamed: chunks go to the embedder in batches of `embed_flush` texts as they are
+    produced, so no document or corpus is ever held in memory as a whole.
+    `chunker` replaces the default in-process, one-file-at-a-time chunking (e.g. with a process pool).
+    Tags from `<doc_id>.meta.json` sidecars are read on every build; they never change doc keys,
+    so retagging a document does not re-embed it.
+    Chunk ids, texts and chunk keys are spooled to files in `spool_dir` (default: a new temp dir);
+    the returned index and manifest map them, so the caller removes the dir once both are saved.
+    Returns the index, its manifest (to persist alongside it) and build stats.
+    """
+    embed_model = embedder.model
+    spool_dir = spool_dir or tempfile.mkdtemp(prefix="ka-build-")
+    stats = BuildStats()
+    metadata = load_doc_metadata(docs_dir)
+    reuse = previous is not None and previous_manifest is not None and previous_manifest.get("embed_model") == embed_model
+
+    prev_docs: dict[str, DocSpan] = {}
+    prev_rows_by_key: dict[str, int] = {}
+    prev_chunk_keys: dict[str, list[str]] = {}
+    if reuse:
+        assert previous is not None and previous_manifest is not None
+        prev_chunk_keys = previous_manifest.get("chunks", {})
+        for prev_span in previous.docs:
+            doc_keys = prev_chunk_keys.get(prev_span.doc_id, [])
+            if len(doc_keys) != prev_span.end - prev_span.start:
+                continue
+            prev_docs[prev_span.doc_id] = prev_span
+            for offset, key in enumerate(doc_keys):
+                prev_rows_by_key.setdefault(key, prev_span.start + offset)
+
+    # Chunk ids, texts and chunk keys go straight to spool files; per row only its source stays in memory:
+    # from_prev[row] says whether `positions[row]` is a previous row or a position among embedded texts.
+    os.makedirs(spool_dir, exist_ok=True)
+    chunk_ids = StringTableWriter(os.path.join(spool_dir, "chunk_ids.bin"))
+    texts = StringTableWriter(os.path.join(spool_dir, "texts.bin"))
+    keys = StringTableWriter(os.path.join(spool_dir, "chunk_keys.bin"))
+    from_prev_rows = array("b")
+    positions_rows = array("q")
+    spans: list[DocSpan] = []
+    pending: dict[str, int] = {}
+    batch: list[str] = []
+    embedded: list[np.ndarray] = []
+
+    def add_row(chunk_id: str, text: str, key: str, prev_row: int | None) -> None:
+        chunk_ids.append(chunk_id)
+        texts.append(text)
+        keys.append(key)
+        from_prev_rows.append(prev_row is not None)
+        positions_rows.append(prev_row if prev_row is not None else pending[key])
+
+    async def flush() -> None:
+        if batch:
+            embedded.append(normalize_rows(np.asarray(await embedder.embed(batch), dtype=np.float32)))
+            batch.clear()
+
+    if chunker is None:
+        def chunker(known: dict[str, str]) -> Iterable[ChunkedDoc]:
+            for doc_id, path in iter_doc_paths(docs_dir):
+                yield chunk_doc(doc_id, path, embed_model, max_chars, overlap, boundary, known.get(doc_id, ""))
+
+    doc_ids: list[str] = []
+    for doc in chunker({doc_id: span.hash for doc_id, span in prev_docs.items()}):
+        doc_id, dkey = doc.doc_id, doc.key
+        doc_ids.append(doc_id)
+        start = len(keys)
+        span = prev_docs.get(doc_id)
+        if doc.chunks is None:
+            assert previous is not None and span is not None and span.hash == dkey
+            for offset, key in enumerate(prev_chunk_keys[doc_id]):
+                row = span.start + offset
+                add_row(previous.chunk_ids[row], previous.texts[row], key, row)
+            stats.docs_reused += 1
+        else:
+            for chunk, key in doc.chunks:
+                if key in prev_rows_by_key:
+                    add_row(chunk.chunk_id, chunk.text, key, prev_rows_by_key[key])
+                    continue
+                if key not in pending:
+                    pending[key] = len(pending)
+                    batch.append(chunk.text)
+                    if len(batch) >= embed_flush:
+                        await flush()
+                add_row(chunk.chunk_id, chunk.text, key, None)
+            stats.docs_changed += 1
+        tags = metadata.get(doc_id, {}).get("tags", ())
+        spans.append(DocSpan(doc_id=doc_id, start=start, end=len(keys), hash=dkey, tags=tags))
+    await flush()
+
+    from_prev = np.frombuffer(from_prev_rows, dtype=np.int8).astype(bool)
+    positions = np.frombuffer(positions_rows, dtype=np.int64)
+    stats.removed = sorted(set(prev_docs) - set(doc_ids))
+    stats.docs_removed = len(stats.removed)
+    stats.docs_total = len(doc_ids)
+    stats.chunks_total = len(keys)
+    stats.chunks_embedded = len(pending)
+    stats.chunks_reused = int(from_prev.sum())
+
+    new_vectors = np.concatenate(embedded) if embedded else np.zeros((0, 0), dtype=np.float32)
+    embedded.clear()
+
+    dim = new_vectors.shape[1] if pending else (previous.dim if previous is not None else 0)
+    matrix = np.zeros((len(keys), dim), dtype=np.float32)
+    if from_prev.any():
+        assert previous is not None
+        matrix[from_prev] = previous.matrix[positions[from_prev]]
+    if pending:
+        matrix[~from_prev] = new_vectors[positions[~from_prev]]
+
+    index = VectorIndex(
+        matrix,
+        chunk_ids.finish(),
+        texts.finish(),
+        spans,
+        meta={
+            "build_id": uuid.uuid4().hex,
+            "embed_model": embed_model,
+            "chunking": {"max_chars": max_chars, "overlap": overlap, "boundary": boundary},
+        },
+    )
+    manifest = {
+        "embed_model": embed_model,
+        "chunking": {"max_chars": max_chars, "overlap": overlap, "boundary": boundary},
+        "chunks": SpooledChunkKeys(keys.finish(), spans),
+    }
+    log.info(
+        "Index build finished",
+        extra={k: v for k, v in stats.__dict__.items() if k != "removed"},
+    )
+    return index, manifest, stats
@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+from collections.abc import Callable
+
+import numpy as np
+
+from app.llm.base import Embedder
+from app.rag.builder import chunk_key
+
+CHECKPOINT_FILE = "checkpoint.json"
+_VECTORS = "vectors.f32"
+_KEYS = "keys.txt"
+_KEY_BYTES = 65  # sha256 hex + "\n"; fixed width so the file can be truncated to a row count
+
+
+class EmbeddingCheckpoint:
+    """
+    Append-only store of embedded chunk vectors under a staging dir, keyed by `chunk_key`.
+    Each batch is appended to `vectors.f32` / `keys.txt`, fsynced, and only then counted in
+    `checkpoint.json`, so after a crash the files are truncated back to the last committed batch.
+    """
+    def __init__(self, staging_dir: str, embed_model: str):
+        self.staging_dir = staging_dir
+        self.embed_model = embed_model
+        self.rows = 0
+        self.dim = 0
+        self._row_by_key: dict[str, int] = {}
+        self._vectors: np.ndarray | None = None
+        os.makedirs(staging_dir, exist_ok=True)
+        self._open()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.staging_dir, name)
+
+    def _open(self) -> None:
+        try:
+            with open(self._path(CHECKPOINT_FILE), encoding="utf-8") as f:
+                state = json.load(f)
+            rows, dim = int(state["rows"]), int(state["dim"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            state, rows, dim = {}, 0, 0
+        sizes = {_VECTORS: rows * dim * 4, _KEYS: rows * _KEY_BYTES}
+        # A committed batch whose data files are gone or shorter than recorded cannot be trusted: start over.
+        if state.get("embed_model") != self.embed_model or any(
+            not os.path.isfile(self._path(name)) or os.path.getsize(self._path(name)) < size
+            for name, size in sizes.items()
+        ):
+            self._reset()
+            return
+        self.rows, self.dim = rows, dim
+        # Drop anything written after the last committed batch.
+        for name, size in sizes.items():
+            os.truncate(self._path(name), size)
+        with open(self._path(_KEYS), encoding="ascii") as f:
+            self._row_by_key = {line.rstrip("\n"): i for i, line in enumerate(f)}
+
+    def _reset(self) -> None:
+        for name in (_VECTORS, _KEYS, CHECKPOINT_FILE):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        open(self._path(_VECTORS), "wb").close()
+        open(self._path(_KEYS), "wb").close()
+        self.rows, self.dim, self._row_by_key, self._vectors = 0, 0, {}, None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def lookup(self, keys: list[str]) -> dict[int, np.ndarray]:
+        """Vectors for the keys already checkpointed, by position in `keys`."""
+        found = {i: self._row_by_key[k] for i, k in enumerate(keys) if k in self._row_by_key}
+        if not found:
+            return {}
+        if self._vectors is None or self._vectors.shape[0] != self.rows:
+            # Re-mapping after appends is O(1); only the rows looked up are read from disk.
+            self._vectors = np.memmap(self._path(_VECTORS), dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return {i: self._vectors[row] for i, row in found.items()}
+
+    def append(self, keys: list[str], vectors: np.ndarray) -> None:
+        if not keys:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim and vectors.shape[1] != self.dim:
+            raise ValueError(f"Checkpoint holds {self.dim}-dim vectors, got {vectors.shape[1]}")
+        for name, payload in ((_VECTORS, vectors.tobytes()), (_KEYS, "".join(f"{k}\n" for k in keys).encode("ascii"))):
+            with open(self._path(name), "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        for offset, key in enumerate(keys):
+            self._row_by_key.setdefault(key, self.rows + offset)
+        self.rows += len(keys)
+        self.dim = vectors.shape[1]
+        tmp = self._path(CHECKPOINT_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"embed_model": self.embed_model, "rows": self.rows, "dim": self.dim}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(CHECKPOINT_FILE))
+
+    def discard(self) -> None:
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+class CheckpointingEmbedder(Embedder):
+    """
+    Serves texts already in the checkpoint from disk and appends every freshly embedded batch
+    to it, so a re-run after a crash or rate limit only embeds what is still missing.
+    `on_batch(embedded, reused, texts)` is called after each call for progress reporting.
+    """
+    def __init__(
+        self,
+        inner: Embedder,
+        checkpoint: EmbeddingCheckpoint,
+        on_batch: Callable[[int, int, list[str]], None] | None = None,
+    ):
+        self.inner = inner
+        self.model = inner.model
+        self.checkpoint = checkpoint
+        self.on_batch = on_batch
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        keys = [chunk_key(t, self.model) for t in texts]
+        cached = self.checkpoint.lookup(keys)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        fresh: list[list[float]] = []
+        if missing:
+            fresh = await self.inner.embed([texts[i] for i in missing])
+            self.checkpoint.append([keys[i] for i in missing], np.asarray(fresh, dtype=np.float32))
+        out: list[list[float]] = [[] for _ in texts]
+        for i, stored in cached.items():
+            out[i] = stored.tolist()
+        for i, vector in zip(missing, fresh, strict=True):
+            out[i] = vector
+        if self.on_batch is not None:
+            self.on_batch(len(missing), len(cached), [texts[i] for i in missing])
+        return out
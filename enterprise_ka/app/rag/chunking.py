@@ -1,5 +1,14 @@
+import itertools
+import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 
+CHUNK_BOUNDARIES = ("none", "sentence", "paragraph")
+READ_BLOCK_CHARS = 1 << 20
+_MAX_CARRY = 1 << 20  # a whitespace-free run longer than this is flushed mid-token
+_PARAGRAPH_BREAK = re.compile(r"\s*\n\s*\n\s*")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]?(?=\s)")
+
 
 @dataclass(frozen=True)
 class Chunk:
@@ -9,18 +18,108 @@ class Chunk:
 
 def chunk_text(doc_id: str, text: str, max_chars: int, overlap: int) -> list[Chunk]:
     # Simple sliding-window chunker (good enough for PoC)
-    cleaned = " ".join(text.split())
-    chunks: list[Chunk] = []
-    start = 0
-    idx = 0
+    return list(iter_chunks(doc_id, normalize_stream([text]), max_chars=max_chars, overlap=overlap))
+
+def read_blocks(path: str, block_chars: int = READ_BLOCK_CHARS) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        while block := f.read(block_chars):
+            yield block
+
+def _normalize(segment: str, paragraphs: bool) -> str:
+    if not paragraphs:
+        return " ".join(segment.split())
+    return "\n\n".join(p for p in (" ".join(part.split()) for part in _PARAGRAPH_BREAK.split(segment)) if p)
+
+def normalize_stream(blocks: Iterable[str], paragraphs: bool = False) -> Iterator[str]:
+    """
+    Incremental `" ".join(text.split())` over a stream of text blocks: the concatenation of the
+    yielded pieces equals normalizing the whole text at once. With `paragraphs`, blank-line
+    separated paragraphs are kept apart by "\\n\\n" instead of collapsing to one space.
+    """
+    carry = ""
+    emitted = False
+    for block in itertools.chain(blocks, [None]):
+        if block is None:
+            segment, carry = carry, ""
+        else:
+            text = carry + block
+            # Hold back the trailing unfinished word and the whitespace run before it: both may
+            # continue in the next block (and a whitespace run decides " " vs paragraph break).
+            m = len(text)
+            while m > 0 and not text[m - 1].isspace():
+                m -= 1
+            while m > 0 and text[m - 1].isspace():
+                m -= 1
+            if m == 0:
+                if len(text) < _MAX_CARRY:
+                    carry = text
+                    continue
+                m = len(text)
+            segment, carry = text[:m], text[m:]
 
-    while start < len(cleaned):
-        end = min(start + max_chars, len(cleaned))
-        chunk = cleaned[start:end]
-        chunks.append(Chunk(doc_id=doc_id, chunk_id=f"{doc_id}::c{idx}", text=chunk))
-        idx += 1
-        if end == len(cleaned):
-            break
-        start = max(0, end - overlap)
+        out = _normalize(segment, paragraphs)
+        if not out:
+            continue
+        if emitted and segment[:1].isspace():
+            lead = segment[: len(segment) - len(segment.lstrip())]
+            out = ("\n\n" if paragraphs and lead.count("\n") >= 2 else " ") + out
+        emitted = True
+        yield out
+
+def _window_end(buf: str, start: int, max_chars: int, boundary: str) -> int:
+    limit = start + max_chars
+    if boundary == "none":
+        return limit
+    lo = start + max_chars // 2  # never shrink a window below half its size
+    if boundary == "paragraph":
+        pos = buf.rfind("\n\n", lo, limit)
+        if pos > lo:
+            return pos
+    last = None
+    for m in _SENTENCE_END.finditer(buf, lo, limit):
+        last = m
+    return last.end() if last is not None else limit
+
+def iter_chunks(
+    doc_id: str,
+    pieces: Iterable[str],
+    max_chars: int,
+    overlap: int,
+    boundary: str = "none",
+) -> Iterator[Chunk]:
+    """
+    Sliding-window chunks over a stream of normalized text (see `normalize_stream`); only the
+    current window plus one incoming piece is held in memory. With boundary="none" the chunks are
+    identical to windowing the whole text at once. "sentence" / "paragraph" end a window at the
+    last sentence end / blank line in its second half when there is one.
+    """
+    if overlap >= max_chars:
+        raise ValueError(f"overlap ({overlap}) must be smaller than max_chars ({max_chars})")
+    if boundary not in CHUNK_BOUNDARIES:
+        raise ValueError(f"Unknown chunk boundary {boundary!r}; expected one of {CHUNK_BOUNDARIES}")
+
+    idx = 0
+    buf, start = "", 0
+    for piece in itertools.chain(pieces, [None]):
+        if piece is not None:
+            buf, start = buf[start:] + piece, 0
+        # Windows that cannot be the last one; the tail waits for more text or the end of the stream.
+        while len(buf) - start > max_chars or (piece is None and start < len(buf)):
+            end = _window_end(buf, start, max_chars, boundary) if len(buf) - start > max_chars else len(buf)
+            text = buf[start:end] if boundary == "none" else buf[start:end].strip()
+            yield Chunk(doc_id=doc_id, chunk_id=f"{doc_id}::c{idx}", text=text)
+            idx += 1
+            if end == len(buf) and piece is None:
+                break
+            start = max(end - overlap, start + 1)
 
-    return chunks
+def iter_file_chunks(
+    doc_id: str,
+    path: str,
+    max_chars: int,
+    overlap: int,
+    boundary: str = "none",
+    block_chars: int = READ_BLOCK_CHARS,
+) -> Iterator[Chunk]:
+    pieces = normalize_stream(read_blocks(path, block_chars), paragraphs=boundary == "paragraph")
+    return iter_chunks(doc_id, pieces, max_chars=max_chars, overlap=overlap, boundary=boundary)
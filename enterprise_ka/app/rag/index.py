@@ -1,10 +1,37 @@
+import contextlib
 import json
 import os
+import shutil
+import struct
+import time
+import uuid
+import zipfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
+from typing import TextIO
 
 import numpy as np
 
-from app.rag.chunking import Chunk, chunk_text
+from app.rag.chunking import Chunk, iter_file_chunks
+
+# On-disk layout (one directory per index):
+#   meta.json              format/version, shape, docs -> row ranges (+ tags), build info
+#   vectors.npy            float32 (N, dim), L2-normalized, memory-mapped on load
+#   texts.bin / chunk_ids.bin            utf-8 blobs, memory-mapped on load
+#   texts.offsets.npy / chunk_ids.offsets.npy   int64 (N + 1) byte offsets into the blobs
+#   manifest.json          build-time only: content hashes per doc/chunk for incremental rebuilds
+INDEX_FORMAT = "enterprise-ka-index"
+INDEX_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.npy"
+MANIFEST_FILE = "manifest.json"
+ASIDE_SUFFIX = ".old"  # previous plain index dir while a non-versioned save swaps in the new one
+DOC_META_SUFFIX = ".meta.json"  # optional sidecar next to <doc_id>.txt, e.g. {"tags": ["security"]}
+_SCORE_BLOCK_BYTES = 64 << 20  # cap on the (queries, N) float32 score block of a batched search
+_MIN_SLICE_ROWS = 64
+_COPY_BLOCK_BYTES = 16 << 20  # mean range length from which a partition is scored slice by slice
 
 
 @dataclass
@@ -14,35 +41,531 @@ class IndexedChunk:
     text: str
     vector: list[float]
 
-def load_docs_from_dir(docs_dir: str) -> dict[str, str]:
-    docs: dict[str, str] = {}
+@dataclass(frozen=True)
+class DocSpan:
+    doc_id: str
+    start: int
+    end: int
+    hash: str = ""
+    tags: tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class DocFilter:
+    """Scope of a search: documents matching every non-empty field, and any value within a field."""
+    doc_ids: tuple[str, ...] = ()
+    prefixes: tuple[str, ...] = ()
+    tags: tuple[str, ...] = ()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.doc_ids or self.prefixes or self.tags)
+
+class RowPartition:
+    """Rows of the documents selected by a DocFilter, as sorted, disjoint [start, end) row ranges."""
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return int((self.ends - self.starts).sum())
+
+    def rows(self) -> np.ndarray:
+        lengths = self.ends - self.starts
+        # row i of range j is starts[j] + (i - rows before range j)
+        before = np.cumsum(lengths) - lengths
+        return np.arange(len(self), dtype=np.int64) + np.repeat(self.starts - before, lengths)
+
+    def scores(self, matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """`matrix[self.rows()] @ query`; long ranges are scored as slices, skipping the gather copy."""
+        if len(self) < _MIN_SLICE_ROWS * len(self.starts):
+            return matrix[self.rows()] @ query
+        out = np.empty(len(self), dtype=np.float32)
+        pos = 0
+        for start, end in zip(self.starts.tolist(), self.ends.tolist(), strict=True):
+            np.matmul(matrix[start:end], query, out=out[pos:pos + end - start])
+            pos += end - start
+        return out
+
+    def contains(self, rows: np.ndarray) -> np.ndarray:
+        """Boolean mask of the `rows` inside the partition: a binary search over the ranges, not the index."""
+        i = np.searchsorted(self.ends, rows, side="right")
+        inside = i < len(self.ends)
+        inside[inside] = rows[inside] >= self.starts[i[inside]]
+        return inside
+
+def iter_doc_paths(docs_dir: str) -> Iterator[tuple[str, str]]:
+    """(doc_id, path) for every .txt file in docs_dir, without reading them."""
     for name in os.listdir(docs_dir):
         if not name.endswith(".txt"):
             continue
-        path = os.path.join(docs_dir, name)
-        doc_id = name.replace(".txt", "")
+        yield name.replace(".txt", ""), os.path.join(docs_dir, name)
+
+def load_docs_from_dir(docs_dir: str) -> dict[str, str]:
+    docs: dict[str, str] = {}
+    for doc_id, path in iter_doc_paths(docs_dir):
         with open(path, encoding="utf-8") as f:
             docs[doc_id] = f.read()
     return docs
 
+def normalize_tags(tags: object) -> tuple[str, ...]:
+    values = [tags] if isinstance(tags, str) else tags if isinstance(tags, list | tuple) else []
+    return tuple(sorted({str(t).strip().casefold() for t in values if str(t).strip()}))
+
+def load_doc_metadata(docs_dir: str) -> dict[str, dict]:
+    """`<doc_id>.meta.json` sidecars of the documents in docs_dir, by doc_id; tags are normalized."""
+    metadata: dict[str, dict] = {}
+    for doc_id, path in iter_doc_paths(docs_dir):
+        meta_path = path.removesuffix(".txt") + DOC_META_SUFFIX
+        if not os.path.isfile(meta_path):
+            continue
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if not isinstance(meta, dict):
+            raise ValueError(f"{meta_path} must contain a JSON object")
+        metadata[doc_id] = {**meta, "tags": normalize_tags(meta.get("tags", []))}
+    return metadata
+
 def cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
     denom = (np.linalg.norm(a) * np.linalg.norm(b)) + 1e-12
     return float(np.dot(a, b) / denom)
 
-def save_index(index_path: str, items: list[IndexedChunk]) -> None:
-    os.makedirs(os.path.dirname(index_path), exist_ok=True)
-    payload = [item.__dict__ for item in items]
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f)
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    # Same epsilon as cosine_sim so zero vectors score 0 instead of NaN
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return (matrix / (norms + 1e-12)).astype(np.float32, copy=False)
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k scores, best first; ties keep row order like a stable sort."""
+    n = scores.shape[0]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+def top_k_indices_many(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Row-wise `top_k_indices` for a (queries, N) score matrix; same order and tie-breaking."""
+    n = scores.shape[1]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape)
+    order = np.lexsort((candidates, -np.take_along_axis(scores, candidates, axis=1)), axis=-1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+class StringTable:
+    """Variable-length utf-8 strings stored as one blob plus an int64 offsets array."""
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, values: list[str]) -> "StringTable":
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def save(self, index_dir: str, name: str) -> None:
+        with open(os.path.join(index_dir, f"{name}.bin"), "wb") as f:
+            # Block by block: a memory-mapped blob is copied without being read into memory whole.
+            for start in range(0, len(self.blob), _COPY_BLOCK_BYTES):
+                f.write(self.blob[start:start + _COPY_BLOCK_BYTES].tobytes())
+        np.save(os.path.join(index_dir, f"{name}.offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, index_dir: str, name: str, mmap: bool = True) -> "StringTable":
+        blob_path = os.path.join(index_dir, f"{name}.bin")
+        offsets = np.load(os.path.join(index_dir, f"{name}.offsets.npy"), mmap_mode="r" if mmap else None)
+        blob: np.ndarray
+        if mmap and os.path.getsize(blob_path) > 0:
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.fromfile(blob_path, dtype=np.uint8)
+        return cls(blob, offsets)
+
+class StringTableWriter:
+    """
+    Builds a StringTable without holding its strings: each one is appended to the blob file as it
+    arrives and only the int64 offsets stay in memory. `finish` returns the table memory-mapped.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")  # closed by finish()
+        self._offsets = array("q", [0])
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self._file.write(encoded)
+        self._offsets.append(self._offsets[-1] + len(encoded))
 
-def load_index(index_path: str) -> list[IndexedChunk]:
+    def finish(self) -> StringTable:
+        self._file.close()
+        offsets = np.frombuffer(self._offsets, dtype=np.int64)
+        if not offsets[-1]:
+            return StringTable(np.zeros(0, dtype=np.uint8), offsets)
+        return StringTable(np.memmap(self.path, dtype=np.uint8, mode="r"), offsets)
+
+class VectorIndex:
+    """
+    Chunk metadata plus one contiguous (N, dim) float32 matrix of L2-normalized vectors.
+    Rows of a document are contiguous so each doc maps to a row range.
+    Built once at warmup so a query is a single mat-vec product and a partial sort.
+    """
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        chunk_ids: StringTable,
+        texts: StringTable,
+        docs: list[DocSpan],
+        meta: dict | None = None,
+    ):
+        n = matrix.shape[0]
+        if len(chunk_ids) != n or len(texts) != n or (docs and docs[-1].end != n):
+            raise ValueError(f"Index metadata does not match {n} vectors")
+        self.matrix = matrix
+        self.chunk_ids = chunk_ids
+        self.texts = texts
+        self.docs = docs
+        self.meta = meta or {}
+        self._row_doc = np.repeat(np.arange(len(docs)), [d.end - d.start for d in docs])
+        # Filter lookups: doc_id -> position, sorted ids for prefix ranges, tag -> positions.
+        self._doc_pos = {d.doc_id: i for i, d in enumerate(docs)}
+        self._sorted_ids = sorted(self._doc_pos)
+        self._tag_docs: dict[str, list[int]] = {}
+        for i, d in enumerate(docs):
+            for tag in d.tags:
+                self._tag_docs.setdefault(tag, []).append(i)
+
+    @classmethod
+    def from_items(cls, items: list[IndexedChunk], meta: dict | None = None) -> "VectorIndex":
+        # Group rows by document (first-appearance order) so docs are contiguous row ranges.
+        by_doc: dict[str, list[IndexedChunk]] = {}
+        for item in items:
+            by_doc.setdefault(item.doc_id, []).append(item)
+        ordered: list[IndexedChunk] = []
+        docs: list[DocSpan] = []
+        for doc_id, doc_items in by_doc.items():
+            docs.append(DocSpan(doc_id=doc_id, start=len(ordered), end=len(ordered) + len(doc_items)))
+            ordered.extend(doc_items)
+
+        if ordered:
+            matrix = np.ascontiguousarray(normalize_rows(np.asarray([x.vector for x in ordered], dtype=np.float32)))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        return cls(
+            matrix,
+            StringTable.from_strings([x.chunk_id for x in ordered]),
+            StringTable.from_strings([x.text for x in ordered]),
+            docs,
+            meta,
+        )
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @property
+    def build_id(self) -> str:
+        return self.meta.get("build_id", "")
+
+    def chunk(self, row: int) -> Chunk:
+        return Chunk(
+            doc_id=self.docs[self._row_doc[row]].doc_id,
+            chunk_id=self.chunk_ids[row],
+            text=self.texts[row],
+        )
+
+    def partition(self, doc_filter: DocFilter) -> RowPartition:
+        """Row ranges of the documents matching `doc_filter`; costs O(matching docs), never a scan of the rows."""
+        selected: set[int] | None = None
+        if doc_filter.doc_ids:
+            selected = {self._doc_pos[d] for d in doc_filter.doc_ids if d in self._doc_pos}
+        if doc_filter.prefixes:
+            prefixed: set[int] = set()
+            for prefix in doc_filter.prefixes:
+                lo = bisect_left(self._sorted_ids, prefix)
+                hi = bisect_left(self._sorted_ids, prefix + chr(0x10FFFF), lo)
+                prefixed.update(self._doc_pos[d] for d in self._sorted_ids[lo:hi])
+            selected = prefixed if selected is None else selected & prefixed
+        if doc_filter.tags:
+            tagged = {i for tag in normalize_tags(list(doc_filter.tags)) for i in self._tag_docs.get(tag, ())}
+            selected = tagged if selected is None else selected & tagged
+        if selected is None:
+            return RowPartition(np.zeros(1, dtype=np.int64), np.full(1, len(self), dtype=np.int64))
+
+        # Doc positions follow row order, so sorted positions give sorted ranges; merge adjacent docs.
+        starts: list[int] = []
+        ends: list[int] = []
+        for i in sorted(selected):
+            span = self.docs[i]
+            if span.start == span.end:
+                continue
+            if ends and ends[-1] == span.start:
+                ends[-1] = span.end
+            else:
+                starts.append(span.start)
+                ends.append(span.end)
+        return RowPartition(np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64))
+
+    def hits(self, rows: np.ndarray, scores: np.ndarray) -> list[tuple[Chunk, float]]:
+        return [(self.chunk(int(r)), float(s)) for r, s in zip(rows, scores, strict=True)]
+
+    def search(self, query_vector: np.ndarray, top_k: int) -> list[tuple[Chunk, float]]:
+        if len(self) == 0:
+            return []
+        q = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+        scores = self.matrix @ q
+        best = top_k_indices(scores, top_k)
+        return self.hits(best, scores[best])
+
+    def top_k_many(self, query_vectors: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (queries, k) best rows and their scores for a batch of query vectors: one matrix-matrix
+        product per block of queries instead of one mat-vec product per query.
+        """
+        q = normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        k = min(top_k, len(self))
+        rows = np.empty((q.shape[0], max(k, 0)), dtype=np.int64)
+        scores = np.empty(rows.shape, dtype=np.float32)
+        if len(self) == 0 or k <= 0:
+            return rows, scores
+        step = max(1, _SCORE_BLOCK_BYTES // (4 * len(self)))
+        for start in range(0, q.shape[0], step):
+            block = q[start:start + step] @ self.matrix.T
+            best = top_k_indices_many(block, k)
+            rows[start:start + step] = best
+            scores[start:start + step] = np.take_along_axis(block, best, axis=1)
+        return rows, scores
+
+    def search_many(self, query_vectors: np.ndarray, top_k: int) -> list[list[tuple[Chunk, float]]]:
+        rows, scores = self.top_k_many(query_vectors, top_k)
+        return [self.hits(r, s) for r, s in zip(rows, scores, strict=True)]
+
+def is_index_dir(index_dir: str) -> bool:
+    return os.path.isfile(os.path.join(index_dir, META_FILE))
+
+def resolve_index_paths(index_path: str) -> tuple[str, str]:
+    """
+    Map the configured INDEX_PATH to (binary index dir, legacy JSON path).
+    Older configs point at `.../index.json`; the binary index then lives next to it in `.../index/`.
+    """
+    if index_path.endswith(".json"):
+        return index_path[: -len(".json")], index_path
+    return index_path, index_path.rstrip("/\\") + ".json"
+
+def _dump_manifest(manifest: dict, f: TextIO) -> None:
+    # Same output as json.dump, but "chunks" is written one document at a time: the builder
+    # passes a lazy mapping over its spooled chunk keys rather than a dict of every key.
+    f.write("{")
+    for name, value in manifest.items():
+        if name != "chunks":
+            f.write(f"{json.dumps(name)}: {json.dumps(value)}, ")
+    f.write('"chunks": {')
+    for i, (doc_id, keys) in enumerate(manifest.get("chunks", {}).items()):
+        f.write(f"{', ' if i else ''}{json.dumps(doc_id)}: {json.dumps(keys)}")
+    f.write("}}")
+
+def save_index(
+    index_dir: str,
+    index: VectorIndex,
+    manifest: dict | None = None,
+    writers: list[Callable[[str], None]] | None = None,
+    versioned: bool | None = None,
+) -> None:
+    """
+    Write the index to a temp dir and swap it into place. `writers` add derived artifacts
+    (e.g. the ANN lists) to the same directory before the swap so they publish together.
+    With `versioned` (default: when index_dir already is a symlink) the build is kept under
+    `{index_dir}.builds/` and published by atomically repointing the index_dir symlink.
+    """
+    parent = os.path.dirname(os.path.abspath(index_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, VECTORS_FILE), np.ascontiguousarray(index.matrix, dtype=np.float32))
+    index.chunk_ids.save(tmp_dir, "chunk_ids")
+    index.texts.save(tmp_dir, "texts")
+    meta = {
+        **index.meta,
+        "format": INDEX_FORMAT,
+        "version": INDEX_FORMAT_VERSION,
+        "count": len(index),
+        "dim": index.dim,
+        "dtype": "float32",
+        "docs": [d.__dict__ for d in index.docs],
+    }
+    meta.setdefault("build_id", uuid.uuid4().hex)
+    meta.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    if manifest is not None:
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            _dump_manifest(manifest, f)
+    for write in writers or []:
+        write(tmp_dir)
+    index.meta = {k: v for k, v in meta.items() if k != "docs"}
+
+    if versioned is None:
+        versioned = os.path.islink(index_dir)
+    if versioned:
+        publish_index_dir(tmp_dir, index_dir, meta["build_id"])
+        return
+    # Two renames, never a delete before the swap: the previous index is moved aside (not removed)
+    # until the new one is in place, so a crash at any point leaves a complete index on disk
+    # (recover_index_dir moves it back). Use `versioned` for a single atomic symlink swap.
+    recover_index_dir(index_dir)
+    aside = f"{index_dir.rstrip('/')}{ASIDE_SUFFIX}"
+    shutil.rmtree(aside, ignore_errors=True)
+    if os.path.exists(index_dir):
+        os.replace(index_dir, aside)
+    os.replace(tmp_dir, index_dir)
+    shutil.rmtree(aside, ignore_errors=True)
+
+def recover_index_dir(index_dir: str) -> bool:
+    """Restore the index a non-versioned save moved aside, if it crashed before the new one was in place."""
+    aside = f"{index_dir.rstrip('/')}{ASIDE_SUFFIX}"
+    if os.path.lexists(index_dir) or not is_index_dir(aside):
+        return False
+    os.replace(aside, index_dir)
+    return True
+
+def publish_index_dir(staged_dir: str, index_dir: str, build_id: str, keep: int = 2) -> str:
+    """
+    Move a finished index dir to `{index_dir}.builds/{build_id}` and atomically point the
+    `index_dir` symlink at it (rename over the old link), keeping the newest `keep` builds.
+    A plain directory at index_dir (older layout) is moved into the builds dir first.
+    """
+    builds_dir = f"{index_dir.rstrip('/')}.builds"
+    os.makedirs(builds_dir, exist_ok=True)
+    target = os.path.join(builds_dir, build_id)
+    os.replace(staged_dir, target)
+
+    if os.path.isdir(index_dir) and not os.path.islink(index_dir):
+        os.replace(index_dir, os.path.join(builds_dir, f"pre-{uuid.uuid4().hex[:8]}"))
+    link_tmp = f"{index_dir.rstrip('/')}.link-{os.getpid()}"
+    if os.path.lexists(link_tmp):
+        os.unlink(link_tmp)
+    os.symlink(os.path.relpath(target, os.path.dirname(os.path.abspath(index_dir))), link_tmp)
+    os.replace(link_tmp, index_dir)
+
+    builds = sorted(
+        (os.path.join(builds_dir, name) for name in os.listdir(builds_dir)),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    # Old builds stay until pruned; processes with them memory-mapped keep working either way.
+    for old in builds[keep:]:
+        if old != target:
+            shutil.rmtree(old, ignore_errors=True)
+    return target
+
+def load_index(index_dir: str, mmap: bool = True) -> VectorIndex:
+    with open(os.path.join(index_dir, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != INDEX_FORMAT or meta.get("version") != INDEX_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported index format {meta.get('format')!r} v{meta.get('version')} in {index_dir}; rebuild the index"
+        )
+    matrix = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r" if mmap else None)
+    docs = [DocSpan(**{**d, "tags": tuple(d.get("tags", ()))}) for d in meta.pop("docs")]
+    return VectorIndex(
+        matrix,
+        StringTable.load(index_dir, "chunk_ids", mmap=mmap),
+        StringTable.load(index_dir, "texts", mmap=mmap),
+        docs,
+        meta,
+    )
+
+@contextlib.contextmanager
+def atomic_output(path: str) -> Iterator[str]:
+    """
+    Yields a temp path (same dir and extension) to write `path` to; on success it is renamed over
+    `path` in one step, so a reader (or another worker writing the same file) never sees it half-written.
+    """
+    tmp = os.path.join(os.path.dirname(path), f".tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}-{os.path.basename(path)}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def load_npz(path: str, mmap: bool = True) -> dict[str, np.ndarray]:
+    """
+    Arrays of an `np.savez` file. Uncompressed members are memory-mapped straight from the archive,
+    so processes serving the same build share one page-cache copy; 0-d and empty ones are read.
+    """
+    out: dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename.removesuffix(".npy")
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                f.seek(info.header_offset + 26)
+                name_len, extra_len = struct.unpack("<HH", f.read(4))
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                version = np.lib.format.read_magic(f)
+                if version in ((1, 0), (2, 0)):
+                    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+                    shape, fortran, dtype = read_header(f)
+                    if shape and not dtype.hasobject and int(np.prod(shape)) > 0:
+                        out[name] = np.memmap(
+                            path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order="F" if fortran else "C"
+                        )
+                        continue
+            with zf.open(info) as member:
+                out[name] = np.lib.format.read_array(member)
+    return out
+
+def load_manifest(index_dir: str) -> dict | None:
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_json_index(index_path: str) -> list[IndexedChunk]:
     with open(index_path, encoding="utf-8") as f:
         payload = json.load(f)
     return [IndexedChunk(**x) for x in payload]
 
-def build_chunks(docs_dir: str, max_chars: int, overlap: int) -> list[Chunk]:
-    docs = load_docs_from_dir(docs_dir)
+def migrate_json_index(json_path: str, index_dir: str, embed_model: str = "", expect_dim: int = 0) -> VectorIndex:
+    """
+    One-shot conversion of a legacy index.json into the binary format. The JSON does not record its
+    embedding model: `embed_model` is stamped as given, and `expect_dim` rejects vectors of another size.
+    """
+    meta: dict = {"migrated_from": os.path.basename(json_path)}
+    if embed_model:
+        meta["embed_model"] = embed_model
+    index = VectorIndex.from_items(load_json_index(json_path), meta=meta)
+    if expect_dim and index.dim != expect_dim:
+        raise ValueError(f"{json_path} holds {index.dim}-dim vectors, the embedder produces {expect_dim}")
+    save_index(index_dir, index)
+    return load_index(index_dir)
+
+def build_chunks(docs_dir: str, max_chars: int, overlap: int, boundary: str = "none") -> list[Chunk]:
     all_chunks: list[Chunk] = []
-    for doc_id, text in docs.items():
-        all_chunks.extend(chunk_text(doc_id, text, max_chars=max_chars, overlap=overlap))
+    for doc_id, path in iter_doc_paths(docs_dir):
+        all_chunks.extend(iter_file_chunks(doc_id, path, max_chars=max_chars, overlap=overlap, boundary=boundary))
     return all_chunks
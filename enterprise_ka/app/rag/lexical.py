@@ -0,0 +1,200 @@
+import os
+import re
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.rag.index import RowPartition, StringTable, atomic_output, load_npz, top_k_indices
+
+if TYPE_CHECKING:
+    from app.core.config import Settings
+
+LEXICAL_FILE = "bm25.npz"
+# Codes like SEV1, ERR-123, sec_pol.v2 or 10.0.0.1 stay one token; their parts are indexed too.
+_TOKEN = re.compile(r"[^\W_]+(?:[-_.:/][^\W_]+)*")
+_SPLIT = re.compile(r"[-_.:/]")
+
+
+@dataclass(frozen=True)
+class HybridConfig:
+    mode: str = "hybrid"  # hybrid | dense
+    candidates: int = 50  # depth of each ranked list fed into fusion
+    rrf_k: int = 60
+    fast_path_confidence: float = 0.6  # 0 disables the lexical-only path
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "hybrid"
+
+def build_hybrid_config(settings: "Settings") -> HybridConfig:
+    return HybridConfig(
+        mode=settings.retrieval_mode,
+        candidates=settings.hybrid_candidates,
+        rrf_k=settings.hybrid_rrf_k,
+        fast_path_confidence=settings.lexical_fast_path_confidence,
+    )
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for match in _TOKEN.finditer(text.casefold()):
+        token = match.group()
+        tokens.append(token)
+        if _SPLIT.search(token):
+            tokens.extend(p for p in _SPLIT.split(token) if p)
+    return tokens
+
+def is_identifier(raw: str) -> bool:
+    """SEV1, ERR-123, PII, MFA: tokens with digits, underscores or in all caps look like lookup keys."""
+    return any(c.isdigit() for c in raw) or "_" in raw or (len(raw) >= 2 and raw.isupper())
+
+def reciprocal_rank_fusion(rankings: list[np.ndarray], top_k: int, k: int = 60) -> np.ndarray:
+    """Fuse ranked row lists by sum(1 / (k + rank)); ties keep the order rows were first seen."""
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking.tolist()):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank + 1)
+    fused = sorted(scores, key=scores.__getitem__, reverse=True)
+    return np.asarray(fused[:top_k], dtype=np.int64)
+
+@dataclass
+class LexicalResult:
+    rows: np.ndarray
+    scores: np.ndarray
+    confidence: float
+
+class BM25Index:
+    """
+    Okapi BM25 over the index rows as a CSR inverted index: per term a sorted slice of rows
+    and precomputed BM25 weights, so a query is a gather over its terms' postings and one
+    grouped sum. Rows match the VectorIndex rows of the same build.
+    """
+    def __init__(
+        self,
+        terms: list[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        weights: np.ndarray,
+        idf: np.ndarray,
+        build_id: str = "",
+    ):
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.idf = idf
+        self.build_id = build_id
+
+    @classmethod
+    def build(cls, texts: Iterable[str], build_id: str = "", k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        vocab: dict[str, int] = {}
+        term_ids: list[int] = []
+        rows: list[int] = []
+        tfs: list[int] = []
+        lengths: list[int] = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                rows.append(row)
+                tfs.append(tf)
+
+        n, nterms = len(lengths), len(vocab)
+        ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")  # rows stay ascending within each term
+        df = np.bincount(ids, minlength=nterms)
+        offsets = np.zeros(nterms + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        doc_len = np.asarray(lengths, dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n else 0.0
+        posting_rows = np.asarray(rows, dtype=np.int64)[order]
+        freqs = np.asarray(tfs, dtype=np.float32)[order]
+        norm = k1 * (1 - b + b * doc_len[posting_rows] / max(avg_len, 1e-9))
+        weights = (idf[ids[order]] * freqs * (k1 + 1) / (freqs + norm)).astype(np.float32)
+        terms = sorted(vocab, key=vocab.__getitem__)
+        return cls(terms, offsets, posting_rows.astype(np.int32), weights, idf, build_id)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _postings(self, term_id: int) -> slice:
+        return slice(int(self.offsets[term_id]), int(self.offsets[term_id + 1]))
+
+    def search(self, query: str, top_k: int, partition: RowPartition | None = None) -> LexicalResult:
+        """BM25 top_k rows for the query, only among the rows of `partition` when given."""
+        empty = LexicalResult(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), 0.0)
+        raw_tokens = [m.group() for m in _TOKEN.finditer(query)]
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not term_ids or top_k <= 0:
+            return empty
+
+        postings = [self._postings(t) for t in term_ids]
+        all_rows = np.concatenate([self.rows[p] for p in postings])
+        uniq, inverse = np.unique(all_rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate([self.weights[p] for p in postings]))
+        if partition is not None:
+            inside = partition.contains(uniq)
+            uniq, scores = uniq[inside], scores[inside]
+            if not len(uniq):
+                return empty
+        best = top_k_indices(scores, top_k)
+        rows, best_scores = uniq[best].astype(np.int64), scores[best].astype(np.float32)
+
+        identifiers = {self.vocab[t.casefold()] for t in raw_tokens if is_identifier(t) and t.casefold() in self.vocab}
+        return LexicalResult(rows, best_scores, self._confidence(term_ids, identifiers, rows, best_scores))
+
+    def _confidence(self, term_ids: list[int], identifiers: set[int], rows: np.ndarray, scores: np.ndarray) -> float:
+        """
+        How safely the top row can be served without the dense path: zero unless it contains an
+        identifier-like query term; otherwise the idf share of query terms it contains times the
+        score margin over the runner-up.
+        """
+        top = int(rows[0])
+        present = []
+        for t in term_ids:
+            p = self.rows[self._postings(t)]
+            i = int(np.searchsorted(p, top))
+            present.append(i < len(p) and p[i] == top)
+        if not any(ok and t in identifiers for t, ok in zip(term_ids, present, strict=True)):
+            return 0.0
+        idf = self.idf[term_ids]
+        coverage = float(idf[np.asarray(present)].sum() / max(float(idf.sum()), 1e-9))
+        margin = 1.0 - float(scores[1] / scores[0]) if len(scores) > 1 and scores[0] > 0 else 1.0
+        return coverage * margin
+
+    def save(self, index_dir: str) -> None:
+        terms = StringTable.from_strings(self.terms)
+        with atomic_output(os.path.join(index_dir, LEXICAL_FILE)) as path:
+            np.savez(
+                path,
+                terms_blob=terms.blob,
+                terms_offsets=terms.offsets,
+                offsets=self.offsets,
+                rows=self.rows,
+                weights=self.weights,
+                idf=self.idf,
+                build_id=np.array(self.build_id),
+            )
+
+    @classmethod
+    def load(cls, index_dir: str) -> "BM25Index | None":
+        path = os.path.join(index_dir, LEXICAL_FILE)
+        if not os.path.isfile(path):
+            return None
+        data = load_npz(path)
+        table = StringTable(data["terms_blob"], data["terms_offsets"])
+        terms = [table[i] for i in range(len(table))]
+        return cls(terms, data["offsets"], data["rows"], data["weights"], data["idf"], str(data["build_id"]))
+
+def lexical_scores(result: LexicalResult, top_k: int) -> np.ndarray:
+    """Scale BM25 scores to [0, confidence] so fast-path hits are comparable to relevance thresholds."""
+    scores = result.scores[:top_k]
+    if not len(scores) or scores[0] <= 0:
+        return scores
+    return (result.confidence * scores / scores[0]).astype(np.float32)
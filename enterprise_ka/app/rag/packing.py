@@ -0,0 +1,119 @@
+import re
+from dataclasses import dataclass, field
+
+from app.llm.tokens import estimate_tokens
+from app.rag.prompts import format_context
+
+_CHUNK_ORDINAL = re.compile(r"::c(\d+)$")
+_MIN_TRUNCATED_TOKENS = 64  # a partial block shorter than this is dropped instead
+
+
+@dataclass
+class PackedContext:
+    """Context blocks ready for `build_prompts`, plus what packing did to them."""
+    blocks: list[dict]
+    chunk_ids: list[str]  # chunks that made it into the context, in retrieval order
+    tokens: int
+    tokens_saved: int
+    truncated: bool = False
+    dropped: list[str] = field(default_factory=list)
+
+def _ordinal(chunk_id: str) -> int | None:
+    m = _CHUNK_ORDINAL.search(chunk_id)
+    return int(m.group(1)) if m else None
+
+def suffix_prefix_overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b` (KMP prefix function, linear time)."""
+    limit = min(len(a), len(b))
+    if limit == 0:
+        return 0
+    s = b[:limit] + "\0" + a[-limit:]
+    pi = [0] * len(s)
+    for i in range(1, len(s)):
+        k = pi[i - 1]
+        while k and s[i] != s[k]:
+            k = pi[k - 1]
+        if s[i] == s[k]:
+            k += 1
+        pi[i] = k
+    return pi[-1]
+
+def _merge_doc(items: list[tuple[int, int | None, dict]], min_overlap: int) -> list[tuple[int, dict]]:
+    """Merge one document's chunks (sorted by ordinal) into runs of adjacent / overlapping text."""
+    runs: list[tuple[int, dict]] = []
+    prev_ordinal: int | None = None
+    for rank, ordinal, block in items:
+        text = block["text"]
+        if runs:
+            run_rank, run = runs[-1]
+            adjacent = ordinal is not None and prev_ordinal is not None and ordinal == prev_ordinal + 1
+            contained = text in run["text"]
+            k = 0 if contained else suffix_prefix_overlap(run["text"], text)
+            if contained or k >= min_overlap or adjacent:
+                if not contained:
+                    run["text"] += text[k:] if k >= min_overlap else "\n" + text
+                run["chunk_ids"].append(block["chunk_id"])
+                runs[-1] = (min(run_rank, rank), run)
+                prev_ordinal = ordinal
+                continue
+        runs.append((rank, {"doc_id": block["doc_id"], "chunk_ids": [block["chunk_id"]], "text": text}))
+        prev_ordinal = ordinal
+    return runs
+
+def _truncate(block: dict, max_tokens: int) -> dict | None:
+    header_tokens = estimate_tokens(format_context([{**block, "text": ""}]))
+    max_chars = (max_tokens - header_tokens) * 4
+    if max_chars <= 0:
+        return None
+    cut = block["text"].rfind(" ", 0, max_chars)
+    return {**block, "text": block["text"][: cut if cut > 0 else max_chars] + " …"}
+
+def pack_context(context_blocks: list[dict], token_budget: int = 0, min_overlap: int = 16) -> PackedContext:
+    """
+    Pack retrieved chunks ({doc_id, chunk_id, text}, best first) for the prompt: chunks of the
+    same document that are adjacent (consecutive `::c<n>` ids) or overlap by >= `min_overlap`
+    chars are merged in document order with the shared text kept once. Merged blocks are ordered
+    by their best-ranked chunk and added until `token_budget` (estimated tokens, 0 = unlimited) is
+    reached; the block that crosses the budget is truncated at a word boundary.
+    """
+    seen: set[str] = set()
+    by_doc: dict[str, list[tuple[int, int | None, dict]]] = {}
+    for rank, block in enumerate(context_blocks):
+        if block["chunk_id"] in seen:
+            continue
+        seen.add(block["chunk_id"])
+        by_doc.setdefault(block["doc_id"], []).append((rank, _ordinal(block["chunk_id"]), block))
+
+    runs: list[tuple[int, dict]] = []
+    for items in by_doc.values():
+        items.sort(key=lambda x: (x[1] is None, x[1] if x[1] is not None else x[0]))
+        runs.extend(_merge_doc(items, min_overlap))
+    runs.sort(key=lambda r: r[0])
+
+    blocks: list[dict] = []
+    used = 0
+    truncated = False
+    for _, block in runs:
+        cost = estimate_tokens(format_context([block])) + 1  # +1 for the blank line between blocks
+        if token_budget and used + cost > token_budget:
+            remaining = token_budget - used
+            partial = _truncate(block, remaining) if remaining >= _MIN_TRUNCATED_TOKENS or not blocks else None
+            if partial is not None:
+                blocks.append(partial)
+            truncated = True
+            break
+        blocks.append(block)
+        used += cost
+
+    included = {cid for b in blocks for cid in b["chunk_ids"]}
+    seen_order = list(dict.fromkeys(b["chunk_id"] for b in context_blocks))
+    naive_tokens = estimate_tokens(format_context(context_blocks))
+    tokens = estimate_tokens(format_context(blocks))
+    return PackedContext(
+        blocks=blocks,
+        chunk_ids=[cid for cid in seen_order if cid in included],
+        tokens=tokens,
+        tokens_saved=max(0, naive_tokens - tokens),
+        truncated=truncated,
+        dropped=[cid for cid in seen_order if cid not in included],
+    )
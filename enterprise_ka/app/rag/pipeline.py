@@ -0,0 +1,137 @@
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from app.llm.tokens import estimate_tokens
+from app.rag.builder import ChunkedDoc, Chunker, chunk_doc, file_doc_key, iter_doc_chunks
+from app.rag.index import iter_doc_paths
+
+# Files up to this size are chunked in a pool worker and their chunk list shipped back; larger
+# ones are only hashed there and then chunked as a stream by the consumer.
+MAX_POOLED_CHUNK_BYTES = 4 << 20
+
+
+class BuildProgress:
+    """Counters for a running index build; `report` gets a status line at most every `interval_s`."""
+    def __init__(self, report: Callable[[str], None] | None = None, interval_s: float = 5.0):
+        self.report = report
+        self.interval_s = interval_s
+        self.started = time.monotonic()
+        self._last_report = 0.0
+        self.docs_total = self.docs_done = 0
+        self.bytes_total = self.bytes_done = 0
+        self.chunks_embedded = self.chunks_resumed = self.tokens_embedded = 0
+
+    def add_docs(self, paths: list[str]) -> None:
+        self.docs_total += len(paths)
+        self.bytes_total += sum(os.path.getsize(p) for p in paths)
+
+    def doc_done(self, doc: ChunkedDoc) -> None:
+        self.docs_done += 1
+        self.bytes_done += os.path.getsize(doc.path) if doc.path else 0
+        self._maybe_report()
+
+    def batch_done(self, embedded: int, resumed: int, texts: list[str]) -> None:
+        self.chunks_embedded += embedded
+        self.chunks_resumed += resumed
+        self.tokens_embedded += sum(estimate_tokens(t) for t in texts)
+        self._maybe_report()
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        done = self.bytes_done / self.bytes_total if self.bytes_total else 0.0
+        return {
+            "docs": f"{self.docs_done}/{self.docs_total}",
+            "percent": round(100 * done, 1),
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_resumed": self.chunks_resumed,
+            "chunks_per_s": round(self.chunks_embedded / elapsed, 1),
+            "tokens_per_s": round(self.tokens_embedded / elapsed, 1),
+            # Chunking runs at most a few documents ahead of embedding, so bytes chunked track overall progress.
+            "eta_s": round(elapsed * (1 - done) / done, 1) if done > 0 else None,
+        }
+
+    def line(self) -> str:
+        s = self.snapshot()
+        eta = f"{s['eta_s']:.0f}s" if s["eta_s"] is not None else "?"
+        return (
+            f"[{s['percent']:5.1f}%] docs {s['docs']}  embedded {s['chunks_embedded']} (+{s['chunks_resumed']} resumed)"
+            f"  {s['chunks_per_s']} chunks/s  {s['tokens_per_s']} tokens/s  eta {eta}"
+        )
+
+    def _maybe_report(self) -> None:
+        now = time.monotonic()
+        if self.report is not None and now - self._last_report >= self.interval_s:
+            self._last_report = now
+            self.report(self.line())
+
+def _pooled_chunk_doc(
+    doc_id: str,
+    path: str,
+    embed_model: str,
+    max_chars: int,
+    overlap: int,
+    boundary: str,
+    known_key: str,
+    max_pooled_bytes: int,
+) -> ChunkedDoc:
+    if os.path.getsize(path) > max_pooled_bytes:
+        return ChunkedDoc(doc_id, file_doc_key(path, embed_model, max_chars, overlap, boundary), path)
+    return chunk_doc(doc_id, path, embed_model, max_chars, overlap, boundary, known_key, lazy=False)
+
+def parallel_chunker(
+    docs_dir: str,
+    embed_model: str,
+    max_chars: int,
+    overlap: int,
+    boundary: str = "none",
+    workers: int = 0,
+    progress: BuildProgress | None = None,
+    max_pooled_bytes: int = MAX_POOLED_CHUNK_BYTES,
+) -> Chunker:
+    """
+    Chunker for `build_index` that hashes and chunks files in a process pool. At most
+    2 * workers documents are in flight, so chunking stays just ahead of embedding instead of
+    materializing the corpus. A worker returns a file's chunks as one list, so files larger than
+    `max_pooled_bytes` are only hashed in the pool and then streamed through the inline chunker:
+    memory stays bounded by 2 * workers * max_pooled_bytes whatever the file sizes.
+    Documents are yielded in directory order; workers <= 1 runs inline.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def run(known: dict[str, str]) -> Iterator[ChunkedDoc]:
+        docs = list(iter_doc_paths(docs_dir))
+        if progress is not None:
+            progress.add_docs([path for _, path in docs])
+        if workers <= 1:
+            for doc_id, path in docs:
+                doc = chunk_doc(doc_id, path, embed_model, max_chars, overlap, boundary, known.get(doc_id, ""))
+                if progress is not None:
+                    progress.doc_done(doc)
+                yield doc
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = iter(docs)
+            inflight: deque[Future[ChunkedDoc]] = deque()
+
+            def submit() -> None:
+                for doc_id, path in pending:
+                    args = (doc_id, path, embed_model, max_chars, overlap, boundary, known.get(doc_id, ""), max_pooled_bytes)
+                    inflight.append(pool.submit(_pooled_chunk_doc, *args))
+                    return
+
+            for _ in range(2 * workers):
+                submit()
+            while inflight:
+                doc = inflight.popleft().result()
+                submit()
+                if doc.chunks is None and doc.key != known.get(doc.doc_id):
+                    doc.chunks = iter_doc_chunks(doc.doc_id, doc.path, embed_model, max_chars, overlap, boundary)
+                if progress is not None:
+                    progress.doc_done(doc)
+                yield doc
+
+    return run
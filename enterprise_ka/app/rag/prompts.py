@@ -74,10 +74,14 @@ DEFAULT_TEMPLATE = "grounded_concise"
 def list_templates() -> list[tuple[str, str, str]]:
     return [(t.name, t.version, t.description) for t in PROMPT_TEMPLATES.values()]
 
-def _format_context(context_blocks: list[dict]) -> str:
+def format_context(context_blocks: list[dict]) -> str:
+    # Packed blocks (app/rag/packing.py) carry every merged chunk id in `chunk_ids`.
     if not context_blocks:
         return "No context found."
-    return "\n\n".join(f"[{c['doc_id']}::{c['chunk_id']}]\n{c['text']}" for c in context_blocks)
+    return "\n\n".join(
+        "".join(f"[{c['doc_id']}::{cid}]" for cid in c.get("chunk_ids") or [c["chunk_id"]]) + f"\n{c['text']}"
+        for c in context_blocks
+    )
 
 def _format_safety_notes(notes: Iterable[str] | None) -> str:
     data = list(notes or [])
@@ -92,7 +96,7 @@ def build_prompts(
     safety_notes: Iterable[str] | None = None,
 ):
     template = PROMPT_TEMPLATES.get(template_name or DEFAULT_TEMPLATE, PROMPT_TEMPLATES[DEFAULT_TEMPLATE])
-    context_text = _format_context(context_blocks)
+    context_text = format_context(context_blocks)
     safety_text = _format_safety_notes(safety_notes)
 
     system_prompt = template.system_template.format(safety_notes=safety_text)
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+from app.rag.index import atomic_output, top_k_indices
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+_BLOCK = 1_024  # rows decoded to float32 per step; the scratch block stays cache-resident
+
+
+class QuantizedMatrix:
+    """
+    Compressed copy of the normalized index matrix used for candidate scoring.
+    float16 halves the footprint; int8 stores one float32 scale per row (max-abs / 127) and
+    quarters it. int8 also scans faster than float32 (less memory traffic); NumPy's float16
+    decode is slow, so float16 trades latency for memory. The float32 `vectors.npy` stays memory-mapped for the exact rescoring pass,
+    so only the pages of the final candidates are ever read from it.
+    """
+    def __init__(self, dtype: str, codes: np.ndarray, scales: np.ndarray | None = None):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported quantized dtype {dtype!r}")
+        self.dtype = dtype
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray, dtype: str) -> "QuantizedMatrix":
+        if dtype == "float16":
+            return cls(dtype, np.ascontiguousarray(matrix, dtype=np.float16))
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        scales = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], _BLOCK):
+            block = np.asarray(matrix[start:start + _BLOCK], dtype=np.float32)
+            block_scales = np.abs(block).max(axis=1) / 127.0
+            block_scales[block_scales == 0] = 1.0
+            codes[start:start + block.shape[0]] = np.rint(block / block_scales[:, None]).astype(np.int8)
+            scales[start:start + block.shape[0]] = block_scales
+        return cls(dtype, codes, scales)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Approximate dot products of the (normalized) query with all rows, or with `rows`."""
+        q = np.asarray(query, dtype=np.float32)
+        codes = self.codes if rows is None else self.codes[rows]
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        scratch = np.empty((min(_BLOCK, codes.shape[0]), codes.shape[1]), dtype=np.float32)
+        for start in range(0, codes.shape[0], _BLOCK):
+            block = codes[start:start + _BLOCK]
+            decoded = scratch[:block.shape[0]]
+            decoded[...] = block
+            np.matmul(decoded, q, out=out[start:start + block.shape[0]])
+        if self.scales is not None:
+            out *= self.scales if rows is None else self.scales[rows]
+        return out
+
+    def save(self, index_dir: str) -> None:
+        # Scales first: `load` keys off the codes file, so it never pairs new codes with missing scales.
+        if self.scales is not None:
+            with atomic_output(os.path.join(index_dir, f"vectors.{self.dtype}.scales.npy")) as path:
+                np.save(path, self.scales)
+        with atomic_output(os.path.join(index_dir, f"vectors.{self.dtype}.npy")) as path:
+            np.save(path, self.codes)
+
+    @classmethod
+    def load(cls, index_dir: str, dtype: str, mmap: bool = False) -> "QuantizedMatrix | None":
+        path = os.path.join(index_dir, f"vectors.{dtype}.npy")
+        if not os.path.isfile(path):
+            return None
+        codes = np.load(path, mmap_mode="r" if mmap else None)
+        scales_path = os.path.join(index_dir, f"vectors.{dtype}.scales.npy")
+        scales = np.load(scales_path, mmap_mode="r" if mmap else None) if os.path.isfile(scales_path) else None
+        return cls(dtype, codes, scales)
+
+def search_quantized(
+    quantized: QuantizedMatrix,
+    matrix: np.ndarray,
+    query: np.ndarray,
+    top_k: int,
+    rescore_factor: int,
+    rows: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score `rows` (default: all) of the normalized query in compressed space; when rescore_factor > 0
+    the best top_k * rescore_factor candidates are rescored against the float32 `matrix`.
+    """
+    approx = quantized.scores(query, rows)
+    best = top_k_indices(approx, top_k * rescore_factor if rescore_factor > 0 else top_k)
+    candidates = best if rows is None else rows[best]
+    if rescore_factor <= 0:
+        return candidates, approx[best]
+    candidates = np.sort(candidates)  # sequential gather from the memory-mapped matrix
+    exact = matrix[candidates] @ query
+    best = top_k_indices(exact, top_k)
+    return candidates[best], exact[best]
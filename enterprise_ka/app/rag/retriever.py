@@ -1,52 +1,591 @@
+import asyncio
+import contextlib
 import logging
 import os
+import shutil
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
 
 import numpy as np
 
+from app.core.cache import LRUCache
+from app.core.timing import span
 from app.llm.base import Embedder
-from app.rag.index import IndexedChunk, build_chunks, cosine_sim, load_index, save_index
+from app.rag.ann import AnnConfig, IVFIndex
+from app.rag.builder import BuildStats, Chunker, build_index
+from app.rag.chunking import Chunk
+from app.rag.index import (
+    META_FILE,
+    DocFilter,
+    RowPartition,
+    VectorIndex,
+    is_index_dir,
+    load_index,
+    load_manifest,
+    migrate_json_index,
+    normalize_rows,
+    recover_index_dir,
+    resolve_index_paths,
+    save_index,
+    top_k_indices,
+)
+from app.rag.lexical import (
+    BM25Index,
+    HybridConfig,
+    LexicalResult,
+    lexical_scores,
+    reciprocal_rank_fusion,
+)
+from app.rag.quantize import VECTOR_DTYPES, QuantizedMatrix, search_quantized
 
 log = logging.getLogger("rag")
 
+def normalize_query(query: str) -> str:
+    # FAQ-style repeats differ mostly in case and whitespace
+    return " ".join(query.casefold().split())
+
+def build_query_cache(max_entries: int, max_bytes: int, ttl_s: float) -> LRUCache[np.ndarray]:
+    return LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl_s=ttl_s, sizeof=lambda v: v.nbytes + 100)
+
+def _texts(index: VectorIndex) -> Iterator[str]:
+    return (index.texts[i] for i in range(len(index)))
+
+def _timed_lexical(
+    lexical: BM25Index, query: str, top_k: int, partition: RowPartition | None = None
+) -> LexicalResult:
+    # Runs in a worker thread; asyncio.to_thread copies the request context, so the span still lands in it.
+    with span("lexical"):
+        return lexical.search(query, top_k, partition)
+
+class LoopBoundEmbedder(Embedder):
+    """
+    Runs `inner.embed` on `loop` (where its HTTP clients live) for a caller on another thread's
+    event loop: lets an index build run off the serving loop while embedding stays on it.
+    """
+    def __init__(self, inner: Embedder, loop: asyncio.AbstractEventLoop):
+        self.inner = inner
+        self.model = inner.model
+        self.loop = loop
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.inner.embed(texts), self.loop))
+
+@dataclass
+class IndexSnapshot:
+    """A loaded index with its derived structures, swapped in as one unit by warmup/rebuild/reload."""
+    index: VectorIndex
+    ann: IVFIndex | None = None
+    quantized: QuantizedMatrix | None = None
+    lexical: BM25Index | None = None
+    source: str = ""  # resolved directory it was loaded from
+    signature: tuple[str, int] | None = None  # index_signature(index_dir) just before loading
+    loaded_at: float = field(default_factory=time.time)
+    readers: int = 0
+
+    @property
+    def version(self) -> str:
+        return self.index.build_id
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "created_at": self.index.meta.get("created_at", ""),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+            "chunks": len(self.index),
+            "docs": len(self.index.docs),
+            "source": self.source,
+        }
+
+def index_signature(index_dir: str) -> tuple[str, int] | None:
+    """(resolved dir, meta.json mtime): changes whenever an index is published at index_dir."""
+    try:
+        return os.path.realpath(index_dir), os.stat(os.path.join(index_dir, META_FILE)).st_mtime_ns
+    except OSError:
+        return None
+
+@dataclass
+class Retrieval:
+    hits: list[tuple[Chunk, float]]
+    query_vector: np.ndarray | None
+    index_version: str
+    mode: str = "dense"  # dense | hybrid | lexical (fast path, no embedding call)
+
 class Retriever:
-    def __init__(self, docs_dir: str, index_path: str, embedder: Embedder, max_chars: int, overlap: int):
+    def __init__(
+        self,
+        docs_dir: str,
+        index_path: str,
+        embedder: Embedder,
+        max_chars: int,
+        overlap: int,
+        query_cache: LRUCache[np.ndarray] | None = None,
+        query_embedder: Embedder | None = None,
+        ann: AnnConfig | None = None,
+        vector_dtype: str = "float32",
+        rescore_factor: int = 4,
+        hybrid: HybridConfig | None = None,
+        chunk_boundary: str = "none",
+    ):
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"VECTOR_DTYPE must be one of {VECTOR_DTYPES}, got {vector_dtype!r}")
         self.docs_dir = docs_dir
         self.index_path = index_path
+        self.index_dir, self.legacy_index_path = resolve_index_paths(index_path)
         self.embedder = embedder
+        # Query-time embeddings may go through a coalescing wrapper; index builds use `embedder` directly.
+        self.query_embedder = query_embedder or embedder
         self.max_chars = max_chars
         self.overlap = overlap
-        self._index: list[IndexedChunk] | None = None
+        self.chunk_boundary = chunk_boundary
+        self.query_cache = query_cache
+        self.ann = ann or AnnConfig()
+        self.vector_dtype = vector_dtype
+        self.rescore_factor = rescore_factor
+        self.hybrid = hybrid or HybridConfig(mode="dense")
+        self._snapshot: IndexSnapshot | None = None
+        # Swapped-out snapshots that in-flight requests still read; dropped once their readers finish.
+        self._draining: list[IndexSnapshot] = []
+        self._reload_lock = asyncio.Lock()
+        self.reloads = 0
 
     async def warmup(self) -> None:
-        if self._index is not None:
-            return
-        if os.path.exists(self.index_path):
-            self._index = load_index(self.index_path)
-            log.info("Loaded index", extra={"chunks": len(self._index)})
+        if self._snapshot is not None:
             return
+        if recover_index_dir(self.index_dir):
+            log.warning("Restored index moved aside by an interrupted save", extra={"index_dir": self.index_dir})
+        if is_index_dir(self.index_dir):
+            snapshot = self._load_snapshot(self.index_dir)
+            assert snapshot is not None
+            stale = self._stale_reason(snapshot.index)
+            if not stale:
+                self._swap(snapshot)
+                log.info("Loaded index", extra={"chunks": len(self._index)})
+                return
+            # Vectors from another embedding model (e.g. EMBED_PROVIDER changed) are not comparable to queries.
+            log.warning("Index is stale; rebuilding", extra={"reason": stale, "embedder": self.embedder.model})
+        elif os.path.isfile(self.legacy_index_path):
+            try:
+                migrate_json_index(
+                    self.legacy_index_path, self.index_dir, self.embedder.model, expect_dim=await self._embedder_dim()
+                )
+            except ValueError as e:
+                log.warning("Legacy JSON index not migrated; rebuilding", extra={"reason": str(e)})
+            else:
+                self._swap(self._load_snapshot(self.index_dir))
+                log.info("Migrated JSON index", extra={"chunks": len(self._index), "source": self.legacy_index_path})
+                return
 
         # PoC choice: build on startup for small doc sets.
-        chunks = build_chunks(self.docs_dir, max_chars=self.max_chars, overlap=self.overlap)
-        vectors = await self.embedder.embed([c.text for c in chunks])
-
-        self._index = [
-            IndexedChunk(doc_id=c.doc_id, chunk_id=c.chunk_id, text=c.text, vector=v)
-            for c, v in zip(chunks, vectors, strict=True)
-        ]
-        save_index(self.index_path, self._index)
+        await self.rebuild()
         log.info("Built & saved index", extra={"chunks": len(self._index)})
 
-    async def search(self, query: str, top_k: int) -> list[tuple[IndexedChunk, float]]:
+    async def _embedder_dim(self) -> int:
+        """Vector size of the embedder: its `dim` when it has one, otherwise one probe embedding."""
+        dim = getattr(self.embedder, "dim", None)
+        if isinstance(dim, int) and dim > 0:
+            return dim
+        return len((await self.embedder.embed(["dimension probe"]))[0])
+
+    def _stale_reason(self, index: VectorIndex) -> str:
+        """Why `index` cannot serve queries embedded by self.embedder ("" when it can)."""
+        if "embed_model" not in index.meta:
+            return "index does not record its embed_model"
+        if index.meta["embed_model"] != self.embedder.model:
+            return f"built with embed_model {index.meta['embed_model']!r}"
+        dim = getattr(self.embedder, "dim", None)  # no probe call here: a matching model implies the size
+        if isinstance(dim, int) and len(index) and index.dim != dim:
+            return f"index has {index.dim}-dim vectors, the embedder {dim}"
+        return ""
+
+    @property
+    def _index(self) -> VectorIndex:
+        assert self._snapshot is not None
+        return self._snapshot.index
+
+    def _load_snapshot(self, index_dir: str, unless_version: str = "") -> IndexSnapshot | None:
+        """Load index_dir and its derived structures; None when its build is `unless_version`."""
+        signature = index_signature(index_dir)
+        # Resolve once: a publish repointing the index_dir symlink mid-load must not mix two builds.
+        source = os.path.realpath(index_dir)
+        index = load_index(source)
+        if unless_version and index.build_id == unless_version:
+            return None
+        return IndexSnapshot(
+            index=index,
+            ann=self._load_ann(index, source),
+            quantized=self._load_quantized(index, source),
+            lexical=self._load_lexical(index, source),
+            source=source,
+            signature=signature,
+        )
+
+    def _swap(self, snapshot: IndexSnapshot | None) -> None:
+        assert snapshot is not None
+        # A single attribute store: requests that already hold the old snapshot finish on it.
+        old, self._snapshot = self._snapshot, snapshot
+        if old is not None:
+            self._draining.append(old)
+        self._draining = [s for s in self._draining if s.readers > 0]
+
+    @contextlib.contextmanager
+    def _reading(self) -> Iterator[IndexSnapshot]:
+        snapshot = self._snapshot
+        assert snapshot is not None
+        snapshot.readers += 1
+        try:
+            yield snapshot
+        finally:
+            snapshot.readers -= 1
+            if not snapshot.readers and snapshot is not self._snapshot and snapshot in self._draining:
+                self._draining.remove(snapshot)  # last reference from here: the old maps are released
+
+    async def reload(self, rebuild: bool = False) -> dict:
+        """
+        Swap in the index currently published at index_dir (or rebuild it from docs_dir first).
+        Loading, and any IVF/BM25/quantized derivation, runs in a worker thread; searches keep
+        using the current snapshot until the swap and finish on it. One reload runs at a time.
+        """
+        async with self._reload_lock:
+            previous = self.index_version
+            if rebuild:
+                await self.rebuild()
+            elif is_index_dir(self.index_dir):
+                snapshot = await asyncio.to_thread(self._load_snapshot, self.index_dir, previous)
+                if snapshot is not None:
+                    self._swap(snapshot)
+            if self.index_version != previous:
+                self.reloads += 1
+                log.info("Reloaded index", extra={"previous": previous, **self.index_info()})
+            return {**self.index_info(), "changed": self.index_version != previous}
+
+    async def watch(self, interval_s: float) -> None:
+        """Poll index_dir every `interval_s` and reload when a new index is published there."""
+        checked = self._snapshot.signature if self._snapshot is not None else None
+        while True:
+            await asyncio.sleep(interval_s)
+            current = index_signature(self.index_dir)
+            if current is None or current == checked:
+                continue
+            try:
+                await self.reload()
+                checked = current
+            except Exception:
+                log.exception("index_reload_failed")
+
+    def index_info(self) -> dict:
+        if self._snapshot is None:
+            return {"version": "", "reloads": self.reloads, "draining": len(self._draining)}
+        return {**self._snapshot.info(), "reloads": self.reloads, "draining": len(self._draining)}
+
+    async def rebuild(
+        self,
+        chunker: Chunker | None = None,
+        embed_flush: int = 2048,
+        versioned: bool | None = None,
+    ) -> BuildStats:
+        """
+        Incrementally rebuild from docs_dir: only new/changed chunks are embedded.
+        `chunker`, `embed_flush` and `versioned` are passed to build_index / save_index (used by the build CLI).
+        Chunking, matrix assembly, IVF/quantized/BM25 derivation and the publish run in a worker thread
+        (embedding calls are sent back to this loop), so searches keep being served during the build;
+        only the snapshot swap happens here.
+        """
+        embedder = LoopBoundEmbedder(self.embedder, asyncio.get_running_loop())
+        snapshot, stats = await asyncio.to_thread(
+            asyncio.run, self._build_and_publish(embedder, chunker, embed_flush, versioned)
+        )
+        self._swap(snapshot)
+        return stats
+
+    async def _build_and_publish(
+        self, embedder: Embedder, chunker: Chunker | None, embed_flush: int, versioned: bool | None
+    ) -> tuple[IndexSnapshot, BuildStats]:
+        previous, manifest = None, None
+        if is_index_dir(self.index_dir):
+            manifest = load_manifest(self.index_dir)
+            current = self._snapshot
+            previous = current.index if current is not None else load_index(self.index_dir)
+        # Chunk texts are spooled next to the index (same filesystem) and dropped once it is published.
+        spool_dir = f"{self.index_dir.rstrip('/')}.spool-{os.getpid()}"
+        try:
+            index, manifest, stats = await build_index(
+                self.docs_dir,
+                embedder,
+                max_chars=self.max_chars,
+                overlap=self.overlap,
+                previous=previous,
+                previous_manifest=manifest,
+                boundary=self.chunk_boundary,
+                embed_flush=embed_flush,
+                chunker=chunker,
+                spool_dir=spool_dir,
+            )
+            writers: list[Callable[[str], None]] = []
+            if self._wants_ann(index):
+                ann = IVFIndex.build(index.matrix, self.ann, build_id=index.build_id)
+                writers.append(ann.save)
+            if self.vector_dtype != "float32":
+                writers.append(QuantizedMatrix.quantize(index.matrix, self.vector_dtype).save)
+            if self.hybrid.enabled:
+                writers.append(BM25Index.build(_texts(index), build_id=index.build_id).save)
+            save_index(self.index_dir, index, manifest=manifest, writers=writers, versioned=versioned)
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+        snapshot = self._load_snapshot(self.index_dir)
+        assert snapshot is not None
+        return snapshot, stats
+
+    def _wants_ann(self, index: VectorIndex) -> bool:
+        return self.ann.enabled and len(index) >= self.ann.min_chunks
+
+    def _load_ann(self, index: VectorIndex, index_dir: str) -> IVFIndex | None:
+        if not self._wants_ann(index):
+            return None
+        ann = IVFIndex.load(index_dir)
+        if ann is None or ann.build_id != index.build_id:
+            # Index was built without ANN (or by an older build): train the lists once and persist them.
+            # The dir may already be published and mapped by other workers; every artifact `save`
+            # writes a temp file and renames it into place, so no reader sees a partial file.
+            log.info("Building IVF lists", extra={"chunks": len(index)})
+            ann = IVFIndex.build(index.matrix, self.ann, build_id=index.build_id)
+            ann.save(index_dir)
+        return ann
+
+    def _load_quantized(self, index: VectorIndex, index_dir: str) -> QuantizedMatrix | None:
+        if self.vector_dtype == "float32":
+            return None
+        quantized = QuantizedMatrix.load(index_dir, self.vector_dtype, mmap=True)
+        if quantized is None or quantized.codes.shape != index.matrix.shape:
+            log.info("Quantizing vectors", extra={"chunks": len(index), "dtype": self.vector_dtype})
+            quantized = QuantizedMatrix.quantize(index.matrix, self.vector_dtype)
+            quantized.save(index_dir)
+        return quantized
+
+    def _load_lexical(self, index: VectorIndex, index_dir: str) -> BM25Index | None:
+        if not self.hybrid.enabled:
+            return None
+        lexical = BM25Index.load(index_dir)
+        if lexical is None or lexical.build_id != index.build_id:
+            log.info("Building BM25 index", extra={"chunks": len(index)})
+            lexical = BM25Index.build(_texts(index), build_id=index.build_id)
+            lexical.save(index_dir)
+        return lexical
+
+    @property
+    def index_version(self) -> str:
+        return self._snapshot.version if self._snapshot is not None else ""
+
+    async def search(self, query: str, top_k: int, doc_filter: DocFilter | None = None) -> list[tuple[Chunk, float]]:
+        return (await self.retrieve(query, top_k, doc_filter)).hits
+
+    async def retrieve(self, query: str, top_k: int, doc_filter: DocFilter | None = None) -> Retrieval:
+        """
+        Top_k chunks for the query. With a `doc_filter` only the rows of the matching documents are
+        scored (dense and BM25), so a scoped query costs time proportional to its partition.
+        """
+        await self.warmup()
+        with self._reading() as snapshot:
+            return await self._retrieve(snapshot, query, top_k, self._partition(snapshot, doc_filter))
+
+    @staticmethod
+    def _partition(snapshot: IndexSnapshot, doc_filter: DocFilter | None) -> RowPartition | None:
+        if doc_filter is None or not doc_filter.enabled:
+            return None
+        with span("filter"):
+            return snapshot.index.partition(doc_filter)
+
+    async def _retrieve(
+        self, snapshot: IndexSnapshot, query: str, top_k: int, partition: RowPartition | None = None
+    ) -> Retrieval:
+        index = snapshot.index
+        lexical_index = snapshot.lexical
+        if partition is not None and not len(partition):
+            # Nothing matches the filter: no embedding call, no scan.
+            return Retrieval(hits=[], query_vector=None, index_version=index.build_id)
+        if lexical_index is None:
+            q = await self.embed_query(query)
+            with span("search"):
+                rows, scores = self._dense_search(snapshot, q, top_k, partition)
+            return Retrieval(hits=index.hits(rows, scores), query_vector=q, index_version=index.build_id)
+
+        depth = max(top_k, self.hybrid.candidates)
+        # BM25 runs in a worker thread. With the fast path on it is awaited before the query is embedded,
+        # so a hit never sends an embeddings request (in-process BM25 is far cheaper than that round
+        # trip); a miss, or the fast path off, embeds and scans the matrix while BM25 finishes.
+        lexical_task = asyncio.create_task(asyncio.to_thread(_timed_lexical, lexical_index, query, depth, partition))
+        try:
+            if self.hybrid.fast_path_confidence > 0:
+                lexical = await lexical_task
+                if len(lexical.rows) and lexical.confidence >= self.hybrid.fast_path_confidence:
+                    rows = lexical.rows[:top_k]
+                    hits = index.hits(rows, lexical_scores(lexical, top_k))
+                    return Retrieval(hits=hits, query_vector=None, index_version=index.build_id, mode="lexical")
+            q = await self.embed_query(query)
+            with span("search"):
+                dense_rows, _ = self._dense_search(snapshot, q, depth, partition)
+            lexical = await lexical_task
+        finally:
+            lexical_task.cancel()
+        rows = reciprocal_rank_fusion([dense_rows, lexical.rows], top_k, k=self.hybrid.rrf_k)
+        # Fusion decides the order; reported scores stay cosine so the relevance guard keeps its meaning.
+        scores = index.matrix[rows] @ normalize_rows(q) if len(rows) else np.empty(0, dtype=np.float32)
+        return Retrieval(hits=index.hits(rows, scores), query_vector=q, index_version=index.build_id, mode="hybrid")
+
+    async def retrieve_many(
+        self, queries: list[str], top_k: list[int], doc_filters: list[DocFilter | None] | None = None
+    ) -> list[Retrieval]:
+        """
+        `retrieve` for a batch of queries (query i gets its top_k[i] hits, within doc_filters[i]):
+        lexical fast-path hits are served as usual, every other query is embedded in one
+        `embed_queries` call, and with exact float32 search all unfiltered ones are scored by one
+        matrix-matrix product (filtered ones scan only their partition).
+        """
         await self.warmup()
-        assert self._index is not None
+        with self._reading() as snapshot:
+            partitions = [self._partition(snapshot, f) for f in doc_filters or [None] * len(queries)]
+            return await self._retrieve_many(snapshot, queries, top_k, partitions)
+
+    async def _retrieve_many(
+        self,
+        snapshot: IndexSnapshot,
+        queries: list[str],
+        top_k: list[int],
+        partitions: list[RowPartition | None],
+    ) -> list[Retrieval]:
+        index = snapshot.index
+        lexical_index = snapshot.lexical
+        depth = max(max(top_k, default=0), self.hybrid.candidates if lexical_index is not None else 0)
+        results: list[Retrieval | None] = [None] * len(queries)
+        for i, partition in enumerate(partitions):
+            if partition is not None and not len(partition):
+                results[i] = Retrieval(hits=[], query_vector=None, index_version=index.build_id)
+
+        lexical: dict[int, LexicalResult] = {}
+        if lexical_index is not None:
+            todo = [i for i, r in enumerate(results) if r is None]
+            found = await asyncio.to_thread(
+                lambda: [_timed_lexical(lexical_index, queries[i], depth, partitions[i]) for i in todo]
+            )
+            lexical = dict(zip(todo, found, strict=True))
+            if self.hybrid.fast_path_confidence > 0:
+                for i, result in lexical.items():
+                    if len(result.rows) and result.confidence >= self.hybrid.fast_path_confidence:
+                        hits = index.hits(result.rows[:top_k[i]], lexical_scores(result, top_k[i]))
+                        results[i] = Retrieval(hits=hits, query_vector=None, index_version=index.build_id, mode="lexical")
+
+        dense = [i for i, r in enumerate(results) if r is None]
+        vectors = await self.embed_queries([queries[i] for i in dense])
+        with span("search"):
+            searches = self._dense_search_many(snapshot, vectors, depth, [partitions[i] for i in dense])
+        for i, q, (dense_rows, dense_scores) in zip(dense, vectors, searches, strict=True):
+            k = top_k[i]
+            if lexical_index is None:
+                hits = index.hits(dense_rows[:k], dense_scores[:k])
+                results[i] = Retrieval(hits=hits, query_vector=q, index_version=index.build_id)
+                continue
+            rows = reciprocal_rank_fusion([dense_rows, lexical[i].rows], k, k=self.hybrid.rrf_k)
+            scores = index.matrix[rows] @ normalize_rows(q) if len(rows) else np.empty(0, dtype=np.float32)
+            results[i] = Retrieval(hits=index.hits(rows, scores), query_vector=q, index_version=index.build_id, mode="hybrid")
+        return [r for r in results if r is not None]
+
+    def _dense_search_many(
+        self,
+        snapshot: IndexSnapshot,
+        queries: list[np.ndarray],
+        top_k: int,
+        partitions: list[RowPartition | None],
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        # IVF / quantized candidate scoring and filtered searches stay per query;
+        # only the exact scan of the whole index is batched.
+        index = snapshot.index
+        pairs = list(zip(queries, partitions, strict=True))
+        if snapshot.ann is not None or snapshot.quantized is not None or len(index) == 0 or top_k <= 0:
+            return [self._dense_search(snapshot, q, top_k, p) for q, p in pairs]
+        out = [self._dense_search(snapshot, q, top_k, p) if p is not None else None for q, p in pairs]
+        whole = [i for i, p in enumerate(partitions) if p is None]
+        if whole:
+            rows, scores = index.top_k_many(np.stack([queries[i] for i in whole]), top_k)
+            for i, r, sc in zip(whole, rows, scores, strict=True):
+                out[i] = (r, sc)
+        return [r for r in out if r is not None]
+
+    def _dense_search(
+        self, snapshot: IndexSnapshot, query: np.ndarray, top_k: int, partition: RowPartition | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact float32 scan by default. IVF narrows the rows to score; a quantized matrix scores
+        them in compressed space and its top (top_k * rescore_factor) are rescored exactly.
+        A `partition` limits the rows to its documents: small ones are scanned exactly, large ones
+        (at least ANN_MIN_CHUNKS rows) keep the IVF candidates that fall inside it, probing more
+        lists when fewer than top_k of them do.
+        """
+        index = snapshot.index
+        if len(index) == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        q = normalize_rows(np.asarray(query, dtype=np.float32))
+        rows = None
+        if snapshot.ann is not None and (partition is None or len(partition) >= self.ann.min_chunks):
+            rows = snapshot.ann.candidates(q, self.ann.nprobe)
+            if partition is not None:
+                inside = rows[partition.contains(rows)]
+                # The filtered docs can sit outside the probed lists: probe twice as many until top_k rows
+                # match (at nlist every list is probed, i.e. an exact scan of the partition).
+                nprobe = self.ann.nprobe
+                while len(inside) < min(top_k, len(partition)) and nprobe < snapshot.ann.nlist:
+                    nprobe *= 2
+                    rows = snapshot.ann.candidates(q, nprobe)
+                    inside = rows[partition.contains(rows)]
+                rows = inside
+                partition = None
+        elif partition is not None:
+            rows = partition.rows()
+
+        if snapshot.quantized is not None:
+            return search_quantized(snapshot.quantized, index.matrix, q, top_k, self.rescore_factor, rows)
+        if partition is not None:
+            scores = partition.scores(index.matrix, q)
+        else:
+            scores = index.matrix @ q if rows is None else index.matrix[rows] @ q
+        best = top_k_indices(scores, top_k)
+        return (best if rows is None else rows[best]), scores[best]
 
-        q_vec = (await self.embedder.embed([query]))[0]
-        q = np.array(q_vec, dtype=np.float32)
+    async def embed_queries(self, queries: list[str]) -> list[np.ndarray]:
+        """
+        Query vectors for a batch: cache hits and repeated questions are not re-embedded, and the
+        rest go to the embedder in a single call (which splits it into as few requests as its
+        batch limits allow), bypassing the per-request coalescing window.
+        """
+        keys = [(self.embedder.model, normalize_query(q)) for q in queries]
+        found: dict[tuple[str, str], np.ndarray] = {}
+        missing: dict[tuple[str, str], str] = {}
+        for key, query in zip(keys, queries, strict=True):
+            cached = self.query_cache.get(key) if self.query_cache is not None else None
+            if cached is not None:
+                found[key] = cached
+            else:
+                missing.setdefault(key, query)
+        if missing:
+            with span("embed"):
+                embedded = await self.embedder.embed(list(missing.values()))
+            for key, vector in zip(missing, embedded, strict=True):
+                q = np.asarray(vector, dtype=np.float32)
+                q.setflags(write=False)
+                found[key] = q
+                if self.query_cache is not None:
+                    self.query_cache.put(key, q)
+        return [found[key] for key in keys]
 
-        scored: list[tuple[IndexedChunk, float]] = []
-        for item in self._index:
-            v = np.array(item.vector, dtype=np.float32)
-            scored.append((item, cosine_sim(q, v)))
+    async def embed_query(self, query: str) -> np.ndarray:
+        key = (self.embedder.model, normalize_query(query))
+        if self.query_cache is not None:
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                return cached
 
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return scored[:top_k]
+        with span("embed"):
+            q = np.asarray((await self.query_embedder.embed([query]))[0], dtype=np.float32)
+        q.setflags(write=False)  # shared between requests via the cache
+        if self.query_cache is not None:
+            self.query_cache.put(key, q)
+        return q
@@ -14,6 +14,16 @@ class AskRequest(BaseModel):
         default=False,
         description="If true, returns the rendered system/user prompts for comparison."
     )
+    # Scope: only chunks of documents matching every given field (any value within a field) are searched.
+    doc_ids: list[str] | None = Field(default=None, max_length=100, description="Only search these documents.")
+    doc_prefixes: list[str] | None = Field(
+        default=None, max_length=20, description="Only search documents whose id starts with one of these."
+    )
+    tags: list[str] | None = Field(
+        default=None,
+        max_length=20,
+        description="Only search documents with one of these tags (from `<doc_id>.meta.json` in DOCS_DIR).",
+    )
 
 class Citation(BaseModel):
     doc_id: str
@@ -29,6 +39,10 @@ class PromptTrace(BaseModel):
     template: str
     version: str
     description: str
+    context_tokens: int | None = Field(default=None, description="Estimated tokens of the packed context.")
+    tokens_saved: int | None = Field(
+        default=None, description="Estimated context tokens removed by merging overlapping chunks and the token budget."
+    )
     system_prompt: str | None = None
     user_prompt: str | None = None
 
@@ -39,3 +53,18 @@ class AskResponse(BaseModel):
     latency_ms: int
     prompt: PromptTrace | None = None
     guardrails: list[GuardrailEvent] = Field(default_factory=list)
+    cached: bool = Field(default=False, description="True when the answer was served from the answer cache.")
+
+class AskBatchRequest(BaseModel):
+    items: list[AskRequest] = Field(min_length=1, description="Questions answered independently, in order.")
+
+class AskBatchItem(BaseModel):
+    index: int
+    response: AskResponse | None = None
+    error: str | None = Field(default=None, description="Set instead of `response` when this item failed.")
+
+class AskBatchResponse(BaseModel):
+    request_id: str
+    items: list[AskBatchItem]
+    failed: int
+    latency_ms: int
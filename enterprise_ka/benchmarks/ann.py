@@ -0,0 +1,48 @@
+"""
+Recall@k vs latency report: IVF (ANN_MODE=ivf) at several nprobe values against exact search.
+
+Usage:
+    python -m benchmarks.ann --chunks 200000 --dim 256 --nprobe 1 2 4 8 16 32
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.rag.ann import AnnConfig, IVFIndex
+from app.rag.index import top_k_indices
+from benchmarks.corpus import clustered_vectors, queries_near
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = ~4*sqrt(chunks)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    matrix = clustered_vectors(args.chunks, args.dim)
+    queries = queries_near(matrix, args.queries)
+
+    t0 = time.perf_counter()
+    ivf = IVFIndex.build(matrix, AnnConfig(mode="ivf", nlist=args.nlist))
+    print(f"IVF build: {ivf.nlist} lists over {args.chunks} x {args.dim} in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    exact = [set(top_k_indices(matrix @ q, args.top_k).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    print(f"{'mode':>12} {'recall@' + str(args.top_k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>10.2f} {'1.0x':>8}")
+    for nprobe in args.nprobe:
+        t0 = time.perf_counter()
+        found = [set(ivf.search(matrix, q, args.top_k, nprobe)[0].tolist()) for q in queries]
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        recall = float(np.mean([len(f & e) / len(e) for f, e in zip(found, exact, strict=True)]))
+        print(f"{'ivf/' + str(nprobe):>12} {recall:>10.3f} {ms:>10.2f} {exact_ms / ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Requests per second through the app's ASGI stack with in-process stubs for the retriever and the
+LLM (no network, no provider keys), so only framework, middleware and serialization cost is left:
+
+    before   request-id + server-timing middleware on Starlette's BaseHTTPMiddleware,
+             stdlib JSONResponse for routes without a response model
+    after    pure ASGI middleware (app/core/middleware.py), FastJSONResponse (orjson if installed)
+
+Each variant serves /healthz, /v1/ask (8 citations) and /v1/ask/stream (60 tokens) to
+--concurrency clients over httpx's ASGI transport; the answer cache is off so every /v1/ask runs
+the whole pipeline. Throughput is the number to compare: the in-process transport runs a request
+without yielding unless the app does, so latency percentiles mostly reflect scheduling.
+
+Usage:
+    python -m benchmarks.asgi --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["ANSWER_CACHE_MAX_ENTRIES"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+import app.main as app_main  # noqa: E402
+from app.core.middleware import (  # noqa: E402
+    REQUEST_ID_HEADER,
+    RequestIdMiddleware,
+    ServerTimingMiddleware,
+)
+from app.core.responses import FastJSONResponse  # noqa: E402
+from app.core.timing import SERVER_TIMING_HEADER, start_request  # noqa: E402
+from app.rag.chunking import Chunk  # noqa: E402
+from app.rag.retriever import Retrieval  # noqa: E402
+from benchmarks.corpus import synthetic_text  # noqa: E402
+from benchmarks.results import percentiles, save_results  # noqa: E402
+
+
+class LegacyRequestIdMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version this replaced (baseline only)."""
+    async def dispatch(self, request, call_next):
+        request_id = request.headers.get(REQUEST_ID_HEADER) or str(uuid.uuid4())
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
+class LegacyServerTimingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        timings = start_request()
+        response = await call_next(request)
+        response.headers[SERVER_TIMING_HEADER] = timings.header()
+        return response
+
+class StubRetriever:
+    def __init__(self, hits: int, dim: int = 256):
+        rng = np.random.default_rng(0)
+        self.hits = [
+            (Chunk(doc_id=f"doc-{i}", chunk_id=f"doc-{i}::c{i}", text=synthetic_text(800, seed=i)), 0.9 - i / 100)
+            for i in range(hits)
+        ]
+        self.vector = rng.standard_normal(dim).astype(np.float32)
+
+    async def warmup(self):
+        return None
+
+    async def retrieve(self, query: str, top_k: int, doc_filter=None) -> Retrieval:
+        return Retrieval(hits=self.hits[:top_k], query_vector=self.vector, index_version="bench")
+
+class StubLLM:
+    def __init__(self, tokens: int):
+        self.tokens = [f" token{i}" for i in range(tokens)]
+
+    async def generate(self, system: str, user: str) -> str:
+        return "".join(self.tokens).strip()
+
+    async def stream(self, system: str, user: str):
+        for token in self.tokens:
+            yield token
+
+_fast_render = FastJSONResponse.render
+
+def use_variant(variant: str) -> None:
+    legacy = variant == "before"
+    request_id, server_timing = (
+        (LegacyRequestIdMiddleware, LegacyServerTimingMiddleware) if legacy
+        else (RequestIdMiddleware, ServerTimingMiddleware)
+    )
+    app = app_main.app
+    app.user_middleware = [
+        m for m in app.user_middleware
+        if m.cls not in (RequestIdMiddleware, ServerTimingMiddleware, LegacyRequestIdMiddleware, LegacyServerTimingMiddleware)
+    ]
+    # add_middleware prepends, so the last one added is outermost (as in app.main).
+    app.user_middleware[:0] = [Middleware(server_timing), Middleware(request_id)]
+    app.middleware_stack = None
+    FastJSONResponse.render = JSONResponse.render if legacy else _fast_render  # type: ignore[method-assign]
+
+async def _request(client: httpx.AsyncClient, endpoint: str, i: int) -> int:
+    if endpoint == "/healthz":
+        return (await client.get(endpoint)).status_code
+    body = {"question": f"Who approves a SEV{i % 3 + 1} escalation in region {i}?", "top_k": 8}
+    if endpoint == "/v1/ask":
+        return (await client.post(endpoint, json=body)).status_code
+    async with client.stream("POST", endpoint, json=body) as r:
+        async for _ in r.aiter_bytes():
+            pass
+        return r.status_code
+
+async def run(endpoint: str, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(min(50, requests)):
+            await _request(client, endpoint, i)
+        latencies: list[float] = []
+        errors = 0
+        pending = iter(range(requests))
+
+        async def worker() -> None:
+            nonlocal errors
+            for i in pending:
+                t0 = time.perf_counter()
+                status = await _request(client, endpoint, i)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                errors += status != 200
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        **percentiles(latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--hits", type=int, default=8, help="citations per answer")
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per (streamed) answer")
+    parser.add_argument("--endpoints", nargs="+", default=["/healthz", "/v1/ask", "/v1/ask/stream"])
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    app_main.retriever = StubRetriever(args.hits)  # type: ignore[assignment]
+    app_main.llm_client = StubLLM(args.tokens)
+    rows = []
+    print(f"{'endpoint':<16} {'variant':<7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for endpoint in args.endpoints:
+        throughput = {}
+        for variant in ("before", "after"):
+            use_variant(variant)
+            row = {"name": f"{endpoint}/{variant}", **asyncio.run(run(endpoint, args.requests, args.concurrency))}
+            rows.append(row)
+            throughput[variant] = row["throughput_rps"]
+            print(f"{endpoint:<16} {variant:<7} {row['throughput_rps']:>9.1f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+        print(f"{'':<16} speedup {throughput['after'] / throughput['before']:.2f}x")
+    print(f"saved {save_results('asgi', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Peak memory and throughput of document ingestion: reading a file whole and chunking the
+normalized string (original path) vs streaming it through normalize_stream / iter_chunks.
+
+Usage:
+    python -m benchmarks.chunking --mb 200 --max-chars 900 --overlap 120
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.rag.chunking import iter_file_chunks
+
+_LINE = "SEV1 incident: page the primary on-call, open a bridge and   post updates every 30 minutes.\n"
+
+
+def legacy_count(path: str, max_chars: int, overlap: int) -> int:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    cleaned = " ".join(text.split())
+    count, start = 0, 0
+    while start < len(cleaned):
+        end = min(start + max_chars, len(cleaned))
+        _ = cleaned[start:end]
+        count += 1
+        if end == len(cleaned):
+            break
+        start = max(0, end - overlap)
+    return count
+
+def streaming_count(path: str, max_chars: int, overlap: int) -> int:
+    return sum(1 for _ in iter_file_chunks("doc", path, max_chars=max_chars, overlap=overlap))
+
+def _measure(fn, *args) -> tuple[int, float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count = fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=100, help="size of the generated document")
+    parser.add_argument("--max-chars", type=int, default=900)
+    parser.add_argument("--overlap", type=int, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.txt")
+        block = _LINE * (2**20 // len(_LINE))
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(args.mb):
+                f.write(block)
+        size_mb = os.path.getsize(path) / 2**20
+
+        # Chunks are counted, not kept, so the numbers reflect the ingestion path itself.
+        print(f"document: {size_mb:.0f} MiB")
+        print(f"{'path':>10} {'chunks':>10} {'seconds':>9} {'peak MiB':>9}")
+        for name, fn in (("whole", legacy_count), ("streaming", streaming_count)):
+            count, elapsed, peak = _measure(fn, path, args.max_chars, args.overlap)
+            print(f"{name:>10} {count:>10} {elapsed:>9.2f} {peak:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from app.rag.index import DocSpan, StringTable, VectorIndex, normalize_rows
+
+# Vector space of synthetic indexes; the in-process bench embedders report it so warmup serves them as-is.
+BENCH_EMBED_MODEL = "bench-embed"
+
+def clustered_vectors(n: int, dim: int, clusters: int = 256, spread: float = 0.35, seed: int = 0) -> np.ndarray:
+    """L2-normalized vectors drawn around `clusters` topic centers, closer to real embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * spread
+    return np.ascontiguousarray(normalize_rows(centers[labels] + noise))
+
+def queries_near(matrix: np.ndarray, count: int, noise: float = 0.2, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random corpus rows (a query usually paraphrases something in the corpus)."""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, matrix.shape[0], size=count)
+    q = matrix[rows] + rng.standard_normal((count, matrix.shape[1]), dtype=np.float32) * noise / np.sqrt(matrix.shape[1])
+    return normalize_rows(q)
+
+_TOPICS = ["incident", "escalation", "vpn", "access", "rotation", "backup", "deploy", "oncall", "audit", "billing"]
+_WORDS = [
+    "page", "commander", "bridge", "policy", "review", "ticket", "runbook", "approve", "rollback", "credential",
+    "latency", "service", "region", "customer", "owner", "window", "severity", "timeline", "postmortem", "alert",
+]
+
+def synthetic_text(chars: int, seed: int = 0) -> str:
+    """Runbook-like prose with ID-style codes (SEV1, ERR-1234) sprinkled in."""
+    rng = np.random.default_rng(seed)
+    parts: list[str] = []
+    size = 0
+    while size < chars:
+        topic = _TOPICS[rng.integers(len(_TOPICS))]
+        words = " ".join(_WORDS[i] for i in rng.integers(0, len(_WORDS), size=int(rng.integers(8, 20))))
+        sentence = f"{topic.capitalize()} step SEV{rng.integers(1, 4)} ERR-{rng.integers(1000, 9999)}: {words}."
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts)[:chars]
+
+def write_docs(docs_dir: str, chunks: int, chunk_chars: int = 900, docs: int = 0, seed: int = 0) -> int:
+    """
+    Write a corpus of .txt files that chunks into about `chunks` chunks of `chunk_chars` (no overlap).
+    Returns the total characters written.
+    """
+    os.makedirs(docs_dir, exist_ok=True)
+    docs = docs or max(1, min(chunks // 50, 2_000))
+    per_doc = chunks * chunk_chars // docs
+    for i in range(docs):
+        with open(os.path.join(docs_dir, f"doc{i:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write(synthetic_text(per_doc, seed=seed + i))
+    return per_doc * docs
+
+def synthetic_index(n: int, dim: int, chunk_chars: int = 200, seed: int = 0) -> VectorIndex:
+    """A VectorIndex of `n` clustered vectors with short synthetic texts, 100 chunks per document."""
+    matrix = clustered_vectors(n, dim, seed=seed)
+    per_doc = 100
+    docs = [DocSpan(doc_id=f"doc{d}", start=s, end=min(s + per_doc, n)) for d, s in enumerate(range(0, n, per_doc))]
+    chunk_ids = [f"{d.doc_id}::c{i}" for d in docs for i in range(d.end - d.start)]
+    base = synthetic_text(chunk_chars * 64, seed=seed)
+    texts = [base[(i % 64) * chunk_chars:(i % 64 + 1) * chunk_chars] for i in range(n)]
+    meta = {"build_id": "bench", "embed_model": BENCH_EMBED_MODEL}
+    return VectorIndex(matrix, StringTable.from_strings(chunk_ids), StringTable.from_strings(texts), docs, meta)
@@ -0,0 +1,94 @@
+"""
+Latency of scoped (filtered) vs unscoped retrieval on an N-chunk index (100 chunks per doc):
+
+    all         no filter: the whole matrix is scanned
+    prefix/P%   doc_prefixes selecting P% of the docs (one contiguous row range)
+    tags/P%     a tag on every (100 / P)-th doc (P% of the rows, scattered ranges)
+    doc_ids/1   a single document
+
+Time per query should follow the partition size, not N. Runs in-process with a precomputed
+query embedder, so only filtering and search are measured.
+
+Usage:
+    python -m benchmarks.filters --size 1000000 --dim 256 --percent 1 10
+"""
+import argparse
+import asyncio
+import dataclasses
+import tempfile
+import time
+
+import numpy as np
+
+from app.rag.ann import AnnConfig
+from app.rag.index import DocFilter, save_index
+from app.rag.lexical import HybridConfig
+from app.rag.retriever import Retriever
+from benchmarks.corpus import queries_near, synthetic_index
+from benchmarks.micro import VectorTableEmbedder
+from benchmarks.results import percentiles, save_results
+
+
+async def _timings_ms(retriever: Retriever, doc_filter: DocFilter | None, queries: int, top_k: int) -> list[float]:
+    out = []
+    for i in range(queries):
+        t0 = time.perf_counter()
+        await retriever.retrieve(f"query {i}", top_k, doc_filter)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    index = synthetic_index(args.size, args.dim)
+    ndocs = len(index.docs)
+    # ids "p<bucket>/doc<i>" with 100 buckets in row order: prefix "p00/" is 1% of the rows, "p0" 10%
+    index.docs = [
+        dataclasses.replace(
+            d, doc_id=f"p{i * 100 // ndocs:02d}/doc{i}", tags=tuple(f"every{s}" for s in (10, 100) if i % s == 0)
+        )
+        for i, d in enumerate(index.docs)
+    ]
+    variants: list[tuple[str, DocFilter | None]] = [("all", None)]
+    for percent in args.percent:
+        prefix, every = ("p00/", 100) if percent == 1 else ("p0", 10)
+        variants.append((f"prefix/{percent:g}%", DocFilter(prefixes=(prefix,))))
+        variants.append((f"tags/{percent:g}%", DocFilter(tags=(f"every{every}",))))
+    variants.append(("doc_ids/1", DocFilter(doc_ids=(index.docs[ndocs // 2].doc_id,))))
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ka-filters-") as tmp:
+        save_index(tmp, index)
+        retriever = Retriever(
+            "", tmp, VectorTableEmbedder(queries_near(index.matrix, 64)), max_chars=900, overlap=120,
+            ann=AnnConfig(mode=args.ann), vector_dtype=args.vector_dtype,
+            hybrid=HybridConfig(mode=args.mode, fast_path_confidence=0),
+        )
+        await retriever.warmup()
+        for name, doc_filter in variants:
+            scanned = len(retriever._index.partition(doc_filter)) if doc_filter is not None else args.size
+            timings = await _timings_ms(retriever, doc_filter, args.queries, args.top_k)
+            rows.append({"name": name, "rows": scanned, "mean_ms": round(float(np.mean(timings)), 4),
+                         **percentiles(timings)})
+        del retriever
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--percent", type=int, nargs="+", default=[1, 10], choices=[1, 10])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--mode", default="dense", choices=["dense", "hybrid"])
+    parser.add_argument("--ann", default="exact", choices=["exact", "ivf"])
+    parser.add_argument("--vector-dtype", default="float32", choices=["float32", "float16", "int8"])
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+    print(f"{'variant':<14} {'rows':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for r in rows:
+        print(f"{r['name']:<14} {r['rows']:>10} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+    print(f"saved {save_results('filters', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Guardrail pre-screen cost with a large rule set: the original per-rule loop (one regex search
+per denylist pattern, one substring scan per keyword) vs the compiled RuleEngine.
+
+Usage:
+    python -m benchmarks.guardrails --regex-rules 200 --keyword-rules 800 --chars 4000
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from app.core.guardrails import Guardrails
+from app.core.rules import parse_rules
+
+
+def synthetic_rules(regex_rules: int, keyword_rules: int, keywords_per_rule: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+
+    def word(n: int) -> str:
+        return "".join(rng.choices(string.ascii_lowercase, k=n))
+
+    rules: list[dict] = []
+    for i in range(regex_rules):
+        rules.append({"id": f"re{i}", "action": "block", "pattern": rf"{word(5)}\s+(?:{word(4)}|{word(6)})\d*"})
+    for i in range(keyword_rules):
+        rules.append({"id": f"kw{i}", "action": "warn", "keywords": [f"{word(5)} {word(4)}" for _ in range(keywords_per_rule)]})
+    return rules
+
+def synthetic_questions(count: int, chars: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    words = ["incident", "escalation", "policy", "runbook", "sev1", "rotate", "access", "review", "on-call", "vpn"]
+    questions = []
+    for _ in range(count):
+        text = ""
+        while len(text) < chars:
+            text += rng.choice(words) + " "
+        questions.append(text[:chars])
+    return questions
+
+def legacy_pre_screen(patterns: list[re.Pattern], keywords: list[str], question: str) -> bool:
+    q = question.lower()
+    for pattern in patterns:
+        if pattern.search(q):
+            return True
+    return any(k in q for k in keywords)
+
+def _per_call_us(fn, questions: list[str], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for q in questions:
+            fn(q)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6 / len(questions)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regex-rules", type=int, default=200)
+    parser.add_argument("--keyword-rules", type=int, default=800)
+    parser.add_argument("--keywords-per-rule", type=int, default=3)
+    parser.add_argument("--chars", type=int, default=4000, help="question length (AskRequest max is 4000)")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--profile", type=int, default=5, help="show the N slowest rules")
+    args = parser.parse_args()
+
+    raw = synthetic_rules(args.regex_rules, args.keyword_rules, args.keywords_per_rule)
+    rules = parse_rules(raw)
+    questions = synthetic_questions(args.questions, args.chars)
+
+    t0 = time.perf_counter()
+    guardrails = Guardrails(rules=rules)
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    patterns = [re.compile(r.pattern, re.I) for r in rules if r.pattern is not None]
+    keywords = [k for r in rules for k in r.keywords]
+    assert all(
+        legacy_pre_screen(patterns, keywords, q) == bool(guardrails.pre_screen(q).findings) for q in questions
+    ), "engine and per-rule loop disagree"
+
+    legacy_us = _per_call_us(lambda q: legacy_pre_screen(patterns, keywords, q), questions, args.repeats)
+    engine_us = _per_call_us(guardrails.pre_screen, questions, args.repeats)
+    print(f"{len(rules)} rules ({len(patterns)} regex, {len(keywords)} keywords), {args.chars}-char questions")
+    print(f"compile: {compile_ms:.1f} ms")
+    print(f"per-rule loop : {legacy_us:>9.1f} us/question")
+    print(f"RuleEngine    : {engine_us:>9.1f} us/question  ({legacy_us / engine_us:.1f}x)")
+
+    if args.profile:
+        print(f"\nslowest {args.profile} rules (timed individually):")
+        for row in guardrails.engine.profile(questions[:10])[: args.profile]:
+            print(f"  {row['rule']:>8} {row['us_per_text']:>8.2f} us  matches={row['matches']}")
+
+if __name__ == "__main__":
+    main()
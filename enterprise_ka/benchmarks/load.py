@@ -0,0 +1,204 @@
+"""
+End-to-end load generator for /v1/ask (or /v1/ask/stream): a fixed number of concurrent clients
+send questions back to back; reports throughput and p50/p95/p99 latency (plus time to first
+token when streaming) and saves the run as JSON.
+
+Against a running service:
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 16 --requests 2000
+
+Self-contained (no provider keys, no cost): starts the stand-in providers
+(benchmarks/stub_providers.py) and the app on free ports, over a synthetic corpus:
+    python -m benchmarks.load --self-host --chunks 10000 --concurrency 32 --requests 2000 \\
+        --stub-args="--llm-latency lognormal:400:0.5 --token-ms 5"
+
+Compare two runs with `python -m benchmarks.results OLD.json NEW.json`.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Iterator
+
+import httpx
+import numpy as np
+
+from benchmarks.corpus import write_docs
+from benchmarks.results import percentiles, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def questions(count: int, repeat_ratio: float, seed: int = 0) -> list[str]:
+    """Question mix: paraphrase-style questions, ID lookups (lexical fast path) and exact repeats (caches)."""
+    rng = random.Random(seed)
+    topics = ["incident", "escalation", "vpn", "access", "rotation", "backup", "deploy", "oncall", "audit", "billing"]
+    asks = ["Who approves", "What is the rollback step for", "Who owns", "How do I page the commander for"]
+    out: list[str] = []
+    for i in range(count):
+        if out and rng.random() < repeat_ratio:
+            out.append(rng.choice(out))
+        elif i % 5 == 0:
+            out.append(f"What does ERR-{rng.randint(1000, 9999)} mean?")
+        else:
+            out.append(f"{rng.choice(asks)} a SEV{rng.randint(1, 3)} {rng.choice(topics)} in region {rng.randint(1, 40)}?")
+    return out
+
+async def _one(client: httpx.AsyncClient, url: str, question: str, stream: bool) -> tuple[str, float, float | None]:
+    """(status, latency ms, time to first token ms); a stream ending in an `error` event counts as "stream_error"."""
+    t0 = time.perf_counter()
+    first: float | None = None
+    if not stream:
+        r = await client.post(url, json={"question": question})
+        return str(r.status_code), (time.perf_counter() - t0) * 1000, None
+    status = ""
+    async with client.stream("POST", url, json={"question": question}) as r:
+        async for line in r.aiter_lines():
+            if first is None and line.startswith("event: token"):
+                first = (time.perf_counter() - t0) * 1000
+            elif line.startswith("event: error"):
+                status = "stream_error"
+    return status or str(r.status_code), (time.perf_counter() - t0) * 1000, first
+
+async def run_load(base_url: str, qs: list[str], concurrency: int, stream: bool, warmup: int, timeout_s: float) -> dict:
+    url = base_url.rstrip("/") + ("/v1/ask/stream" if stream else "/v1/ask")
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout_s) as client:
+        for q in qs[:warmup]:
+            await _one(client, url, q, stream)
+        qs = qs[warmup:]
+
+        latencies: list[float] = []
+        ttft: list[float] = []
+        statuses: Counter[str] = Counter()
+        pending: Iterator[str] = iter(qs)
+
+        async def worker() -> None:
+            for q in pending:
+                try:
+                    status, latency, first = await _one(client, url, q, stream)
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                    continue
+                statuses[status] += 1
+                if status == "200":
+                    latencies.append(latency)
+                    if first is not None:
+                        ttft.append(first)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    row = {
+        "name": f"{'ask_stream' if stream else 'ask'}/c{concurrency}",
+        "requests": len(qs),
+        "ok": len(latencies),
+        "errors": len(qs) - len(latencies),
+        "statuses": dict(statuses),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(float(np.mean(latencies)), 3) if latencies else 0.0,
+        **percentiles(latencies),
+    }
+    if stream:
+        row.update({f"ttft_{k}": v for k, v in percentiles(ttft).items()})
+    return row
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_healthy(url: str, proc: subprocess.Popen, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode} before becoming healthy")
+        with contextlib.suppress(httpx.HTTPError):
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not healthy after {timeout_s:.0f}s")
+
+@contextlib.contextmanager
+def self_hosted(args: argparse.Namespace) -> Iterator[tuple[str, str]]:
+    """Stub providers + app as subprocesses on free ports; yields (app url, stub url)."""
+    stub_port, app_port = free_port(), free_port()
+    stub_url, app_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{app_port}"
+    with tempfile.TemporaryDirectory(prefix="ka-load-") as tmp:
+        docs_dir = os.path.join(tmp, "docs")
+        write_docs(docs_dir, args.chunks)
+        env = {
+            **os.environ,
+            "LLM_PROVIDER": args.provider,
+            "OPENAI_API_KEY": "stub",
+            "ANTHROPIC_API_KEY": "stub",
+            "OPENAI_BASE_URL": f"{stub_url}/v1",
+            "ANTHROPIC_BASE_URL": stub_url,
+            "DOCS_DIR": docs_dir,
+            "INDEX_PATH": os.path.join(tmp, "index"),
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        }
+        stub_cmd = [sys.executable, "-m", "benchmarks.stub_providers", "--port", str(stub_port), *shlex.split(args.stub_args)]
+        app_cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port),
+                   "--workers", str(args.workers), "--log-level", "warning"]
+        procs = [subprocess.Popen(stub_cmd, cwd=ROOT, env=env)]
+        try:
+            wait_healthy(f"{stub_url}/stats", procs[0], 30)
+            procs.append(subprocess.Popen(app_cmd, cwd=ROOT, env=env))
+            # Startup builds the index through the stub embeddings endpoint.
+            wait_healthy(f"{app_url}/healthz", procs[1], args.startup_timeout)
+            yield app_url, stub_url
+        finally:
+            for proc in reversed(procs):
+                proc.terminate()
+                with contextlib.suppress(subprocess.TimeoutExpired):
+                    proc.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16], help="one run per value")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="share of questions repeating an earlier one")
+    parser.add_argument("--stream", action="store_true", help="use /v1/ask/stream and report time to first token")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--self-host", action="store_true", help="start stub providers + app locally")
+    parser.add_argument("--chunks", type=int, default=10_000, help="synthetic corpus size (self-host)")
+    parser.add_argument("--provider", default="openai", choices=["openai", "anthropic"])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (self-host)")
+    parser.add_argument("--stub-args", default="", help="extra arguments for benchmarks.stub_providers")
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--out", default="", help="results file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        url, stub_url = args.url, ""
+        if args.self_host:
+            url, stub_url = stack.enter_context(self_hosted(args))
+        rows = []
+        for seed, concurrency in enumerate(args.concurrency):
+            # A fresh question set per run, so one run does not warm the caches for the next.
+            qs = questions(args.requests + args.warmup, args.repeat_ratio, seed=seed)
+            row = asyncio.run(run_load(url, qs, concurrency, args.stream, args.warmup, args.timeout))
+            rows.append(row)
+            ttft = f"  ttft p50 {row['ttft_p50_ms']:.1f} ms" if args.stream else ""
+            print(f"{row['name']:<16} {row['throughput_rps']:>8.1f} req/s  p50 {row['p50_ms']:.1f}  p95 {row['p95_ms']:.1f}"
+                  f"  p99 {row['p99_ms']:.1f} ms  errors {row['errors']}{ttft}")
+        if stub_url:
+            print(f"stub provider calls: {json.dumps(httpx.get(f'{stub_url}/stats').json())}")
+    params = {k: v for k, v in vars(args).items() if k != "url" or not args.self_host}
+    print(f"saved {save_results('load', rows, args.out, params=params)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput of the local CPU embedder (EMBED_PROVIDER=local), no network involved:
+
+    batch/B       texts/s embedding --chunk-chars texts B at a time (index build path)
+    threads/T     texts/s with T threads sharing one embedder (NumPy releases the GIL)
+    query         latency of one short question (query path; compare with an embeddings API round trip)
+
+Usage:
+    python -m benchmarks.local_embed --texts 8192 --batch 1 32 256 1024 --threads 1 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.llm.local_embed import HashingEmbedder
+from benchmarks.corpus import synthetic_text
+from benchmarks.results import percentiles, save_results
+
+
+def _texts_per_s(embedder: HashingEmbedder, texts: list[str], batch: int, threads: int = 1) -> float:
+    batches = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+    embedder.embed_array(batches[0])
+    t0 = time.perf_counter()
+    if threads == 1:
+        for b in batches:
+            embedder.embed_array(b)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(embedder.embed_array, batches))
+    return len(texts) / (time.perf_counter() - t0)
+
+def run(args: argparse.Namespace) -> list[dict]:
+    embedder = HashingEmbedder(dim=args.dim, bits=args.bits)
+    texts = [synthetic_text(args.chunk_chars, seed=i) for i in range(args.texts)]
+    rows = []
+    for batch in args.batch:
+        embedder.max_batch_items = batch
+        rows.append({"name": f"batch/{batch}", "texts_per_s": round(_texts_per_s(embedder, texts, batch), 1)})
+    embedder.max_batch_items = max(args.batch)
+    for threads in args.threads:
+        rate = _texts_per_s(embedder, texts, max(args.batch), threads)
+        rows.append({"name": f"threads/{threads}", "texts_per_s": round(rate, 1)})
+
+    questions = [synthetic_text(args.query_chars, seed=10_000 + i) for i in range(args.queries)]
+    timings = []
+    for q in questions:
+        t0 = time.perf_counter()
+        embedder.embed_array([q])
+        timings.append((time.perf_counter() - t0) * 1000)
+    rows.append({"name": "query", "mean_ms": round(float(np.mean(timings)), 4), **percentiles(timings)})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=8_192)
+    parser.add_argument("--chunk-chars", type=int, default=900)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 32, 256, 1_024])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--query-chars", type=int, default=80)
+    parser.add_argument("--dim", type=int, default=1_024)
+    parser.add_argument("--bits", type=int, default=18)
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    rows = run(args)
+    for r in rows:
+        if "texts_per_s" in r:
+            print(f"{r['name']:<12} {r['texts_per_s']:>10.0f} texts/s")
+        else:
+            print(f"{r['name']:<12} p50 {r['p50_ms']:.3f} ms  p95 {r['p95_ms']:.3f} ms")
+    print(f"saved {save_results('local_embed', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Per-request logging cost on the request (event loop) thread: one `ask_ok` record with the usual
+extras (8 citations, guardrails, timings) per call, written to a stdout stand-in whose writes take
+--sink-us (a slow pipe / container log driver).
+
+    sync_text           the previous setup: StreamHandler on the calling thread, plain format (drops extras)
+    sync_json           JSON lines, still written on the calling thread
+    queue_json          LOG_QUEUE: enqueue only; a QueueListener thread formats and writes
+    queue_json_sampled  plus LOG_SAMPLE_RATE=0.1 for ask_ok
+
+Usage:
+    python -m benchmarks.log_overhead --records 20000 --sink-us 50
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Any
+
+from app.core.logging import configure_logging
+from benchmarks.results import percentiles, save_results
+
+VARIANTS: dict[str, dict[str, Any]] = {
+    "sync_text": {"fmt": "text", "use_queue": False},
+    "sync_json": {"fmt": "json", "use_queue": False},
+    "queue_json": {"fmt": "json", "use_queue": True},
+    "queue_json_sampled": {"fmt": "json", "use_queue": True, "sample_rate": 0.1, "sampled_events": ["ask_ok"]},
+}
+
+
+class SlowSink:
+    """stdout stand-in: every write takes `delay_s` (sleeps, releasing the GIL like a blocking write)."""
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+def ask_ok_extra(hits: int) -> dict:
+    return {
+        "provider": "openai",
+        "top_k": hits,
+        "retrieval": "hybrid",
+        "latency_ms": 812,
+        "cached": False,
+        "prompt_template": "grounded_concise",
+        "context_tokens": 1834,
+        "citations": [
+            {"doc_id": f"runbook-{i}", "chunk_id": f"runbook-{i}::c{i}", "score": 0.83 - i / 100, "snippet": "x" * 160}
+            for i in range(hits)
+        ],
+        "guardrails": [{"category": "relevance", "action": "info", "detail": "ok"}],
+        "timings_ms": {"guardrails": 0.2, "embed": 31.5, "search": 4.1, "prompt": 0.4, "llm": 771.0, "total": 812.3},
+    }
+
+def run(variant: str, records: int, sink: SlowSink, hits: int) -> dict:
+    log = logging.getLogger("app.main")
+    extra = ask_ok_extra(hits)
+    stdout = sys.stdout
+    sys.stdout = sink
+    try:
+        configure_logging("INFO", **VARIANTS[variant])
+        per_call: list[float] = []
+        t0 = time.perf_counter()
+        for _ in range(records):
+            t = time.perf_counter()
+            log.info("ask_ok", extra=extra)
+            per_call.append((time.perf_counter() - t) * 1e6)
+        caller_s = time.perf_counter() - t0
+        configure_logging("INFO", fmt="text", use_queue=False)  # stops and drains any listener
+        drained_s = time.perf_counter() - t0
+    finally:
+        sys.stdout = stdout
+        configure_logging("INFO")
+    return {
+        "name": variant,
+        "records": records,
+        "written": sink.writes,
+        "mean_us": round(caller_s / records * 1e6, 3),
+        **percentiles(per_call, unit="us"),
+        "drain_s": round(drained_s, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--sink-us", type=float, default=50.0, help="time per write to the stdout stand-in")
+    parser.add_argument("--hits", type=int, default=8, help="citations per ask_ok record")
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'variant':<20} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'written':>8} {'drain s':>8}")
+    for variant in VARIANTS:
+        row = run(variant, args.records, SlowSink(args.sink_us / 1e6), args.hits)
+        rows.append(row)
+        print(f"{variant:<20} {row['mean_us']:>9.1f} {row['p50_us']:>9.1f} {row['p99_us']:>9.1f}"
+              f" {row['written']:>8} {row['drain_s']:>8.2f}")
+    print(f"saved {save_results('log_overhead', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Micro-benchmarks of the request hot path pieces, on synthetic data, saved as JSON:
+
+    chunk_text            one document of --doc-chars
+    load_index            open a saved index of N chunks (memory-mapped) + first full scan
+    retriever.search      Retriever.search on an N-chunk index (dense and hybrid), in-process embedder
+    guardrails.pre_screen bundled rule set on short and max-length questions
+
+Usage:
+    python -m benchmarks.micro --sizes 10000 100000 1000000 --dim 256
+    python -m benchmarks.results benchmarks/results/micro-<old>.json benchmarks/results/micro-<new>.json
+"""
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.guardrails import Guardrails
+from app.llm.base import Embedder
+from app.rag.chunking import chunk_text
+from app.rag.index import load_index, save_index
+from app.rag.lexical import HybridConfig
+from app.rag.retriever import Retriever
+from benchmarks.corpus import BENCH_EMBED_MODEL, queries_near, synthetic_index, synthetic_text
+from benchmarks.results import percentiles, save_results
+
+
+class VectorTableEmbedder(Embedder):
+    """Returns precomputed query vectors in turn: measures retrieval, not embedding."""
+    model = BENCH_EMBED_MODEL
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        out = []
+        for _ in texts:
+            out.append(self.vectors[self.calls % len(self.vectors)].tolist())
+            self.calls += 1
+        return out
+
+def _timings_ms(fn, iterations: int, warmup: int = 2) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def _row(name: str, timings: list[float], **extra) -> dict:
+    return {"name": name, "iterations": len(timings), "mean_ms": round(float(np.mean(timings)), 4),
+            **percentiles(timings), **extra}
+
+def bench_chunk_text(doc_chars: int, iterations: int) -> dict:
+    text = synthetic_text(doc_chars)
+    timings = _timings_ms(lambda: chunk_text("doc", text, max_chars=900, overlap=120), iterations)
+    return _row(f"chunk_text/{doc_chars}", timings, mb_per_s=round(doc_chars / 1e6 / (np.median(timings) / 1000), 1))
+
+def bench_load_index(index_dir: str, iterations: int) -> list[dict]:
+    open_ms = _timings_ms(lambda: load_index(index_dir), iterations, warmup=1)
+    n = len(load_index(index_dir))
+    q = np.ones(load_index(index_dir).dim, dtype=np.float32)
+    scan_ms = _timings_ms(lambda: load_index(index_dir).matrix @ q, iterations, warmup=1)
+    return [_row(f"load_index/{n}", open_ms), _row(f"load_index+scan/{n}", scan_ms)]
+
+def bench_search(index_dir: str, size: int, queries: np.ndarray, mode: str, iterations: int) -> dict:
+    hybrid = HybridConfig(mode=mode, fast_path_confidence=0.0)
+    retriever = Retriever("", index_dir, VectorTableEmbedder(queries), max_chars=900, overlap=120, hybrid=hybrid)
+    asyncio.run(retriever.warmup())  # loads (or builds once) the BM25 lists
+    texts = [f"what is the escalation step for SEV{i % 3 + 1} in region {i}" for i in range(len(queries))]
+    counter = itertools.count()
+    with asyncio.Runner() as runner:
+        timings = _timings_ms(lambda: runner.run(retriever.search(texts[next(counter) % len(texts)], 5)), iterations)
+    return _row(f"retriever.search/{mode}/{size}", timings)
+
+def bench_guardrails(chars: int, iterations: int) -> dict:
+    guardrails = Guardrails(min_relevance_score=0.2)
+    question = synthetic_text(chars, seed=7)
+    timings = _timings_ms(lambda: guardrails.pre_screen(question), iterations)
+    return _row(f"guardrails.pre_screen/{chars}", timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--doc-chars", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--out", default="", help="results file (default: benchmarks/results/micro-<timestamp>.json)")
+    args = parser.parse_args()
+
+    rows = [bench_chunk_text(args.doc_chars, max(5, args.iterations // 10))]
+    rows += [bench_guardrails(chars, args.iterations * 10) for chars in (200, 4000)]
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            index = synthetic_index(size, args.dim)
+            save_index(tmp + "/index", index)
+            queries = queries_near(index.matrix, 64)
+            del index
+            rows += bench_load_index(tmp + "/index", max(5, args.iterations // 5))
+            for mode in ("dense", "hybrid"):
+                rows.append(bench_search(tmp + "/index", size, queries, mode, args.iterations))
+
+    print(f"{'benchmark':<36} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for r in rows:
+        print(f"{r['name']:<36} {r['mean_ms']:>10.3f} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f}")
+    print(f"\nsaved {save_results('micro', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
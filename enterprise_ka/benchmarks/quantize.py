@@ -0,0 +1,49 @@
+"""
+Memory, latency and recall@k of quantized candidate scoring (VECTOR_DTYPE) against the exact
+float32 cosine ranking, with and without the full-precision rescoring pass.
+
+Usage:
+    python -m benchmarks.quantize --chunks 200000 --dim 256 --rescore-factor 0 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.rag.index import top_k_indices
+from app.rag.quantize import QuantizedMatrix, search_quantized
+from benchmarks.corpus import clustered_vectors, queries_near
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, nargs="+", default=[0, 4])
+    args = parser.parse_args()
+
+    matrix = clustered_vectors(args.chunks, args.dim)
+    queries = queries_near(matrix, args.queries)
+
+    t0 = time.perf_counter()
+    exact = [set(top_k_indices(matrix @ q, args.top_k).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    print(f"{'mode':>14} {'MiB':>8} {'recall@' + str(args.top_k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'float32':>14} {matrix.nbytes / 2**20:>8.1f} {1.0:>10.3f} {exact_ms:>10.2f} {'1.0x':>8}")
+    for dtype in ("float16", "int8"):
+        quantized = QuantizedMatrix.quantize(matrix, dtype)
+        for factor in args.rescore_factor:
+            t0 = time.perf_counter()
+            found = [
+                set(search_quantized(quantized, matrix, q, args.top_k, factor)[0].tolist()) for q in queries
+            ]
+            ms = (time.perf_counter() - t0) * 1000 / len(queries)
+            recall = float(np.mean([len(f & e) / len(e) for f, e in zip(found, exact, strict=True)]))
+            label = f"{dtype}/r{factor}"
+            print(f"{label:>14} {quantized.nbytes / 2**20:>8.1f} {recall:>10.3f} {ms:>10.2f} {exact_ms / ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
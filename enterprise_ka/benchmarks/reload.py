@@ -0,0 +1,109 @@
+"""
+Search latency while the index is hot-reloaded. Two synthetic builds are published alternately
+(symlink flip, as the build CLI does) and `Retriever.reload()` swaps them in while one client
+searches back to back on the same event loop:
+
+    steady         no reloads
+    reload         Retriever.reload(): load in a worker thread, atomic swap
+    reload_inline  the same load done on the event loop (what a naive reload would cost)
+
+each with `warm` builds (BM25 lists already saved: a reload is a few ms of mmap/np.load) and
+`cold` ones (lists deleted before every reload, so each one derives them: the worst case).
+
+Usage:
+    python -m benchmarks.reload --size 200000 --mode hybrid --searches 400
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.rag.index import save_index
+from app.rag.lexical import LEXICAL_FILE, HybridConfig
+from app.rag.retriever import Retriever
+from benchmarks.corpus import queries_near, synthetic_index
+from benchmarks.micro import VectorTableEmbedder
+from benchmarks.results import percentiles, save_results
+
+
+def _point(link: str, target: str) -> None:
+    tmp = f"{link}.flip"
+    if os.path.lexists(tmp):
+        os.unlink(tmp)
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+async def _run(retriever: Retriever, link: str, builds: list[str], searches: int, reload: str, cold: bool) -> dict:
+    latencies: list[float] = []
+    reloads = 0
+    done = asyncio.Event()
+
+    async def reloader() -> None:
+        nonlocal reloads
+        while not done.is_set():
+            build = builds[(reloads + 1) % 2]
+            if cold and os.path.exists(os.path.join(build, LEXICAL_FILE)):
+                os.remove(os.path.join(build, LEXICAL_FILE))
+            _point(link, build)
+            if reload == "reload":
+                await retriever.reload()
+            else:
+                retriever._swap(retriever._load_snapshot(link))
+            reloads += 1
+            await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(reloader()) if reload != "steady" else None
+    for i in range(searches):
+        t0 = time.perf_counter()
+        await retriever.search(f"escalation step for SEV{i % 3 + 1} in region {i}", 5)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0)
+    done.set()
+    if task is not None:
+        await task
+    name = reload if reload == "steady" else f"{reload}/{'cold' if cold else 'warm'}"
+    return {"name": name, "searches": searches, "reloads": reloads,
+            "mean_ms": round(float(np.mean(latencies)), 4), **percentiles(latencies), "max_ms": round(max(latencies), 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--mode", default="hybrid", choices=["dense", "hybrid"])
+    parser.add_argument("--searches", type=int, default=400)
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        builds = []
+        for seed in (0, 1):
+            index = synthetic_index(args.size, args.dim, seed=seed)
+            index.meta["build_id"] = f"bench-{seed}"
+            save_index(os.path.join(tmp, f"build-{seed}"), index)
+            builds.append(os.path.join(tmp, f"build-{seed}"))
+        queries = queries_near(index.matrix, 64)
+        del index
+        link = os.path.join(tmp, "index")
+        hybrid = HybridConfig(mode=args.mode, fast_path_confidence=0.0)
+        retriever = Retriever("", link, VectorTableEmbedder(queries), max_chars=900, overlap=120, hybrid=hybrid)
+
+        rows = []
+        with asyncio.Runner() as runner:
+            for build in builds:  # derive BM25 lists once per build so every reload is a plain load
+                _point(link, build)
+                runner.run(retriever.reload() if retriever.index_version else retriever.warmup())
+            rows.append(runner.run(_run(retriever, link, builds, args.searches, "steady", False)))
+            for cold in (False, True):
+                for reload in ("reload", "reload_inline"):
+                    rows.append(runner.run(_run(retriever, link, builds, args.searches, reload, cold)))
+
+    print(f"{'variant':<20} {'reloads':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in rows:
+        print(f"{r['name']:<20} {r['reloads']:>8} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}")
+    print(f"saved {save_results('reload', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
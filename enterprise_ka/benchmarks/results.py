@@ -0,0 +1,103 @@
+"""
+Benchmark results as JSON, and a regression check between two runs.
+
+Every suite writes `{"suite", "created_at", "env", "params", "results": [...]}` to
+`benchmarks/results/` (or `--out`). Each result row has a unique `name`; rows of two runs are
+matched by name and every latency metric (`*_ms`, `*_us`, e.g. `p99_ms`) is compared.
+
+Usage:
+    python -m benchmarks.results benchmarks/results/micro-old.json benchmarks/results/micro-new.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+_LOWER_IS_BETTER = ("_ms", "_us")
+
+
+def percentiles(values: list[float], points: tuple[int, ...] = (50, 95, 99), unit: str = "ms") -> dict[str, float]:
+    """{"p50_ms": ..., "p95_ms": ..., "p99_ms": ...} of `values` (already in `unit`)."""
+    if not values:
+        return {f"p{p}_{unit}": 0.0 for p in points}
+    return {f"p{p}_{unit}": round(float(v), 4) for p, v in zip(points, np.percentile(values, points), strict=True)}
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def environment() -> dict:
+    return {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def save_results(suite: str, results: list[dict], out: str = "", params: dict | None = None) -> str:
+    """Write one run to `out` (default: benchmarks/results/<suite>-<timestamp>.json); returns the path."""
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{suite}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    payload = {
+        "suite": suite,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "env": environment(),
+        "params": params or {},
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return out
+
+def compare(old: dict, new: dict, threshold: float) -> list[dict]:
+    """Metrics that got slower by more than `threshold` (0.1 = 10%) between two result files."""
+    baseline = {r["name"]: r for r in old["results"]}
+    regressions = []
+    for row in new["results"]:
+        before = baseline.get(row["name"])
+        if before is None:
+            continue
+        for name, value in row.items():
+            if not name.endswith(_LOWER_IS_BETTER) or not isinstance(before.get(name), int | float) or not before[name]:
+                continue
+            change = value / before[name] - 1
+            if change > threshold:
+                regressions.append(
+                    {"name": row["name"], "metric": name, "before": before[name], "after": value, "change": round(change, 3)}
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown before failing (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("suite") != new.get("suite"):
+        sys.exit(f"Cannot compare suite {old.get('suite')!r} with {new.get('suite')!r}")
+
+    regressions = compare(old, new, args.threshold)
+    print(f"{old['env'].get('git_commit') or args.old} -> {new['env'].get('git_commit') or args.new}: "
+          f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+    for r in regressions:
+        print(f"  {r['name']}  {r['metric']}: {r['before']:.3f} -> {r['after']:.3f} (+{r['change']:.0%})")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: per-chunk cosine loop (original Retriever.search) vs VectorIndex.search,
+and `--batch` queries searched one by one vs with one VectorIndex.search_many call.
+
+Usage:
+    python -m benchmarks.search --sizes 10000 100000 1000000 --dim 256 --batch 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.rag.chunking import Chunk
+from app.rag.index import DocSpan, StringTable, VectorIndex, cosine_sim, normalize_rows
+
+
+def legacy_search(vectors: list[list[float]], chunks: list[Chunk], q: np.ndarray, top_k: int):
+    scored = []
+    for chunk, vec in zip(chunks, vectors, strict=True):
+        v = np.array(vec, dtype=np.float32)
+        scored.append((chunk, cosine_sim(q, v)))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:top_k]
+
+def _best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def run(size: int, dim: int, top_k: int, repeats: int, legacy_limit: int, batch: int = 0) -> dict:
+    rng = np.random.default_rng(0)
+    raw = rng.standard_normal((size, dim), dtype=np.float32)
+    chunks = [Chunk(doc_id="doc", chunk_id=f"doc::c{i}", text="") for i in range(size)]
+    index = VectorIndex(
+        np.ascontiguousarray(normalize_rows(raw)),
+        StringTable.from_strings([c.chunk_id for c in chunks]),
+        StringTable.from_strings([c.text for c in chunks]),
+        [DocSpan(doc_id="doc", start=0, end=size)],
+    )
+    q = rng.standard_normal(dim, dtype=np.float32)
+
+    result: dict = {"chunks": size, "dim": dim, "top_k": top_k}
+    result["vectorized_ms"] = _best_of(lambda: index.search(q, top_k), repeats)
+
+    if size <= legacy_limit:
+        vectors = raw.tolist()  # the JSON index stored python float lists
+        result["legacy_ms"] = _best_of(lambda: legacy_search(vectors, chunks, q, top_k), 1)
+        result["speedup"] = result["legacy_ms"] / result["vectorized_ms"]
+        expected = [c.chunk_id for c, _ in legacy_search(vectors, chunks, q, top_k)]
+        assert expected == [c.chunk_id for c, _ in index.search(q, top_k)], "ranking mismatch"
+
+    if batch > 0:
+        queries = rng.standard_normal((batch, dim), dtype=np.float32)
+        result["loop_batch_ms"] = _best_of(lambda: [index.search(x, top_k) for x in queries], repeats)
+        result["search_many_ms"] = _best_of(lambda: index.search_many(queries, top_k), repeats)
+        looped = [[c.chunk_id for c, _ in index.search(x, top_k)] for x in queries]
+        assert looped == [[c.chunk_id for c, _ in hits] for hits in index.search_many(queries, top_k)], "batch mismatch"
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--legacy-limit", type=int, default=1_000_000,
+                        help="Skip the slow per-chunk loop above this many chunks.")
+    parser.add_argument("--batch", type=int, default=64, help="Queries per batched search; 0 skips it.")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>10} {'legacy ms':>12} {'vectorized ms':>14} {'speedup':>9}"
+          f" {'loop batch ms':>14} {'search_many ms':>15}")
+    for size in args.sizes:
+        r = run(size, args.dim, args.top_k, args.repeats, args.legacy_limit, args.batch)
+        legacy = f"{r['legacy_ms']:.1f}" if "legacy_ms" in r else "skipped"
+        speedup = f"{r['speedup']:.0f}x" if "speedup" in r else "-"
+        loop = f"{r['loop_batch_ms']:.2f}" if "loop_batch_ms" in r else "-"
+        many = f"{r['search_many_ms']:.2f}" if "search_many_ms" in r else "-"
+        print(f"{size:>10} {legacy:>12} {r['vectorized_ms']:>14.2f} {speedup:>9} {loop:>14} {many:>15}")
+
+if __name__ == "__main__":
+    main()
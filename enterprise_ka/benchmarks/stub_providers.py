@@ -0,0 +1,206 @@
+"""
+Local stand-in for the OpenAI and Anthropic HTTP APIs, so load tests never pay (or wait on) a
+real provider. Serves, on one port:
+
+    POST /v1/embeddings          OpenAI embeddings (hashed bag-of-words vectors: similar texts stay similar)
+    POST /v1/chat/completions    OpenAI chat, JSON or SSE (`"stream": true`)
+    POST /v1/messages            Anthropic messages, JSON or SSE
+
+Latency is drawn per request from a distribution:
+    fixed:<ms> | uniform:<lo_ms>:<hi_ms> | lognormal:<median_ms>:<sigma>
+Streams emit `--answer-tokens` tokens, `--token-ms` apart. `--error-rate` answers that share of
+requests with 429 (exercises the tenacity retries).
+
+Usage:
+    python -m benchmarks.stub_providers --port 9100 --llm-latency lognormal:400:0.5 --embed-latency fixed:30
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:9100 make run
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class Latency:
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, *args = spec.split(":")
+        values = [float(x) for x in args]
+        if kind == "fixed" and len(values) == 1:
+            return cls(kind, values[0])
+        if kind in ("uniform", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1])
+        raise ValueError(f"Bad latency spec {spec!r}; expected fixed:MS, uniform:LO:HI or lognormal:MEDIAN:SIGMA")
+
+    def sample_s(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            ms = rng.uniform(self.a, self.b)
+        elif self.kind == "lognormal":
+            ms = self.a * rng.lognormvariate(0.0, self.b)
+        else:
+            ms = self.a
+        return max(ms, 0.0) / 1000
+
+@dataclass
+class StubConfig:
+    llm_latency: Latency = Latency("fixed", 200)
+    embed_latency: Latency = Latency("fixed", 20)
+    token_ms: float = 15.0
+    answer_tokens: int = 60
+    dim: int = 256
+    error_rate: float = 0.0
+    seed: int = 0
+
+class HashedEmbedder:
+    """Sum of a fixed random vector per lower-cased word, L2-normalized; deterministic across runs."""
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._words: dict[str, np.ndarray] = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self._words.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector = self._words[word] = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            vector += self._word(word)
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+def _answer_tokens(config: StubConfig, user: str) -> list[str]:
+    cited = re.findall(r"\[[^\]\n]+::[^\]\n]+\]", user)[:2]
+    words = ["Per", "the", "runbook,", "page", "the", "incident", "commander", "and", "open", "a", "bridge."]
+    tokens = [f" {words[i % len(words)]}" for i in range(max(config.answer_tokens - len(cited), 1))]
+    return tokens + [f" {c}" for c in cited]
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Stub LLM providers")
+    rng = random.Random(config.seed)
+    embedder = HashedEmbedder(config.dim)
+    stats = {"embeddings": 0, "embedded_texts": 0, "chat": 0, "messages": 0, "errors": 0}
+
+    def rate_limited() -> JSONResponse | None:
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"type": "rate_limit_error", "message": "stub 429"}}, status_code=429)
+        return None
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.embed_latency.sample_s(rng))
+        if (error := rate_limited()) is not None:
+            return error
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        stats["embeddings"] += 1
+        stats["embedded_texts"] += len(texts)
+        data = [{"object": "embedding", "index": i, "embedding": embedder.embed(t)} for i, t in enumerate(texts)]
+        return {"object": "list", "data": data, "model": body.get("model", "stub-embed")}
+
+    async def token_stream(tokens: list[str], frame) -> AsyncIterator[bytes]:
+        for token in tokens:
+            yield frame(token)
+            await asyncio.sleep(config.token_ms / 1000)
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.llm_latency.sample_s(rng))
+        if (error := rate_limited()) is not None:
+            return error
+        stats["chat"] += 1
+        tokens = _answer_tokens(config, body["messages"][-1]["content"])
+        if not body.get("stream"):
+            await asyncio.sleep(config.token_ms * len(tokens) / 1000)
+            return {"choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens).strip()}}]}
+
+        def frame(token: str) -> bytes:
+            return f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': token}}]})}\n\n".encode()
+
+        async def events():
+            async for chunk in token_stream(tokens, frame):
+                yield chunk
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.llm_latency.sample_s(rng))
+        if (error := rate_limited()) is not None:
+            return error
+        stats["messages"] += 1
+        tokens = _answer_tokens(config, body["messages"][-1]["content"])
+        if not body.get("stream"):
+            await asyncio.sleep(config.token_ms * len(tokens) / 1000)
+            return {"content": [{"type": "text", "text": "".join(tokens).strip()}], "stop_reason": "end_turn"}
+
+        def frame(token: str) -> bytes:
+            data = {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}}
+            return f"event: content_block_delta\ndata: {json.dumps(data)}\n\n".encode()
+
+        async def events():
+            yield b'event: message_start\ndata: {"type": "message_start"}\n\n'
+            async for chunk in token_stream(tokens, frame):
+                yield chunk
+            yield b'event: message_stop\ndata: {"type": "message_stop"}\n\n'
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def parse_config(argv: list[str] | None = None) -> tuple[StubConfig, argparse.Namespace]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--llm-latency", default="lognormal:300:0.4", help="time to first token")
+    parser.add_argument("--embed-latency", default="lognormal:25:0.3")
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    config = StubConfig(
+        llm_latency=Latency.parse(args.llm_latency),
+        embed_latency=Latency.parse(args.embed_latency),
+        token_ms=args.token_ms,
+        answer_tokens=args.answer_tokens,
+        dim=args.dim,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    return config, args
+
+def main():
+    import uvicorn
+
+    config, args = parse_config()
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
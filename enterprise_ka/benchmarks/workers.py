@@ -0,0 +1,155 @@
+"""
+Memory of N serving processes over one index (Linux: /proc/<pid>/smaps_rollup), measured after
+the workers have served /v1/ask traffic against the stub providers:
+
+    uvicorn  `uvicorn --workers N`: N fresh interpreters, each loads the index at startup
+    preload  `python -m scripts.serve --workers N`: loaded once, then the workers are forked
+
+Per worker: RSS, PSS (each shared page split between the processes mapping it) and private
+(unshared) memory; `total_pss_mb` is the whole process tree, i.e. what the pod really uses.
+
+Usage:
+    python -m benchmarks.workers --size 200000 --workers 1 4
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+from collections.abc import Iterator
+
+import numpy as np
+
+from app.rag.ann import AnnConfig
+from app.rag.index import save_index
+from app.rag.lexical import HybridConfig
+from app.rag.retriever import Retriever
+from benchmarks.corpus import BENCH_EMBED_MODEL, queries_near, synthetic_index
+from benchmarks.load import ROOT, free_port, questions, run_load, wait_healthy
+from benchmarks.micro import VectorTableEmbedder
+from benchmarks.results import save_results
+
+LAUNCHERS = {
+    "uvicorn": lambda port, n: [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                                "--workers", str(n), "--log-level", "warning"],
+    "preload": lambda port, n: [sys.executable, "-m", "scripts.serve", "--port", str(port),
+                                "--workers", str(n), "--log-level", "warning"],
+}
+
+
+def memory_kb(pid: int) -> dict[str, int]:
+    """smaps_rollup totals in kB: Rss, Pss, Private_Clean, Private_Dirty, ..."""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1])
+    return out
+
+def children(pid: int) -> list[int]:
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == pid and b"resource_tracker" not in cmdline:
+            out.append(int(entry))
+    return out
+
+@contextlib.contextmanager
+def serving(cmd: list[str], env: dict, url: str) -> Iterator[subprocess.Popen]:
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    try:
+        wait_healthy(f"{url}/healthz", proc, 300)
+        yield proc
+    finally:
+        proc.terminate()
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            proc.wait(timeout=20)
+
+def measure(launcher: str, workers: int, env: dict, requests: int) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with serving(LAUNCHERS[launcher](port, workers), env, url) as proc:
+        qs = questions(requests, repeat_ratio=0.0, seed=workers)
+        load = asyncio.run(run_load(url, qs, concurrency=4 * workers, stream=False, warmup=0, timeout_s=60))
+        procs = [proc.pid, *children(proc.pid)]
+        worker_pids = procs[1:] or procs
+        mem = {pid: memory_kb(pid) for pid in procs}
+    per_worker = [mem[pid] for pid in worker_pids]
+    mb = 1024.0
+    return {
+        "name": f"{launcher}/w{workers}",
+        "workers": len(worker_pids),
+        "ok": load["ok"],
+        "total_pss_mb": round(sum(m["Pss"] for m in mem.values()) / mb, 1),
+        "worker_rss_mb": round(float(np.mean([m["Rss"] for m in per_worker])) / mb, 1),
+        "worker_pss_mb": round(float(np.mean([m["Pss"] for m in per_worker])) / mb, 1),
+        "worker_private_mb": round(
+            float(np.mean([m["Private_Clean"] + m["Private_Dirty"] for m in per_worker])) / mb, 1
+        ),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256, help="must match the stub embedder (--dim)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--vector-dtype", default="int8", choices=["float32", "float16", "int8"])
+    parser.add_argument("--stub-args", default="--llm-latency fixed:5 --embed-latency fixed:2")
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ka-workers-") as tmp:
+        index_dir = os.path.join(tmp, "index")
+        index = synthetic_index(args.size, args.dim)
+        save_index(index_dir, index)
+        # Derive IVF lists, quantized codes and BM25 once, so no worker writes the index dir.
+        retriever = Retriever("", index_dir, VectorTableEmbedder(queries_near(index.matrix, 8)), max_chars=900,
+                              overlap=120, ann=AnnConfig(mode="ivf"), vector_dtype=args.vector_dtype,
+                              hybrid=HybridConfig())
+        asyncio.run(retriever.warmup())
+        del retriever, index
+
+        stub_port = free_port()
+        stub_url = f"http://127.0.0.1:{stub_port}"
+        env = {
+            **os.environ,
+            "LLM_PROVIDER": "openai",
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_BASE_URL": f"{stub_url}/v1",
+            "OPENAI_EMBED_MODEL": BENCH_EMBED_MODEL,  # the model the synthetic index records
+            "DOCS_DIR": os.path.join(tmp, "docs"),
+            "INDEX_PATH": index_dir,
+            "ANN_MODE": "ivf",
+            "VECTOR_DTYPE": args.vector_dtype,
+            "RETRIEVAL_MODE": "hybrid",
+            "LOG_LEVEL": "WARNING",
+        }
+        stub_cmd = [sys.executable, "-m", "benchmarks.stub_providers", "--port", str(stub_port),
+                    "--dim", str(args.dim), *shlex.split(args.stub_args)]
+        rows = []
+        with serving(stub_cmd, env, stub_url):
+            for workers in args.workers:
+                for launcher in LAUNCHERS:
+                    rows.append(measure(launcher, workers, env, args.requests))
+
+    print(f"{'variant':<14} {'total PSS MB':>13} {'worker RSS MB':>14} {'worker PSS MB':>14} {'private MB':>11}")
+    for r in rows:
+        print(f"{r['name']:<14} {r['total_pss_mb']:>13.1f} {r['worker_rss_mb']:>14.1f} {r['worker_pss_mb']:>14.1f}"
+              f" {r['worker_private_mb']:>11.1f}")
+    print(f"saved {save_results('workers', rows, args.out, params=vars(args))}")
+
+if __name__ == "__main__":
+    main()
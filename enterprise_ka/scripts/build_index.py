@@ -1,15 +1,113 @@
+"""
+Build or refresh the index from DOCS_DIR.
+
+Files are hashed and chunked across a process pool and streamed to the embeddings API (or the
+local CPU embedder with EMBED_PROVIDER=local) in batches. Every embedded batch is appended to a
+checkpoint in the staging dir, so a crashed or rate-limited build resumes where it stopped when
+re-run. The finished index is published atomically: a versioned build dir plus a symlink swap at
+INDEX_PATH. Unchanged documents and chunks reuse their vectors from the current index.
+"""
+import argparse
 import asyncio
+import os
+import sys
+import time
 
 from app.core.config import settings
+from app.llm.http import build_http_pool
+from app.llm.local_embed import build_local_embedder
 from app.llm.openai_chat import OpenAIEmbedder
+from app.rag.ann import build_ann_config
+from app.rag.checkpoint import CheckpointingEmbedder, EmbeddingCheckpoint
+from app.rag.index import resolve_index_paths
+from app.rag.lexical import build_hybrid_config
+from app.rag.pipeline import BuildProgress, parallel_chunker
 from app.rag.retriever import Retriever
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-dir", default=settings.docs_dir)
+    parser.add_argument("--index-path", default=settings.index_path)
+    parser.add_argument("--staging-dir", default="", help="checkpoint location (default: <index dir>.staging)")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 8), help="chunking processes")
+    parser.add_argument(
+        "--embed-flush",
+        type=int,
+        default=settings.embed_batch_size * settings.embed_max_concurrency,
+        help="chunks per checkpointed embedding batch (default: EMBED_BATCH_SIZE * EMBED_MAX_CONCURRENCY)",
+    )
+    parser.add_argument("--fresh", action="store_true", help="discard an existing checkpoint instead of resuming")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress lines")
+    return parser.parse_args()
+
 async def main():
-    embedder = OpenAIEmbedder(settings.openai_api_key, settings.openai_embed_model, settings.openai_base_url)
-    retriever = Retriever(settings.docs_dir, settings.index_path, embedder, settings.chunk_max_chars, settings.chunk_overlap_chars)
-    await retriever.warmup()
-    print("Index ready:", settings.index_path)
+    args = parse_args()
+    index_dir, _ = resolve_index_paths(args.index_path)
+    staging_dir = args.staging_dir or f"{index_dir.rstrip('/')}.staging"
+
+    http_pool = build_http_pool(settings)
+    if settings.embed_provider == "local":
+        embedder = build_local_embedder(settings)
+    else:
+        embedder = OpenAIEmbedder(
+            settings.openai_api_key,
+            settings.openai_embed_model,
+            settings.openai_base_url,
+            max_batch_items=settings.embed_batch_size,
+            max_batch_tokens=settings.embed_batch_max_tokens,
+            max_concurrency=settings.embed_max_concurrency,
+            http=http_pool,
+        )
+    checkpoint = EmbeddingCheckpoint(staging_dir, embedder.model)
+    if args.fresh:
+        checkpoint.discard()
+        checkpoint = EmbeddingCheckpoint(staging_dir, embedder.model)
+    elif len(checkpoint):
+        print(f"Resuming: {len(checkpoint)} embedded chunks found in {staging_dir}", file=sys.stderr)
+
+    progress = BuildProgress(report=lambda line: print(line, file=sys.stderr), interval_s=args.progress_interval)
+    retriever = Retriever(
+        args.docs_dir,
+        args.index_path,
+        CheckpointingEmbedder(embedder, checkpoint, on_batch=progress.batch_done),
+        settings.chunk_max_chars,
+        settings.chunk_overlap_chars,
+        ann=build_ann_config(settings),
+        vector_dtype=settings.vector_dtype,
+        rescore_factor=settings.rescore_factor,
+        hybrid=build_hybrid_config(settings),
+        chunk_boundary=settings.chunk_boundary,
+    )
+    chunker = parallel_chunker(
+        args.docs_dir,
+        embedder.model,
+        settings.chunk_max_chars,
+        settings.chunk_overlap_chars,
+        boundary=settings.chunk_boundary,
+        workers=args.workers,
+        progress=progress,
+    )
+    start = time.perf_counter()
+    try:
+        stats = await retriever.rebuild(chunker=chunker, embed_flush=args.embed_flush, versioned=True)
+    except BaseException:
+        print(
+            f"Build interrupted after {time.perf_counter() - start:.1f}s; {len(checkpoint)} embedded chunks are "
+            f"checkpointed in {staging_dir}. Re-run to resume.",
+            file=sys.stderr,
+        )
+        raise
+    finally:
+        await http_pool.aclose()
+    checkpoint.discard()
+
+    print(progress.line(), file=sys.stderr)
+    print(f"Index ready: {retriever.index_dir} ({time.perf_counter() - start:.1f}s, workers={args.workers})")
+    print(
+        f"  docs: {stats.docs_total} total, {stats.docs_reused} unchanged, {stats.docs_changed} new/changed, {stats.docs_removed} removed"
+    )
+    print(f"  chunks: {stats.chunks_total} total, {stats.chunks_reused} reused, {stats.chunks_embedded} embedded")
 
 if __name__ == "__main__":
     asyncio.run(main())
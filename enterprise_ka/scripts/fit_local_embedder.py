@@ -0,0 +1,38 @@
+"""
+Fit idf weights for the local CPU embedder (EMBED_PROVIDER=local) on the chunks of DOCS_DIR.
+
+Documents are streamed chunk by chunk, so memory stays bounded by one embedding batch. The
+result is written to LOCAL_EMBED_MODEL_PATH; the app and scripts/build_index.py load it from
+there. Refitting changes the embedder's model name, so the next build re-embeds every chunk.
+"""
+import argparse
+from collections.abc import Iterator
+
+from app.core.config import settings
+from app.llm.local_embed import HashingEmbedder
+from app.rag.chunking import iter_file_chunks
+from app.rag.index import iter_doc_paths
+
+
+def iter_chunk_texts(docs_dir: str) -> Iterator[str]:
+    for doc_id, path in iter_doc_paths(docs_dir):
+        for chunk in iter_file_chunks(
+            doc_id, path, settings.chunk_max_chars, settings.chunk_overlap_chars, boundary=settings.chunk_boundary
+        ):
+            yield chunk.text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-dir", default=settings.docs_dir)
+    parser.add_argument("--out", default=settings.local_embed_model_path, help="default: %(default)s")
+    parser.add_argument("--dim", type=int, default=settings.local_embed_dim)
+    parser.add_argument("--bits", type=int, default=18, help="2^bits hashed n-gram features")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder(dim=args.dim, bits=args.bits, seed=args.seed).fit(iter_chunk_texts(args.docs_dir))
+    embedder.save(args.out)
+    print(f"Saved {embedder.model} -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+
+from app.core.config import settings
+from app.llm.local_embed import build_local_embedder
+from app.rag.index import migrate_json_index, resolve_index_paths
+
+
+def configured_embed_model() -> str:
+    # The model app.main.build_embedder serves with (importing app.main would start its clients).
+    if settings.embed_provider == "local":
+        return build_local_embedder(settings).model
+    return settings.openai_embed_model
+
+def main():
+    index_dir, legacy_path = resolve_index_paths(settings.index_path)
+    parser = argparse.ArgumentParser(description="Convert a legacy index.json into the binary index format.")
+    parser.add_argument("--source", default=legacy_path, help="legacy JSON index (default: %(default)s)")
+    parser.add_argument("--dest", default=index_dir, help="binary index directory (default: %(default)s)")
+    parser.add_argument(
+        "--embed-model",
+        default=configured_embed_model(),
+        help="model that produced the JSON vectors (default: the EMBED_PROVIDER embedder, %(default)s); "
+        "the app rebuilds indexes of any other model",
+    )
+    args = parser.parse_args()
+
+    index = migrate_json_index(args.source, args.dest, args.embed_model)
+    print(f"Migrated {len(index)} chunks ({index.dim} dims) -> {args.dest}")
+
+if __name__ == "__main__":
+    main()
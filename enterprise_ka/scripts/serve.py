@@ -0,0 +1,97 @@
+"""
+Preforking launcher: loads the index once in a parent process, then forks the uvicorn workers.
+
+The vectors, texts, quantized codes and IVF/BM25 arrays are read-only memory maps of the index
+files, so every worker reads the parent's page-cache copy; the Python objects built at load time
+(BM25 vocabulary, document spans) are inherited copy-on-write and frozen out of the GC so they stay
+shared. `uvicorn --workers N` instead starts N fresh interpreters that each load the index.
+
+Usage:
+    python -m scripts.serve --workers 4 --port 8000
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+import app.main
+from app.core.config import settings
+from app.core.logging import stop_logging
+
+log = logging.getLogger("app.serve")
+
+
+def _worker(sock: socket.socket, args: argparse.Namespace) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app.main.app, host=args.host, port=args.port, log_level=args.log_level)
+    code = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        log.exception("Worker crashed")
+        code = 1
+    finally:
+        stop_logging()
+        os._exit(code)
+
+async def _preload() -> None:
+    await app.main.retriever.warmup()
+    # A startup build embeds through the pool; workers must not inherit its keep-alive sockets.
+    await app.main.http_pool.aclose()
+
+def _spawn(sock: socket.socket, args: argparse.Namespace) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _worker(sock, args)
+    return pid
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--log-level", default=settings.log_level.lower())
+    args = parser.parse_args()
+
+    sock = uvicorn.Config(app.main.app, host=args.host, port=args.port).bind_socket()
+    asyncio.run(_preload())
+    # Objects created so far are shared with the workers; keep the collector from touching (copying) them.
+    gc.collect()
+    gc.freeze()
+
+    stopping = False
+    workers: dict[int, float] = {}
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(args.workers):
+        workers[_spawn(sock, args)] = time.monotonic()
+    log.info("Workers started", extra={"workers": args.workers, "parent_pid": os.getpid()})
+
+    while workers:
+        pid, status = os.wait()
+        started = workers.pop(pid, None)
+        if stopping or started is None:
+            continue
+        log.warning("Worker exited; restarting", extra={"pid": pid, "exit_code": os.waitstatus_to_exitcode(status)})
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # crashing at startup: do not spin
+        if not stopping:
+            workers[_spawn(sock, args)] = time.monotonic()
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.rag.ann import AnnConfig, IVFIndex
+from app.rag.index import normalize_rows, top_k_indices
+
+
+def _corpus(n: int = 2_000, dim: int = 32) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, dim))
+    return normalize_rows(centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dim)))
+
+
+def test_ivf_with_all_lists_probed_matches_exact_search(tmp_path):
+    matrix = _corpus()
+    ivf = IVFIndex.build(matrix, AnnConfig(mode="ivf", nlist=16), build_id="b1")
+    assert ivf.list_offsets[-1] == len(matrix) and sorted(ivf.list_rows.tolist()) == list(range(len(matrix)))
+
+    q = matrix[123] + 0.01
+    rows, scores = ivf.search(matrix, q, top_k=5, nprobe=ivf.nlist)
+    exact = top_k_indices(matrix @ normalize_rows(q), 5)
+    assert rows.tolist() == exact.tolist()
+
+    ivf.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+    assert loaded is not None and loaded.build_id == "b1"
+    assert loaded.search(matrix, q, top_k=5, nprobe=2)[0][0] == 123
+
+
+def test_ivf_recall_is_high_with_few_probes():
+    matrix = _corpus()
+    ivf = IVFIndex.build(matrix, AnnConfig(mode="ivf", nlist=32))
+    rng = np.random.default_rng(1)
+    recalls = []
+    for row in rng.integers(0, len(matrix), 50):
+        q = normalize_rows(matrix[row] + 0.05 * rng.standard_normal(matrix.shape[1]))
+        exact = set(top_k_indices(matrix @ q, 10).tolist())
+        found = set(ivf.search(matrix, q, top_k=10, nprobe=8)[0].tolist())
+        recalls.append(len(exact & found) / 10)
+    assert np.mean(recalls) > 0.9
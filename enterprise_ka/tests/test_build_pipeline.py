@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from app.llm.base import Embedder
+from app.rag.builder import chunk_doc
+from app.rag.checkpoint import CheckpointingEmbedder, EmbeddingCheckpoint
+from app.rag.pipeline import BuildProgress, parallel_chunker
+from app.rag.retriever import Retriever
+
+
+class FlakyEmbedder(Embedder):
+    model = "flaky-embed"
+
+    def __init__(self, fail_after_calls: int | None = None):
+        self.fail_after_calls = fail_after_calls
+        self.texts: list[str] = []
+        self.calls = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.fail_after_calls is not None and self.calls >= self.fail_after_calls:
+            raise RuntimeError("429 Too Many Requests")
+        self.calls += 1
+        self.texts.extend(texts)
+        return [[float(len(t)), float(sum(map(ord, t)) % 89), 1.0] for t in texts]
+
+
+def _write_docs(docs) -> None:
+    docs.mkdir()
+    for i in range(6):
+        text = " ".join(f"Runbook {i} step {n}: escalate SEV{i} incidents." for n in range(30))
+        (docs / f"doc{i}.txt").write_text(text, encoding="utf-8")
+
+
+def _retriever(tmp_path, embedder: Embedder) -> Retriever:
+    return Retriever(str(tmp_path / "docs"), str(tmp_path / "index"), embedder, max_chars=200, overlap=20)
+
+
+async def test_interrupted_build_resumes_from_checkpoint_and_publishes_atomically(tmp_path):
+    _write_docs(tmp_path / "docs")
+    staging = str(tmp_path / "index.staging")
+
+    flaky = FlakyEmbedder(fail_after_calls=2)
+    checkpoint = EmbeddingCheckpoint(staging, flaky.model)
+    chunker = parallel_chunker(str(tmp_path / "docs"), flaky.model, 200, 20, workers=2)
+    with pytest.raises(RuntimeError):
+        await _retriever(tmp_path, CheckpointingEmbedder(flaky, checkpoint)).rebuild(
+            chunker=chunker, embed_flush=8, versioned=True
+        )
+    assert len(checkpoint) == 16 and not os.path.exists(tmp_path / "index")
+
+    resumed = FlakyEmbedder()
+    checkpoint = EmbeddingCheckpoint(staging, resumed.model)
+    progress = BuildProgress()
+    retriever = _retriever(tmp_path, CheckpointingEmbedder(resumed, checkpoint, on_batch=progress.batch_done))
+    chunker = parallel_chunker(str(tmp_path / "docs"), resumed.model, 200, 20, workers=2, progress=progress)
+    stats = await retriever.rebuild(chunker=chunker, embed_flush=8, versioned=True)
+
+    assert not set(resumed.texts) & set(flaky.texts)  # nothing embedded twice
+    assert len(resumed.texts) == stats.chunks_embedded - 16
+    assert progress.chunks_resumed == 16 and progress.docs_done == progress.docs_total == 6
+    assert os.path.islink(tmp_path / "index")
+    first_target = os.readlink(tmp_path / "index")
+
+    # A later incremental rebuild through the plain Retriever path keeps the symlink layout.
+    (tmp_path / "docs" / "doc0.txt").write_text("Changed runbook.", encoding="utf-8")
+    await retriever.rebuild()
+    assert os.path.islink(tmp_path / "index") and os.readlink(tmp_path / "index") != first_target
+    hits = await retriever.search("Changed runbook.", top_k=1)
+    assert hits[0][0].doc_id == "doc0"
+
+
+
+def test_parallel_chunker_streams_files_above_the_pooled_size_limit(tmp_path):
+    _write_docs(tmp_path / "docs")
+    (tmp_path / "docs" / "small.txt").write_text("A short note.", encoding="utf-8")
+    docs = str(tmp_path / "docs")
+    chunker = parallel_chunker(docs, "m", 200, 20, workers=2, max_pooled_bytes=100)
+    known = {"doc1": chunk_doc("doc1", str(tmp_path / "docs" / "doc1.txt"), "m", 200, 20).key}
+
+    chunked = {doc.doc_id: doc for doc in chunker(known)}
+    assert chunked["doc1"].chunks is None  # unchanged: reused, not chunked
+    assert isinstance(chunked["small"].chunks, list)
+    assert not isinstance(chunked["doc0"].chunks, list)  # large: a lazy stream, not a shipped list
+    for doc_id in ("doc0", "small"):
+        inline = chunk_doc(doc_id, str(tmp_path / "docs" / f"{doc_id}.txt"), "m", 200, 20)
+        assert chunked[doc_id].key == inline.key
+        assert list(chunked[doc_id].chunks or []) == list(inline.chunks or [])
+
+
+def test_checkpoint_truncates_uncommitted_rows(tmp_path):
+    import numpy as np
+
+    checkpoint = EmbeddingCheckpoint(str(tmp_path), "m")
+    checkpoint.append(["a" * 64, "b" * 64], np.ones((2, 3), dtype=np.float32))
+    with open(tmp_path / "vectors.f32", "ab") as f:  # a crash mid-append
+        f.write(b"\0" * 7)
+
+    reopened = EmbeddingCheckpoint(str(tmp_path), "m")
+    assert len(reopened) == 2 and os.path.getsize(tmp_path / "vectors.f32") == 2 * 3 * 4
+    assert sorted(reopened.lookup(["b" * 64, "c" * 64])) == [0]
+    assert len(EmbeddingCheckpoint(str(tmp_path), "other-model")) == 0
+
+
+def test_checkpoint_lookup_sees_appended_rows_and_resets_without_its_data_files(tmp_path):
+    import numpy as np
+
+    checkpoint = EmbeddingCheckpoint(str(tmp_path), "m")
+    checkpoint.append(["a" * 64], np.full((1, 3), 1.0, dtype=np.float32))
+    assert checkpoint.lookup(["a" * 64])[0].tolist() == [1.0, 1.0, 1.0]
+    checkpoint.append(["b" * 64], np.full((1, 3), 2.0, dtype=np.float32))
+    found = checkpoint.lookup(["b" * 64, "a" * 64])
+    assert found[0].tolist() == [2.0, 2.0, 2.0] and found[1].tolist() == [1.0, 1.0, 1.0]
+
+    os.truncate(tmp_path / "vectors.f32", 4)  # committed rows lost from disk
+    assert len(EmbeddingCheckpoint(str(tmp_path), "m")) == 0
+    checkpoint = EmbeddingCheckpoint(str(tmp_path), "m")
+    checkpoint.append(["a" * 64], np.ones((1, 3), dtype=np.float32))
+    os.remove(tmp_path / "vectors.f32")
+    os.remove(tmp_path / "keys.txt")
+    reopened = EmbeddingCheckpoint(str(tmp_path), "m")
+    assert len(reopened) == 0 and reopened.lookup(["a" * 64]) == {}
@@ -0,0 +1,83 @@
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.llm.base import Embedder
+from app.rag.answer_cache import RETIRED_VERSIONS, AnswerCache
+from app.rag.retriever import Retriever, build_query_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_by_entries_bytes_and_ttl():
+    clock = FakeClock()
+    cache: LRUCache[bytes] = LRUCache(max_entries=2, max_bytes=10, ttl_s=5, sizeof=len, clock=clock)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # "a" is now most recently used
+    cache.put("c", b"1234")  # entry bound evicts least recently used "b"
+    assert cache.get("b") is None and cache.get("c") == b"1234"
+
+    cache.put("d", b"1234567")  # over both bounds: evicts "a", then "c" (4 + 7 > 10)
+    assert len(cache) == 1 and cache.nbytes == 7
+
+    clock.now = 6
+    assert cache.get("d") is None
+    assert cache.stats.expirations == 1 and cache.stats.evictions == 3
+    assert cache.snapshot()["hits"] == 2
+
+
+class OneHotEmbedder(Embedder):
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return [[1.0, 0.0] for _ in texts]
+
+
+async def test_repeat_queries_skip_the_embedder(tmp_path):
+    embedder = OneHotEmbedder()
+    cache = build_query_cache(max_entries=10, max_bytes=1 << 20, ttl_s=60)
+    retriever = Retriever(str(tmp_path), str(tmp_path / "index"), embedder, 100, 10, query_cache=cache)
+
+    first = await retriever.embed_query("What is the SEV1 policy?")
+    again = await retriever.embed_query("  what is the   sev1 policy?")
+
+    assert embedder.calls == 1
+    assert again is first and np.allclose(first, [1.0, 0.0])
+    assert cache.snapshot()["hits"] == 1 and cache.snapshot()["misses"] == 1
+
+
+def test_answer_cache_checks_similarity_and_index_version():
+    cache = AnswerCache(max_entries=10, max_bytes=1 << 20, ttl_s=60, min_similarity=0.9)
+    key = AnswerCache.key("grounded_concise", "v1.1", ["doc::c1", "doc::c0"], [])
+    q = np.array([1.0, 0.0], dtype=np.float32)
+    cache.put(key, "v1", q, "answer")
+
+    same_chunks = AnswerCache.key("grounded_concise", "v1.1", ["doc::c0", "doc::c1"], [])
+    assert cache.get(same_chunks, "v1", np.array([0.99, 0.05], dtype=np.float32)) == "answer"
+    assert cache.get(same_chunks, "v1", np.array([0.0, 1.0], dtype=np.float32)) is None  # unrelated question
+    assert cache.get(AnswerCache.key("grounded_reasoned", "v1.1", ["doc::c0", "doc::c1"], []), "v1", q) is None
+
+    assert cache.get(same_chunks, "v2", q) is None  # index rebuilt -> everything dropped
+    assert cache.snapshot()["entries"] == 0
+
+    cache.put(same_chunks, "v2", q, "new answer")
+    cache.put(same_chunks, "v1", q, "stale answer")  # request still on the old index after a reload
+    assert cache.get(same_chunks, "v1", q) is None
+    assert cache.get(same_chunks, "v2", q) == "new answer"
+    assert cache.snapshot()["hits"] == 2 and cache.snapshot()["similarity_rejects"] == 1
+
+    for n in range(3, 3 + 2 * RETIRED_VERSIONS):  # many hot reloads
+        cache.put(same_chunks, f"v{n}", q, "answer")
+    assert len(cache._retired) == RETIRED_VERSIONS
+    assert cache.get(same_chunks, f"v{1 + 2 * RETIRED_VERSIONS}", q) is None  # recently retired: still skipped
+    assert cache.get(same_chunks, f"v{2 + 2 * RETIRED_VERSIONS}", q) == "answer"
@@ -0,0 +1,57 @@
+import random
+import tracemalloc
+
+from app.rag.chunking import chunk_text, iter_chunks, iter_file_chunks, normalize_stream
+
+
+def _reference_chunks(text: str, max_chars: int, overlap: int) -> list[str]:
+    # The original whole-document implementation.
+    cleaned = " ".join(text.split())
+    out, start = [], 0
+    while start < len(cleaned):
+        end = min(start + max_chars, len(cleaned))
+        out.append(cleaned[start:end])
+        if end == len(cleaned):
+            break
+        start = max(0, end - overlap)
+    return out
+
+
+def test_streaming_chunks_match_whole_document_chunking():
+    rng = random.Random(0)
+    for _ in range(300):
+        text = "".join(rng.choice("ab c\n\t  .") for _ in range(rng.randint(0, 2000)))
+        max_chars = rng.randint(2, 150)
+        overlap = rng.randint(0, max_chars - 1)
+        size = rng.randint(1, 40)
+        blocks = [text[i:i + size] for i in range(0, len(text), size)]
+        streamed = [c.text for c in iter_chunks("d", normalize_stream(blocks), max_chars, overlap)]
+        assert streamed == _reference_chunks(text, max_chars, overlap)
+        assert [c.text for c in chunk_text("d", text, max_chars, overlap)] == streamed
+
+
+def test_sentence_and_paragraph_boundaries(tmp_path):
+    text = "First sentence here. Second one follows!\n\nNew paragraph starts. " * 20
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+
+    sentences = list(iter_file_chunks("doc", str(path), max_chars=100, overlap=10, boundary="sentence"))
+    assert all(c.text.endswith((".", "!")) for c in sentences[:-1])
+    paragraphs = list(iter_file_chunks("doc", str(path), max_chars=100, overlap=0, boundary="paragraph"))
+    assert all(len(c.text) <= 100 for c in paragraphs)
+    assert any(c.text.endswith("Second one follows!") for c in paragraphs)
+
+
+def test_file_chunking_memory_is_bounded_by_block_size(tmp_path):
+    path = tmp_path / "big.txt"
+    line = "incident escalation runbook   policy\n" * 1000
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(200):  # ~7.4 MB
+            f.write(line)
+
+    tracemalloc.start()
+    count = sum(1 for _ in iter_file_chunks("big", str(path), max_chars=900, overlap=120, block_chars=64 * 1024))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert count > 8000
+    assert peak < 2 * 1024 * 1024
@@ -0,0 +1,193 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+
+from app.llm.base import Embedder
+from app.llm.batching import plan_batches
+from app.llm.coalescer import CoalescingEmbedder
+from app.llm.http import HttpClientPool
+from app.llm.local_embed import HashingEmbedder
+from app.llm.openai_chat import OpenAIEmbedder
+from app.rag.index import migrate_json_index
+from app.rag.retriever import Retriever
+
+
+def test_plan_batches_respects_item_and_token_budgets():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 400, "e" * 4]  # ~10, 10, 10, 100, 1 tokens
+    assert plan_batches(texts, max_items=2, max_tokens=1_000) == [[0, 1], [2, 3], [4]]
+    assert plan_batches(texts, max_items=10, max_tokens=25) == [[0, 1], [2], [3], [4]]
+
+
+async def test_embed_runs_batches_concurrently_and_keeps_order(monkeypatch):
+    embedder = OpenAIEmbedder("key", "model", max_batch_items=3, max_concurrency=2)
+    in_flight = 0
+    peak = 0
+
+    async def fake_batch(texts: list[str]) -> list[list[float]]:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01 * (len(texts) % 3))  # finish out of submission order
+        in_flight -= 1
+        return [[float(t)] for t in texts]
+
+    monkeypatch.setattr(embedder, "_embed_batch", fake_batch)
+    texts = [str(i) for i in range(10)]
+    vectors = await embedder.embed(texts)
+
+    assert vectors == [[float(i)] for i in range(10)]
+    assert peak == 2
+
+
+
+async def test_embed_surfaces_the_upstream_status_when_one_batch_fails(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        texts = json.loads(request.content)["input"]
+        if "poison" in texts:
+            return httpx.Response(429, json={"error": {"message": "rate limited"}})
+        return httpx.Response(200, json={"data": [{"index": i, "embedding": [1.0]} for i in range(len(texts))]})
+
+    monkeypatch.setattr(OpenAIEmbedder._embed_batch.retry, "sleep", lambda _: asyncio.sleep(0))
+    http = HttpClientPool(transport=httpx.MockTransport(handler))
+    embedder = OpenAIEmbedder("key", "model", base_url="http://upstream", max_batch_items=2, http=http)
+    with pytest.raises(httpx.HTTPStatusError) as excinfo:
+        await embedder.embed(["a", "b", "c", "poison", "e"])
+    await http.aclose()
+    assert excinfo.value.response.status_code == 429
+
+
+class RecordingEmbedder(Embedder):
+    model = "fake"
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        await asyncio.sleep(0.01)
+        return [[float(len(t))] for t in texts]
+
+
+async def test_coalescer_batches_concurrent_queries_and_dedupes():
+    inner = RecordingEmbedder()
+    coalescer = CoalescingEmbedder(inner, window_ms=5, max_batch=3)
+
+    questions = ["a", "bb", "a", "ccc", "dddd", "a"]
+    results = await asyncio.gather(*(coalescer.embed([q]) for q in questions))
+
+    assert results == [[[float(len(q))]] for q in questions]
+    # "a" is embedded once; max_batch=3 flushes the first batch early, the rest waits for the window
+    assert inner.calls == [["a", "bb", "ccc"], ["dddd"]]
+    assert coalescer.snapshot()["texts_deduped"] == 2
+
+
+async def test_coalescer_propagates_upstream_errors_to_every_waiter():
+    class FailingEmbedder(Embedder):
+        async def embed(self, texts: list[str]) -> list[list[float]]:
+            raise RuntimeError("rate limited")
+
+    coalescer = CoalescingEmbedder(FailingEmbedder(), window_ms=1)
+    results = await asyncio.gather(coalescer.embed(["x"]), coalescer.embed(["y"]), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+
+async def test_coalescer_never_leaves_waiters_hanging_on_a_short_or_cancelled_batch():
+    class ShortEmbedder(RecordingEmbedder):
+        short = True
+
+        async def embed(self, texts: list[str]) -> list[list[float]]:
+            vectors = await super().embed(texts)
+            return vectors[:-1] if self.short else vectors
+
+    inner = ShortEmbedder()
+    coalescer = CoalescingEmbedder(inner, window_ms=1)
+    results = await asyncio.wait_for(
+        asyncio.gather(coalescer.embed(["x"]), coalescer.embed(["y"]), return_exceptions=True), 1
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+
+    inner.short = False
+    waiter = asyncio.ensure_future(coalescer.embed(["x"]))
+    await asyncio.sleep(0.005)  # window elapsed: the upstream call is running
+    for task in list(coalescer._tasks):
+        task.cancel()
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(waiter, 1)
+
+    # Neither failure left "x" stuck in flight: the next caller gets a fresh upstream call.
+    assert await asyncio.wait_for(coalescer.embed(["x"]), 1) == [[1.0]]
+
+
+def test_hashing_embedder_is_deterministic_normalized_and_batch_independent():
+    texts = ["Rotate VPN credentials every 90 days.", "Page the incident commander for SEV1.", "", "!!!"]
+    embedder = HashingEmbedder(dim=64, bits=12, max_batch_items=2)
+    batched = embedder.embed_array(texts)
+    single = np.vstack([HashingEmbedder(dim=64, bits=12).embed_array([t]) for t in texts])
+
+    assert batched.shape == (4, 64) and batched.dtype == np.float32
+    assert np.allclose(batched, single, atol=1e-6)
+    assert np.allclose(np.linalg.norm(batched[:2], axis=1), 1.0, atol=1e-5)
+    assert not batched[2:].any()  # nothing to hash
+
+
+async def test_hashing_embedder_ranks_shared_wording_above_unrelated_text():
+    embedder = HashingEmbedder()
+    query, near, far = await embedder.embed(
+        ["how do I rotate my VPN credentials", "Rotate VPN credentials every 90 days.", "The cafeteria opens at 8am."]
+    )
+    assert np.dot(query, near) > np.dot(query, far) + 0.2
+
+
+def test_fitted_hashing_embedder_round_trips_and_names_its_vector_space(tmp_path):
+    corpus = ["the policy covers VPN access", "the policy covers expenses", "the runbook covers SEV1 paging"]
+    fitted = HashingEmbedder(dim=32, bits=10).fit(corpus, batch_size=2)
+    path = str(tmp_path / "local_embed.npz")
+    fitted.save(path)
+    loaded = HashingEmbedder.load(path)
+
+    assert fitted.model != HashingEmbedder(dim=32, bits=10).model
+    assert loaded.model == fitted.model
+    assert np.array_equal(loaded.embed_array(corpus), fitted.embed_array(corpus))
+    common, rare = fitted._features(["the"])[1], fitted._features(["SEV1"])[1]
+    assert fitted.idf[common].mean() < fitted.idf[rare].mean()  # n-grams in every text weigh least
+
+
+async def test_retriever_with_local_embedder_rebuilds_index_from_another_model(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "security_policy.txt").write_text("Rotate VPN credentials every 90 days.", encoding="utf-8")
+    (docs / "oncall.txt").write_text("Page the incident commander for SEV1 incidents.", encoding="utf-8")
+    index_path = str(tmp_path / "index")
+    await Retriever(str(docs), index_path, HashingEmbedder(dim=32), max_chars=200, overlap=20).warmup()
+
+    retriever = Retriever(str(docs), index_path, HashingEmbedder(dim=64), max_chars=200, overlap=20)
+    await retriever.warmup()
+    retrieval = await retriever.retrieve("who pages the incident commander?", top_k=1)
+
+    assert retriever._index.dim == 64
+    assert retrieval.hits[0][0].doc_id == "oncall"
+
+
+async def test_switching_provider_never_serves_vectors_of_another_model(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "oncall.txt").write_text("Page the incident commander for SEV1 incidents.", encoding="utf-8")
+    # Legacy index.json from the remote embedder: 3072-dim vectors, no model recorded.
+    legacy = [{"doc_id": "oncall", "chunk_id": "oncall::c0", "text": "Page the commander.", "vector": [0.1] * 3072}]
+    (tmp_path / "index.json").write_text(json.dumps(legacy), encoding="utf-8")
+    index_path = str(tmp_path / "index")
+
+    retriever = Retriever(str(docs), index_path, HashingEmbedder(dim=256), max_chars=200, overlap=20)
+    await retriever.warmup()
+    assert retriever._index.dim == 256
+    assert (await retriever.retrieve("who pages the commander?", top_k=1)).hits[0][0].doc_id == "oncall"
+
+    # An index dir without an embed_model (e.g. migrated by hand) is rebuilt too, not migrated over again.
+    migrate_json_index(str(tmp_path / "index.json"), index_path)
+    retriever = Retriever(str(docs), index_path, HashingEmbedder(dim=256), max_chars=200, overlap=20)
+    await retriever.warmup()
+    assert retriever._index.dim == 256 and retriever._index.meta["embed_model"] == retriever.embedder.model
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from app.llm.http import HttpClientPool, HttpPoolConfig
+from app.llm.openai_chat import OpenAIChatClient, OpenAIEmbedder
+
+
+class StubOpenAIServer:
+    """Minimal keep-alive HTTP/1.1 server that counts TCP connections."""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode().split("\r\n")
+                headers = {k.lower(): v for k, v in (line.split(": ", 1) for line in header_lines if ": " in line)}
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+                self.requests += 1
+                if request_line.split()[1].endswith("/embeddings"):
+                    data = {"data": [{"index": i, "embedding": [1.0, 0.0]} for i, _ in enumerate(body["input"])]}
+                else:
+                    data = {"choices": [{"message": {"content": "ok"}}]}
+                payload = json.dumps(data).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                    + f"content-length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def test_shared_pool_reuses_connections_across_calls_and_adapters():
+    async with StubOpenAIServer() as server:
+        pool = HttpClientPool(HttpPoolConfig(max_keepalive_connections=4))
+        chat = OpenAIChatClient("key", "model", server.base_url, http=pool)
+        embedder = OpenAIEmbedder("key", "embed", server.base_url, http=pool)
+
+        for _ in range(5):
+            assert await chat.generate("system", "user") == "ok"
+            assert await embedder.embed(["q"]) == [[1.0, 0.0]]
+
+        assert server.requests == 10
+        assert server.connections == 1
+        assert pool.client(server.base_url) is pool.client(server.base_url + "/")
+
+        await pool.aclose()
+        assert pool.client(server.base_url).is_closed is False  # reopened lazily after close
+        await pool.aclose()
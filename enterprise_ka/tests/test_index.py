@@ -0,0 +1,153 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.rag.index import (
+    DocFilter,
+    DocSpan,
+    IndexedChunk,
+    RowPartition,
+    StringTable,
+    VectorIndex,
+    atomic_output,
+    load_index,
+    load_npz,
+    migrate_json_index,
+    recover_index_dir,
+    resolve_index_paths,
+    save_index,
+)
+from app.rag.lexical import LEXICAL_FILE, BM25Index
+
+
+def _items() -> list[IndexedChunk]:
+    return [
+        IndexedChunk(doc_id="runbook", chunk_id="runbook::c0", text="Page the on-call SRE", vector=[1.0, 0.0, 0.0]),
+        IndexedChunk(doc_id="policy", chunk_id="policy::c0", text="Rotate keys every 90 days ✓", vector=[0.0, 2.0, 0.0]),
+        IndexedChunk(doc_id="runbook", chunk_id="runbook::c1", text="SEV1: escalate in 15 minutes", vector=[0.6, 0.0, 0.8]),
+    ]
+
+
+def test_binary_index_roundtrip_is_memory_mapped(tmp_path):
+    index_dir = str(tmp_path / "index")
+    save_index(index_dir, VectorIndex.from_items(_items(), meta={"embed_model": "test"}))
+
+    loaded = load_index(index_dir)
+    assert isinstance(loaded.matrix, np.memmap)
+    assert len(loaded) == 3 and loaded.dim == 3
+    assert loaded.meta["embed_model"] == "test" and loaded.build_id
+    # rows are grouped per document so each doc is a contiguous range
+    assert [(d.doc_id, d.start, d.end) for d in loaded.docs] == [("runbook", 0, 2), ("policy", 2, 3)]
+    assert loaded.chunk(2).text == "Rotate keys every 90 days ✓"
+
+    (top, score), = loaded.search(np.array([0.0, 1.0, 0.0]), top_k=1)
+    assert top.chunk_id == "policy::c0" and abs(score - 1.0) < 1e-6
+
+
+def test_plain_index_save_keeps_a_complete_index_on_disk_throughout(tmp_path):
+    index_dir = str(tmp_path / "index")
+    save_index(index_dir, VectorIndex.from_items(_items(), meta={"build_id": "old"}))
+    seen: list[str] = []
+
+    def writer(staged: str) -> None:  # runs before the swap: the previous index must still be intact
+        seen.append(load_index(index_dir).build_id)
+
+    save_index(index_dir, VectorIndex.from_items(_items()[:2], meta={"build_id": "new"}), writers=[writer])
+    assert seen == ["old"] and load_index(index_dir).build_id == "new"
+    assert not os.path.exists(index_dir + ".old")
+
+    os.replace(index_dir, index_dir + ".old")  # crash between moving the old index aside and the swap
+    assert recover_index_dir(index_dir)
+    assert load_index(index_dir).build_id == "new" and not recover_index_dir(index_dir)
+
+
+def test_load_npz_memory_maps_uncompressed_members(tmp_path):
+    path = str(tmp_path / "arrays.npz")
+    arrays = {
+        "rows": np.arange(10, dtype=np.int32),
+        "matrix": np.asfortranarray(np.arange(12, dtype=np.float32).reshape(3, 4)),
+        "empty": np.zeros(0, dtype=np.int64),
+        "build_id": np.array("b1"),
+    }
+    np.savez(path, **arrays)
+
+    loaded = load_npz(path)
+    assert isinstance(loaded["rows"], np.memmap) and isinstance(loaded["matrix"], np.memmap)
+    assert not loaded["rows"].flags.writeable
+    for name, expected in arrays.items():
+        assert np.array_equal(loaded[name], expected) and loaded[name].dtype == expected.dtype
+    assert str(loaded["build_id"]) == "b1"
+
+    np.savez_compressed(path, **arrays)
+    assert np.array_equal(load_npz(path)["matrix"], arrays["matrix"])
+
+
+def test_artifacts_are_replaced_without_disturbing_readers_of_the_old_file(tmp_path):
+    BM25Index.build(["alpha beta", "gamma"], build_id="old").save(str(tmp_path))
+    mapped = load_npz(str(tmp_path / LEXICAL_FILE))  # a serving worker's view of the published file
+    before = np.array(mapped["rows"])
+
+    BM25Index.build(["delta", "epsilon zeta", "eta"], build_id="new").save(str(tmp_path))
+    assert np.array_equal(mapped["rows"], before)  # the old mapping still reads the old contents
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded is not None and loaded.build_id == "new"
+
+    with pytest.raises(RuntimeError), atomic_output(str(tmp_path / LEXICAL_FILE)) as path:
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("crash mid-write")
+    assert sorted(os.listdir(tmp_path)) == [LEXICAL_FILE]
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded is not None and loaded.build_id == "new"
+
+
+def test_partition_resolves_doc_ids_prefixes_and_tags_to_row_ranges(tmp_path):
+    docs = [
+        DocSpan("hr_policy", 0, 3, tags=("hr", "policy")),
+        DocSpan("security_policy", 3, 5, tags=("policy", "security")),
+        DocSpan("sec_runbook", 5, 9, tags=("oncall",)),
+        DocSpan("empty", 9, 9, tags=("policy",)),
+        DocSpan("oncall_runbook", 9, 12, tags=("oncall",)),
+    ]
+    ids = StringTable.from_strings([f"c{i}" for i in range(12)])
+    index = VectorIndex(np.eye(12, dtype=np.float32), ids, ids, docs)
+
+    def rows(**kwargs) -> list[int]:
+        return index.partition(DocFilter(**kwargs)).rows().tolist()
+
+    assert rows(tags=("Policy",)) == [0, 1, 2, 3, 4]  # adjacent docs merge into one range
+    assert index.partition(DocFilter(tags=("policy",))).starts.tolist() == [0]
+    assert rows(prefixes=("sec",)) == [3, 4, 5, 6, 7, 8]
+    assert rows(prefixes=("sec",), tags=("oncall",)) == [5, 6, 7, 8]
+    assert rows(doc_ids=("oncall_runbook", "hr_policy", "nope")) == [0, 1, 2, 9, 10, 11]
+    assert rows(doc_ids=("nope",)) == [] and rows(tags=("legal",)) == []
+
+    partition = index.partition(DocFilter(doc_ids=("hr_policy", "oncall_runbook")))
+    assert len(partition) == 6
+    assert partition.contains(np.arange(12)).nonzero()[0].tolist() == [0, 1, 2, 9, 10, 11]
+    matrix = np.random.default_rng(0).standard_normal((300, 4)).astype(np.float32)
+    q = np.ones(4, dtype=np.float32)
+    for part in (partition, RowPartition(np.array([0, 100]), np.array([80, 300]))):  # gathered / sliced
+        assert np.allclose(part.scores(matrix, q), matrix[part.rows()] @ q, atol=1e-5)
+
+    save_index(str(tmp_path / "index"), index)
+    loaded = load_index(str(tmp_path / "index"))
+    assert loaded.docs == docs
+    assert loaded.partition(DocFilter(tags=("security",))).rows().tolist() == [3, 4]
+
+
+def test_migrates_legacy_json_index(tmp_path):
+    json_path = tmp_path / "index.json"
+    json_path.write_text(json.dumps([x.__dict__ for x in _items()]), encoding="utf-8")
+
+    index_dir, legacy = resolve_index_paths(str(json_path))
+    assert legacy == str(json_path) and index_dir == str(tmp_path / "index")
+
+    with pytest.raises(ValueError, match="3-dim"):
+        migrate_json_index(legacy, index_dir, "text-embedding-3-large", expect_dim=3072)
+    index = migrate_json_index(legacy, index_dir, "text-embedding-3-large", expect_dim=3)
+    assert load_index(index_dir).meta["migrated_from"] == "index.json"
+    assert index.meta["embed_model"] == "text-embedding-3-large"
+    assert {index.chunk(i).chunk_id for i in range(len(index))} == {"runbook::c0", "runbook::c1", "policy::c0"}
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import numpy as np
+
+import app.rag.retriever as retriever_module
+from app.llm.base import Embedder
+from app.rag.index import RowPartition
+from app.rag.lexical import BM25Index, HybridConfig, reciprocal_rank_fusion, tokenize
+from app.rag.retriever import Retriever
+
+TEXTS = [
+    "SEV1: page primary and secondary on-call immediately.",
+    "SEV2 incidents are handled during business hours.",
+    "Error ERR-4312 means the token cache is stale; restart the auth sidecar.",
+    "Rotate credentials every 90 days and never share passwords.",
+]
+
+
+def test_tokenizer_keeps_codes_and_their_parts():
+    assert tokenize("Saw ERR-4312 during SEV1") == ["saw", "err-4312", "err", "4312", "during", "sev1"]
+
+
+def test_bm25_ranks_exact_code_first_and_roundtrips(tmp_path):
+    bm25 = BM25Index.build(TEXTS, build_id="b1")
+    result = bm25.search("what does err-4312 mean?", top_k=3)
+    assert result.rows[0] == 2 and result.confidence > 0.6
+    assert bm25.search("share passwords", top_k=3).confidence == 0.0  # no ID-like term
+    scoped = RowPartition(np.array([1]), np.array([4]))
+    assert bm25.search("SEV1 or SEV2 incidents", top_k=3, partition=scoped).rows.tolist() == [1]
+    assert len(bm25.search("SEV1", top_k=3, partition=RowPartition(np.array([2]), np.array([4]))).rows) == 0
+
+    bm25.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded is not None and loaded.build_id == "b1"
+    assert loaded.search("SEV2", top_k=1).rows.tolist() == [1]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([np.array([5, 1, 2]), np.array([1, 7])], top_k=3)
+    assert fused.tolist() == [1, 5, 7]
+
+
+class KeywordEmbedder(Embedder):
+    model = "kw-embed"
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.started.set()
+        words = ("sev", "err", "credentials", "hours")
+        return [[float(w in t.lower()) for w in words] + [0.1] for t in texts]
+
+
+async def _hybrid_retriever(tmp_path, hybrid: HybridConfig) -> tuple[Retriever, KeywordEmbedder]:
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i, text in enumerate(TEXTS):
+        (docs / f"d{i}.txt").write_text(text, encoding="utf-8")
+    embedder = KeywordEmbedder()
+    retriever = Retriever(str(docs), str(tmp_path / "index"), embedder, max_chars=200, overlap=20, hybrid=hybrid)
+    await retriever.warmup()
+    return retriever, embedder
+
+
+async def test_hybrid_retriever_fast_path_skips_embedding(tmp_path):
+    retriever, embedder = await _hybrid_retriever(tmp_path, HybridConfig())
+    build_calls = embedder.calls
+
+    lookup = await retriever.retrieve("ERR-4312", top_k=2)
+    assert lookup.mode == "lexical" and lookup.query_vector is None
+    assert lookup.hits[0][0].doc_id == "d2"
+    await asyncio.sleep(0)
+    assert embedder.calls == build_calls
+
+    fused = await retriever.retrieve("how often should credentials rotate", top_k=2)
+    assert fused.mode == "hybrid" and fused.hits[0][0].doc_id == "d3"
+    assert embedder.calls == build_calls + 1
+
+
+async def test_hybrid_retriever_without_fast_path_embeds_while_bm25_runs(tmp_path, monkeypatch):
+    retriever, embedder = await _hybrid_retriever(tmp_path, HybridConfig(fast_path_confidence=0))
+    embedder.started.clear()
+    overlapped: list[bool] = []
+
+    def lexical_waiting_for_embedding(*args):
+        overlapped.append(embedder.started.wait(5))  # only returns early if the embedding already started
+        return timed_lexical(*args)
+
+    timed_lexical = retriever_module._timed_lexical
+    monkeypatch.setattr(retriever_module, "_timed_lexical", lexical_waiting_for_embedding)
+    fused = await retriever.retrieve("ERR-4312", top_k=2)
+    assert overlapped == [True] and fused.mode == "hybrid"
@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+
+from app.core.logging import JsonFormatter, SamplingFilter, configure_logging, stop_logging
+
+
+def _record(msg: str, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("app", level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_keeps_extra_fields():
+    line = JsonFormatter().format(_record("ask_ok", latency_ms=12, citations=[{"doc_id": "a"}], when=object()))
+    out = json.loads(line)
+    assert out["msg"] == "ask_ok"
+    assert out["level"] == "INFO"
+    assert out["latency_ms"] == 12
+    assert out["citations"] == [{"doc_id": "a"}]
+    assert out["when"].startswith("<object")
+
+
+def test_sampling_drops_success_events_but_keeps_warnings():
+    sampler = SamplingFilter(0.0, ["ask_ok"])
+    assert not sampler.filter(_record("ask_ok"))
+    assert sampler.filter(_record("ask_ok", level=logging.WARNING))
+    assert sampler.filter(_record("index_loaded"))
+    assert SamplingFilter(1.0, ["ask_ok"]).filter(_record("ask_ok"))
+
+
+def test_queue_mode_writes_json_from_listener_thread(capsys):
+    try:
+        configure_logging("INFO", fmt="json", use_queue=True, sample_rate=0.0, sampled_events=["ask_ok"])
+        log = logging.getLogger("test.queue")
+        log.info("ask_ok", extra={"latency_ms": 5})
+        log.info("ask_%s", "done", extra={"items": 2})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.exception("ask_failed")
+        configure_logging("INFO")  # stops (drains) the listener
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    finally:
+        with capsys.disabled():
+            configure_logging("INFO")
+
+    assert [line["msg"] for line in lines] == ["ask_done", "ask_failed"]
+    assert lines[0]["items"] == 2
+    assert "ValueError: boom" in lines[1]["exc"]
+
+
+def test_queue_listener_restarts_in_forked_worker(capfd):
+    try:
+        configure_logging("INFO", fmt="json", use_queue=True)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                logging.getLogger("test.fork").info("from_worker")
+                stop_logging()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        configure_logging("INFO")
+        lines = [json.loads(line) for line in capfd.readouterr().out.splitlines()]
+    finally:
+        with capfd.disabled():
+            configure_logging("INFO")
+
+    assert [line["msg"] for line in lines] == ["from_worker"]
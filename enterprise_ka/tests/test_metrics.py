@@ -0,0 +1,57 @@
+import pytest
+from tenacity import retry, stop_after_attempt, wait_none
+
+from app.core.metrics import UPSTREAM_RETRIES, Histogram, Registry, count_retry, snapshot_lines
+from app.core.timing import current_timings, span, start_request
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, "embed")
+
+    text = registry.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{stage="embed",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="embed",le="1"} 3' in text
+    assert 't_seconds_bucket{stage="embed",le="+Inf"} 4' in text
+    assert 't_seconds_count{stage="embed"} 4' in text
+    assert hist.count("embed") == 4
+    assert registry.histogram("t_seconds", "again") is hist
+    assert isinstance(hist, Histogram)
+
+
+def test_snapshot_lines_split_counters_and_gauges():
+    lines = snapshot_lines("ka_x", {"hits": 3, "entries": 2, "hit_rate": 0.5, "version": "v1", "enabled": True})
+    assert lines == [
+        "# TYPE ka_x_hits_total counter", "ka_x_hits_total 3",
+        "# TYPE ka_x_entries gauge", "ka_x_entries 2",
+        "# TYPE ka_x_hit_rate gauge", "ka_x_hit_rate 0.5",
+    ]
+
+
+def test_spans_accumulate_into_request_timings():
+    timings = start_request()
+    with span("embed"):
+        pass
+    with span("embed"):
+        pass
+    assert current_timings() is timings
+    assert set(timings.as_ms()) == {"embed", "total"}
+    assert timings.header().startswith("embed;dur=")
+
+
+def test_count_retry_counts_each_retry():
+    before = UPSTREAM_RETRIES.value("test", "op")
+    calls = []
+
+    @retry(stop=stop_after_attempt(3), wait=wait_none(), reraise=True, before_sleep=count_retry("test", "op"))
+    def flaky():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flaky()
+    assert len(calls) == 3
+    assert UPSTREAM_RETRIES.value("test", "op") == before + 2
@@ -0,0 +1,40 @@
+from app.rag.chunking import chunk_text
+from app.rag.packing import pack_context, suffix_prefix_overlap
+from app.rag.prompts import build_prompts
+
+
+def _blocks(chunks) -> list[dict]:
+    return [{"doc_id": c.doc_id, "chunk_id": c.chunk_id, "text": c.text} for c in chunks]
+
+
+def test_overlapping_neighbours_are_merged_back_into_the_source_text():
+    text = " ".join(f"Step {i}: page the on-call engineer and open incident bridge {i}." for i in range(40))
+    chunks = chunk_text("runbook", text, max_chars=200, overlap=50)
+    other = {"doc_id": "policy", "chunk_id": "policy::c0", "text": "Rotate keys every 90 days."}
+    # Retrieval order: c3, policy, c1, c2 -> c1..c3 form one block ranked first.
+    retrieved = _blocks([chunks[3]]) + [other] + _blocks([chunks[1], chunks[2]])
+
+    packed = pack_context(retrieved)
+    assert [b["chunk_ids"] for b in packed.blocks] == [["runbook::c1", "runbook::c2", "runbook::c3"], ["policy::c0"]]
+    start = text.index(chunks[1].text)
+    assert packed.blocks[0]["text"] == text[start:start + len(packed.blocks[0]["text"])]
+    assert packed.chunk_ids == ["runbook::c3", "policy::c0", "runbook::c1", "runbook::c2"]
+    assert packed.tokens_saved >= 2 * 50 // 4 and not packed.truncated
+
+    system, user, template = build_prompts("Who gets paged?", packed.blocks)
+    assert "[runbook::runbook::c1][runbook::runbook::c2][runbook::runbook::c3]" in user
+
+
+def test_token_budget_truncates_and_drops_lower_ranked_blocks():
+    blocks = [{"doc_id": f"d{i}", "chunk_id": f"d{i}::c0", "text": "word " * 400} for i in range(5)]
+    packed = pack_context(blocks, token_budget=700)
+    assert packed.truncated and packed.tokens <= 700
+    assert packed.chunk_ids == ["d0::c0", "d1::c0"] and packed.dropped == ["d2::c0", "d3::c0", "d4::c0"]
+    assert packed.blocks[-1]["text"].endswith(" …")
+
+
+def test_suffix_prefix_overlap():
+    assert suffix_prefix_overlap("abcdef", "defgh") == 3
+    assert suffix_prefix_overlap("abc", "xyz") == 0
+    assert suffix_prefix_overlap("aaaa", "aaab") == 3
+    assert suffix_prefix_overlap("", "abc") == 0
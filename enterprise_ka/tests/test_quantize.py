@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from app.rag.index import normalize_rows, top_k_indices
+from app.rag.quantize import QuantizedMatrix, search_quantized
+
+
+def _corpus(n: int = 3_000, dim: int = 64) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((30, dim))
+    return normalize_rows(centers[rng.integers(0, 30, n)] + 0.3 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype,ratio", [("float16", 2), ("int8", 4)])
+def test_quantized_search_with_rescoring_matches_exact_ranking(tmp_path, dtype, ratio):
+    matrix = _corpus()
+    quantized = QuantizedMatrix.quantize(matrix, dtype)
+    assert quantized.nbytes <= matrix.nbytes / ratio + matrix.shape[0] * 4
+
+    rng = np.random.default_rng(1)
+    for row in rng.integers(0, len(matrix), 20):
+        q = normalize_rows(matrix[row] + 0.05 * rng.standard_normal(matrix.shape[1])).astype(np.float32)
+        exact = top_k_indices(matrix @ q, 5)
+        rows, scores = search_quantized(quantized, matrix, q, top_k=5, rescore_factor=4)
+        assert rows.tolist() == exact.tolist()
+        assert np.allclose(scores, (matrix @ q)[exact])
+
+    quantized.save(str(tmp_path))
+    loaded = QuantizedMatrix.load(str(tmp_path), dtype)
+    assert loaded is not None and np.array_equal(loaded.codes, quantized.codes)
+    assert QuantizedMatrix.load(str(tmp_path), "int8" if dtype == "float16" else "float16") is None
@@ -0,0 +1,317 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+
+from app.llm.base import Embedder
+from app.rag.ann import AnnConfig
+from app.rag.builder import build_index
+from app.rag.index import (
+    DocFilter,
+    DocSpan,
+    IndexedChunk,
+    StringTable,
+    VectorIndex,
+    cosine_sim,
+    load_manifest,
+    normalize_rows,
+    save_index,
+    top_k_indices,
+)
+from app.rag.retriever import Retriever
+
+
+def _items(n: int, dim: int = 16, seed: int = 0) -> list[IndexedChunk]:
+    rng = np.random.default_rng(seed)
+    return [
+        IndexedChunk(doc_id="doc", chunk_id=f"doc::c{i}", text=f"text {i}", vector=rng.standard_normal(dim).tolist())
+        for i in range(n)
+    ]
+
+
+def test_vector_index_matches_cosine_ranking():
+    items = _items(200)
+    index = VectorIndex.from_items(items)
+    q = np.random.default_rng(1).standard_normal(16).astype(np.float32)
+
+    expected = sorted(
+        ((x.chunk_id, cosine_sim(q, np.array(x.vector, dtype=np.float32))) for x in items),
+        key=lambda x: x[1],
+        reverse=True,
+    )[:7]
+    got = index.search(q, top_k=7)
+
+    assert [c.chunk_id for c, _ in got] == [cid for cid, _ in expected]
+    assert np.allclose([s for _, s in got], [s for _, s in expected], atol=1e-5)
+
+
+def test_top_k_indices_is_stable_on_ties_and_clamps_k():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1], dtype=np.float32)
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_indices(scores, 50).tolist() == [1, 3, 0, 2, 4]
+
+
+def test_search_many_matches_per_query_search():
+    index = VectorIndex.from_items(_items(300) + _items(20))  # duplicate vectors -> exact ties
+    queries = np.random.default_rng(2).standard_normal((9, 16)).astype(np.float32)
+    queries[3] = 0.0
+
+    batched = index.search_many(queries, top_k=6)
+    for q, hits in zip(queries, batched, strict=True):
+        expected = index.search(q, top_k=6)
+        assert [c.chunk_id for c, _ in hits] == [c.chunk_id for c, _ in expected]
+        assert np.allclose([s for _, s in hits], [s for _, s in expected], atol=1e-5)
+
+
+def test_empty_index_returns_no_results():
+    index = VectorIndex.from_items([])
+    assert index.search(np.ones(4, dtype=np.float32), top_k=3) == []
+
+
+class CountingEmbedder(Embedder):
+    model = "fake-embed"
+
+    def __init__(self):
+        self.embedded: list[str] = []
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(t)), float(sum(map(ord, t)) % 97), 1.0] for t in texts]
+
+
+async def test_rebuild_only_embeds_changed_chunks(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "runbook.txt").write_text("SEV1 escalation: page the incident commander. " * 20, encoding="utf-8")
+    (docs / "policy.txt").write_text("Rotate credentials every 90 days.", encoding="utf-8")
+    (docs / "old.txt").write_text("Deprecated process.", encoding="utf-8")
+
+    embedder = CountingEmbedder()
+    retriever = Retriever(str(docs), str(tmp_path / "index"), embedder, max_chars=200, overlap=20)
+    await retriever.warmup()
+    first_total = len(embedder.embedded)
+    assert first_total > 3
+
+    embedder.embedded.clear()
+    (docs / "policy.txt").write_text("Rotate credentials every 30 days.", encoding="utf-8")
+    (docs / "old.txt").unlink()
+    stats = await retriever.rebuild()
+
+    assert embedder.embedded == ["Rotate credentials every 30 days."]
+    assert (stats.docs_reused, stats.docs_changed, stats.removed) == (1, 1, ["old"])
+    assert stats.chunks_embedded == 1 and stats.chunks_reused == first_total - 2
+
+    hits = await retriever.search("Rotate credentials every 30 days.", top_k=1)
+    assert hits[0][0].doc_id == "policy"
+
+
+async def test_build_streams_chunks_to_the_embedder_in_batches(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "runbook.txt").write_text("SEV2 triage steps for the on-call engineer. " * 40, encoding="utf-8")
+
+    whole, whole_manifest, _ = await build_index(
+        str(docs), CountingEmbedder(), max_chars=120, overlap=20, spool_dir=str(tmp_path / "spool-whole")
+    )
+
+    class BatchRecorder(CountingEmbedder):
+        def __init__(self):
+            super().__init__()
+            self.calls: list[int] = []
+
+        async def embed(self, texts: list[str]) -> list[list[float]]:
+            self.calls.append(len(texts))
+            return await super().embed(texts)
+
+    embedder = BatchRecorder()
+    batched, manifest, stats = await build_index(
+        str(docs), embedder, max_chars=120, overlap=20, embed_flush=4, spool_dir=str(tmp_path / "spool-batched")
+    )
+    assert max(embedder.calls) == 4 and sum(embedder.calls) == stats.chunks_embedded > 4
+    assert np.array_equal(whole.matrix, batched.matrix)
+    # Texts were spooled to disk during the build, not kept in memory.
+    assert isinstance(batched.texts.blob, np.memmap) and os.path.dirname(batched.texts.blob.filename) == str(
+        tmp_path / "spool-batched"
+    )
+    assert [batched.texts[i] for i in range(len(batched))] == [whole.texts[i] for i in range(len(whole))]
+    # So were the chunk keys: the manifest reads them back per document and saves as plain JSON.
+    assert not isinstance(manifest["chunks"], dict) and len(manifest["chunks"]["runbook"]) == len(batched)
+    save_index(str(tmp_path / "index"), batched, manifest=manifest)
+    assert load_manifest(str(tmp_path / "index")) == {**manifest, "chunks": dict(whole_manifest["chunks"])}
+
+
+async def test_retrieve_many_embeds_once_and_matches_retrieve(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "runbook.txt").write_text("SEV1 escalation: page the incident commander. " * 20, encoding="utf-8")
+    (docs / "policy.txt").write_text("Rotate credentials every 90 days.", encoding="utf-8")
+
+    class BatchRecorder(CountingEmbedder):
+        calls = 0
+
+        async def embed(self, texts: list[str]) -> list[list[float]]:
+            self.calls += 1
+            return await super().embed(texts)
+
+    embedder = BatchRecorder()
+    retriever = Retriever(str(docs), str(tmp_path / "index"), embedder, max_chars=200, overlap=20)
+    await retriever.warmup()
+    queries = ["who pages the commander?", "Rotate credentials", "WHO pages the  commander?"]
+    embedder.calls = 0
+    embedder.embedded.clear()
+
+    batched = await retriever.retrieve_many(queries, top_k=[3, 1, 2])
+    assert embedder.calls == 1 and embedder.embedded == queries[:2]  # repeats differing in case/space share a vector
+    for query, k, got in zip(queries[:2], [3, 1], batched[:2], strict=True):
+        expected = await retriever.retrieve(query, top_k=k)
+        assert [(c.chunk_id, round(s, 5)) for c, s in got.hits] == [(c.chunk_id, round(s, 5)) for c, s in expected.hits]
+    assert batched[2].hits == batched[0].hits[:2]
+
+
+async def test_filtered_retrieve_only_searches_matching_docs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "security_policy.txt").write_text("Rotate credentials every 90 days.", encoding="utf-8")
+    (docs / "security_policy.meta.json").write_text('{"tags": ["Security", "policy"]}', encoding="utf-8")
+    (docs / "hr_policy.txt").write_text("Rotate credentials every 90 days!", encoding="utf-8")
+    (docs / "oncall_runbook.txt").write_text("SEV1 escalation: page the incident commander. " * 10, encoding="utf-8")
+
+    embedder = CountingEmbedder()
+    retriever = Retriever(str(docs), str(tmp_path / "index"), embedder, max_chars=200, overlap=20)
+    await retriever.warmup()
+    query = "Rotate credentials every 90 days!"
+    assert (await retriever.search(query, top_k=1))[0][0].doc_id == "hr_policy"
+
+    scoped = await retriever.search(query, top_k=3, doc_filter=DocFilter(tags=("security",)))
+    assert [c.doc_id for c, _ in scoped] == ["security_policy"]
+    runbook = await retriever.search(query, top_k=3, doc_filter=DocFilter(prefixes=("oncall",)))
+    assert runbook and {c.doc_id for c, _ in runbook} == {"oncall_runbook"}
+
+    embedder.embedded.clear()
+    missing = await retriever.retrieve(query, top_k=3, doc_filter=DocFilter(doc_ids=("nope",)))
+    assert missing.hits == [] and embedder.embedded == []  # no match: nothing embedded or scanned
+
+    batched = await retriever.retrieve_many(
+        [query, query], top_k=[3, 3], doc_filters=[DocFilter(doc_ids=("hr_policy",)), None]
+    )
+    assert [c.doc_id for c, _ in batched[0].hits] == ["hr_policy"] and len(batched[1].hits) == 3
+
+    # Retagging is metadata only: the next build re-embeds nothing.
+    (docs / "hr_policy.meta.json").write_text('{"tags": ["security"]}', encoding="utf-8")
+    stats = await retriever.rebuild()
+    assert stats.chunks_embedded == 0
+    retagged = await retriever.search(query, top_k=3, doc_filter=DocFilter(tags=("security",)))
+    assert {c.doc_id for c, _ in retagged} == {"security_policy", "hr_policy"}
+
+
+async def test_filtered_ivf_search_probes_more_lists_when_the_docs_sit_outside_the_probed_ones(tmp_path):
+    rng = np.random.default_rng(0)
+    dim = 16
+    centers = np.eye(dim, dtype=np.float32)[:2]
+    # docs a0..a4 around one center, b0..b4 around the other: 100 rows each
+    matrix = np.vstack([centers[i // 5] + 0.05 * rng.standard_normal((100, dim)) for i in range(10)])
+    ids = [f"{'ab'[i // 5]}{i % 5}" for i in range(10)]
+    docs = [DocSpan(doc_id=d, start=i * 100, end=(i + 1) * 100) for i, d in enumerate(ids)]
+    index = VectorIndex(
+        normalize_rows(matrix.astype(np.float32)),
+        StringTable.from_strings([f"{d}::c{r}" for d in ids for r in range(100)]),
+        StringTable.from_strings(["text"] * 1_000),
+        docs,
+        meta={"embed_model": "fixed"},
+    )
+    save_index(str(tmp_path / "index"), index)
+
+    class FixedEmbedder(Embedder):
+        model = "fixed"
+
+        async def embed(self, texts: list[str]) -> list[list[float]]:
+            return [centers[0].tolist() for _ in texts]  # the "a" docs' center
+
+    ann = AnnConfig(mode="ivf", nlist=16, nprobe=1, min_chunks=100)
+    retriever = Retriever("", str(tmp_path / "index"), FixedEmbedder(), max_chars=200, overlap=20, ann=ann)
+    await retriever.warmup()
+    hits = await retriever.search("q", top_k=5, doc_filter=DocFilter(prefixes=("b",)))
+
+    # nprobe=1 alone only reaches lists of the "a" docs: nothing of the partition would come back.
+    assert len(hits) == 5 and all(c.doc_id.startswith("b") for c, _ in hits)
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+
+async def test_reload_swaps_index_while_in_flight_search_finishes_on_old_one(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "policy.txt").write_text("Rotate credentials every 90 days.", encoding="utf-8")
+    index_path = str(tmp_path / "index")
+
+    class GatedEmbedder(CountingEmbedder):
+        gate: asyncio.Event | None = None
+
+        async def embed(self, texts: list[str]) -> list[list[float]]:
+            if self.gate is not None:
+                await self.gate.wait()
+            return await super().embed(texts)
+
+    embedder = GatedEmbedder()
+    server = Retriever(str(docs), index_path, embedder, max_chars=200, overlap=20)
+    await server.warmup()
+    old_version = server.index_version
+
+    (docs / "oncall.txt").write_text("Page the incident commander for SEV1.", encoding="utf-8")
+    builder = Retriever(str(docs), index_path, CountingEmbedder(), max_chars=200, overlap=20)
+    await builder.rebuild(versioned=True)
+
+    embedder.gate = asyncio.Event()
+    in_flight = asyncio.create_task(server.retrieve("page the commander", top_k=5))
+    await asyncio.sleep(0)
+    info = await server.reload()
+    assert info["changed"] and info["version"] == builder.index_version != old_version
+    assert info["chunks"] == 2 and info["created_at"] and info["draining"] == 1
+
+    embedder.gate.set()
+    old = await in_flight
+    assert old.index_version == old_version and len(old.hits) == 1
+    assert server.index_info()["draining"] == 0
+    new = await server.retrieve("page the commander", top_k=5)
+    assert new.index_version == info["version"] and len(new.hits) == 2
+    assert not (await server.reload())["changed"]
+
+    (docs / "policy.txt").write_text("Rotate credentials every 30 days.", encoding="utf-8")
+    watcher = asyncio.create_task(server.watch(0.01))
+    await builder.rebuild()
+    for _ in range(200):
+        if server.index_version == builder.index_version:
+            break
+        await asyncio.sleep(0.01)
+    watcher.cancel()
+    assert server.index_version == builder.index_version and server.reloads == 2
+
+
+async def test_reload_with_rebuild_keeps_serving_searches_while_building(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "policy.txt").write_text("Rotate credentials every 90 days.", encoding="utf-8")
+    retriever = Retriever(str(docs), str(tmp_path / "index"), CountingEmbedder(), max_chars=200, overlap=20)
+    await retriever.warmup()
+    old_version = retriever.index_version
+
+    (docs / "oncall.txt").write_text("Page the incident commander for SEV1.", encoding="utf-8")
+    building = threading.Event()
+    served = threading.Event()
+    original = retriever._build_and_publish
+
+    async def slow_build(*args):
+        building.set()
+        assert served.wait(5), "search was not served while the build ran"  # blocks the build's thread only
+        return await original(*args)
+
+    retriever._build_and_publish = slow_build
+    reload = asyncio.create_task(retriever.reload(rebuild=True))
+    while not building.is_set():
+        await asyncio.sleep(0.001)
+    during = await retriever.retrieve("rotate credentials", top_k=5)
+    served.set()
+    info = await reload
+
+    assert during.index_version == old_version and len(during.hits) == 1
+    assert info["changed"] and info["chunks"] == 2
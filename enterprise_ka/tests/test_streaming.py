@@ -0,0 +1,36 @@
+import httpx
+
+from app.llm.anthropic_messages import AnthropicMessagesClient
+from app.llm.http import HttpClientPool
+from app.llm.openai_chat import OpenAIChatClient
+
+
+def _pool(body: str) -> HttpClientPool:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert b'"stream":true' in request.content.replace(b" ", b"")
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, text=body)
+
+    return HttpClientPool(transport=httpx.MockTransport(handler))
+
+
+async def test_openai_stream_yields_content_deltas():
+    body = (
+        'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+        'data: {"choices":[{"delta":{"content":"SEV1 "}}]}\n\n'
+        'data: {"choices":[{"delta":{"content":"pages on-call"}}]}\n\n'
+        "data: [DONE]\n\n"
+    )
+    client = OpenAIChatClient("key", "model", "https://openai.test/v1", http=_pool(body))
+    assert [t async for t in client.stream("system", "user")] == ["SEV1 ", "pages on-call"]
+
+
+async def test_anthropic_stream_yields_text_deltas():
+    body = (
+        "event: message_start\ndata: {\"type\":\"message_start\"}\n\n"
+        "event: content_block_delta\ndata: {\"type\":\"content_block_delta\",\"delta\":{\"type\":\"text_delta\",\"text\":\"Rotate \"}}\n\n"
+        "event: ping\ndata: {\"type\":\"ping\"}\n\n"
+        "event: content_block_delta\ndata: {\"type\":\"content_block_delta\",\"delta\":{\"type\":\"text_delta\",\"text\":\"keys\"}}\n\n"
+        "event: message_stop\ndata: {\"type\":\"message_stop\"}\n\n"
+    )
+    client = AnthropicMessagesClient("key", "model", "https://anthropic.test", http=_pool(body))
+    assert [t async for t in client.stream("system", "user")] == ["Rotate ", "keys"]